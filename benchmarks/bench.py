@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import cidrbrewer.__main__ as cli
+from cidrbrewer import cache
+
+# The path to the stored baseline timings
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+# The dataset sizes (number of addresses) benchmarked by default; larger sizes
+# (up to 10^7) can be requested via --sizes
+DEFAULT_SIZES = (1000, 10000, 100000)
+# The number of times each benchmark is run, of which the fastest is kept
+DEFAULT_NUM_REPEATS = 5
+# The fraction by which a benchmark may be slower than its baseline before it
+# is reported as a regression, unless the baselines store their own threshold
+# (which should reflect how noisy the machine they were measured on is)
+DEFAULT_THRESHOLD = 0.25
+# The seed used to generate datasets, so that every run uses the same addresses
+DATASET_SEED = 531
+# The block sizes allocated by the get_blocks() benchmark, which fit in any
+# generated subnet
+BLOCK_SIZES = (16, 64, 16, 32)
+
+
+# A reproducible synthetic dataset of random addresses in slash notation, along
+# with the forms of those addresses expected by each benchmarked function
+class Dataset(object):
+    def __init__(self, num_addrs, seed=DATASET_SEED):
+        rng = random.Random(seed)
+        self.addr_strs = [
+            "{}.{}.{}.{}/{}".format(
+                rng.randrange(256),
+                rng.randrange(256),
+                rng.randrange(256),
+                rng.randrange(256),
+                rng.randint(8, 25),
+            )
+            for _ in range(num_addrs)
+        ]
+        self.parsed_addrs = list(map(cli.parse_addr_str, self.addr_strs))
+        self.addr_str_pairs = list(zip(self.addr_strs, reversed(self.addr_strs)))
+        self.bin_addr_pairs = [
+            (bin_addr_1, bin_addr_2)
+            for (bin_addr_1, _), (bin_addr_2, _) in zip(
+                self.parsed_addrs, reversed(self.parsed_addrs)
+            )
+        ]
+
+
+def bench_parse_addr_str(dataset):
+    for addr_str in dataset.addr_strs:
+        cli.parse_addr_str(addr_str)
+
+
+def bench_get_network_id(dataset):
+    for bin_addr, num_subnet_bits in dataset.parsed_addrs:
+        cli.get_network_id(bin_addr, num_subnet_bits)
+
+
+def bench_get_largest_subnet_mask(dataset):
+    for bin_addr_1, bin_addr_2 in dataset.bin_addr_pairs:
+        cli.get_largest_subnet_mask(bin_addr_1, bin_addr_2)
+
+
+def bench_get_blocks(dataset):
+    for bin_addr, num_subnet_bits in dataset.parsed_addrs:
+        cli.get_blocks(bin_addr, num_subnet_bits, BLOCK_SIZES)
+
+
+def bench_print_addr_details(dataset):
+    for bin_addr, num_subnet_bits in dataset.parsed_addrs:
+        cli.print_addr_details(bin_addr, num_subnet_bits)
+
+
+def bench_handle_one_addr(dataset):
+    for addr_str in dataset.addr_strs:
+        cli.handle_one_addr(addr_str)
+
+
+def bench_handle_two_addrs(dataset):
+    for addr_str_1, addr_str_2 in dataset.addr_str_pairs:
+        cli.handle_two_addrs(addr_str_1, addr_str_2)
+
+
+# Every benchmark, keyed by the name of the function it measures
+BENCHMARKS = {
+    "parse_addr_str": bench_parse_addr_str,
+    "get_network_id": bench_get_network_id,
+    "get_largest_subnet_mask": bench_get_largest_subnet_mask,
+    "get_blocks": bench_get_blocks,
+    "print_addr_details": bench_print_addr_details,
+    "handle_one_addr": bench_handle_one_addr,
+    "handle_two_addrs": bench_handle_two_addrs,
+}
+
+
+# Runs the given benchmark against the given dataset, returning the fastest
+# time per address (in nanoseconds) across the given number of repeats; any
+# output is discarded so that terminal speed does not skew results, and every
+# cache is cleared before each repeat so that repeats measure the same work as
+# the first rather than cache hits
+def time_benchmark(benchmark, dataset, num_repeats=DEFAULT_NUM_REPEATS):
+    best_time = float("inf")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(num_repeats):
+            cache.clear_caches()
+            start_time = time.perf_counter()
+            benchmark(dataset)
+            best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time * 1e9 / len(dataset.addr_strs)
+
+
+# Runs every named benchmark against a dataset of each given size, returning a
+# dictionary of timings (in nanoseconds per address) keyed by "name@size"
+def run_benchmarks(names, sizes, num_repeats=DEFAULT_NUM_REPEATS):
+    results = {}
+    for size in sizes:
+        dataset = Dataset(size)
+        for name in names:
+            key = "{}@{}".format(name, size)
+            results[key] = time_benchmark(BENCHMARKS[name], dataset, num_repeats)
+            print("{:<32} {:>12.1f} ns/addr".format(key, results[key]))
+    return results
+
+
+# Returns a list of regressions, where each regression is a tuple containing
+# the key of a benchmark, its baseline timing, and its current timing, for
+# every benchmark which is slower than its baseline by more than the given
+# fraction
+def find_regressions(results, baselines, threshold=DEFAULT_THRESHOLD):
+    return [
+        (key, baselines[key], timing)
+        for key, timing in results.items()
+        if key in baselines and timing > baselines[key] * (1 + threshold)
+    ]
+
+
+# Returns a dictionary describing the environment in which benchmarks are
+# currently run, so that baselines can record where they were measured
+def get_conditions(num_repeats=DEFAULT_NUM_REPEATS):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpu_count": os.cpu_count(),
+        "repeats": num_repeats,
+    }
+
+
+# Reads the stored baselines (the timings under "results", along with the
+# conditions in which they were measured and the threshold for regressions),
+# if any exist
+def load_baselines(baselines_path=BASELINES_PATH):
+    try:
+        with open(baselines_path, "r") as baselines_file:
+            return json.load(baselines_file)
+    except FileNotFoundError:
+        return {"results": {}}
+
+
+# Stores the given timings as the new baselines, along with the environment in
+# which they were measured and the threshold for regressions against them
+def save_baselines(
+    results,
+    threshold=DEFAULT_THRESHOLD,
+    num_repeats=DEFAULT_NUM_REPEATS,
+    baselines_path=BASELINES_PATH,
+):
+    baselines = get_conditions(num_repeats)
+    baselines["threshold"] = threshold
+    baselines["results"] = {key: round(timing, 1) for key, timing in results.items()}
+    with open(baselines_path, "w") as baselines_file:
+        json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write("\n")
+
+
+# Returns a list of the names of the conditions (such as the Python version)
+# which differ between the given baselines and the current run
+def get_changed_conditions(baselines, num_repeats=DEFAULT_NUM_REPEATS):
+    return [
+        name
+        for name, value in get_conditions(num_repeats).items()
+        if name in baselines and baselines[name] != value
+    ]
+
+
+# Parses command-line arguments passed to the benchmark runner
+def parse_cli_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "names",
+        metavar="benchmark",
+        nargs="*",
+        help="the benchmarks to run (all by default)",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_NUM_REPEATS)
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the new baselines"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with an error if any benchmark regressed against its baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help="the fraction by which a benchmark may be slower than its baseline"
+        " (by default, the threshold stored with the baselines, or {})".format(
+            DEFAULT_THRESHOLD
+        ),
+    )
+    cli_args = parser.parse_args()
+    unknown_names = [name for name in cli_args.names if name not in BENCHMARKS]
+    if unknown_names:
+        parser.error("unknown benchmarks: {}".format(", ".join(unknown_names)))
+    return cli_args
+
+
+def main():
+    cli_args = parse_cli_args()
+    results = run_benchmarks(
+        cli_args.names or list(BENCHMARKS), cli_args.sizes, cli_args.repeats
+    )
+    if cli_args.save:
+        save_baselines(
+            results,
+            DEFAULT_THRESHOLD if cli_args.threshold is None else cli_args.threshold,
+            cli_args.repeats,
+        )
+    if cli_args.check:
+        baselines = load_baselines()
+        threshold = cli_args.threshold
+        if threshold is None:
+            threshold = baselines.get("threshold", DEFAULT_THRESHOLD)
+        changed_conditions = get_changed_conditions(baselines, cli_args.repeats)
+        if changed_conditions:
+            print(
+                "Warning: baselines were measured with a different {}".format(
+                    ", ".join(changed_conditions)
+                ),
+                file=sys.stderr,
+            )
+        regressions = find_regressions(results, baselines["results"], threshold)
+        for key, baseline, timing in regressions:
+            print(
+                "Regression: {} took {:.1f} ns/addr (baseline: {:.1f} ns/addr)".format(
+                    key, timing, baseline
+                ),
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
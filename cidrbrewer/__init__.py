@@ -1 +1,21 @@
 #!/usr/bin/env python3
+
+from cidrbrewer.api import (
+    Allocation,
+    Comparison,
+    SubnetDetails,
+    allocate,
+    compare,
+    get_details,
+)
+from cidrbrewer.core import AddrParseError
+
+__all__ = [
+    "AddrParseError",
+    "Allocation",
+    "Comparison",
+    "SubnetDetails",
+    "allocate",
+    "compare",
+    "get_details",
+]
@@ -1,11 +1,32 @@
 #!/usr/bin/env python3
 
-import argparse
+import contextlib
 import functools
-import math
+import io
+import itertools
+import sys
+
+# Subsystems needed only by some options (like prefix databases, packed input
+# and parallel processing) are imported by the functions which use them, so
+# that the common case of a single query never pays for importing them
+from cidrbrewer import alloc, cache, core, formats, instrument, stream
 
 # The number of spaces used per indentation level when displaying output
 SPACES_PER_INDENT = 3
+# The supported formats of the input file
+TEXT_INPUT_FORMAT = "text"
+PACKED_INPUT_FORMAT = "packed"
+PACKED_PREFIX_INPUT_FORMAT = "packed-prefix"
+INPUT_FORMATS = (TEXT_INPUT_FORMAT, PACKED_INPUT_FORMAT, PACKED_PREFIX_INPUT_FORMAT)
+# The number of packed addresses whose subnet details are computed at a time
+PACKED_CHUNK_SIZE = 1 << 16
+# The name under which errors are reported
+PROGRAM_NAME = "cidr-brewer"
+# The last octet of every IPv4 address, as a line of text, by octet value
+OCTET_LINES = tuple("{}\n".format(dec_octet) for dec_octet in core.DEC_OCTETS)
+# Whether the binary form of every IPv4 address is displayed next to its
+# dotted-decimal form (see set_show_bin_addrs())
+show_bin_addrs = True
 
 
 # Converts the given decimal number to a binary octet
@@ -16,7 +37,7 @@ def dec_to_bin_octet(dec_octet):
 
 # Adds a decimal number to a binary number
 def add_dec_to_bin(bin_num, dec_num):
-    return bin(int(bin_num, 2) + dec_num)[2:].zfill(len(bin_num))
+    return format(int(bin_num, 2) + dec_num, "0{}b".format(len(bin_num)))
 
 
 # Splits a binary address into octets
@@ -25,68 +46,73 @@ def get_addr_octets(bin_addr):
 
 
 # Computes the subnet mask given the number of bits used for the subnet
+@cache.memoize
 def get_subnet_mask(num_subnet_bits):
-    return ("1" * num_subnet_bits) + ("0" * (32 - num_subnet_bits))
+    return core.int_to_bin(core.get_subnet_mask(num_subnet_bits))
 
 
 # Computes the network ID given the binary address and the number of bits used
 # for the subnet
+@instrument.stage(instrument.COMPUTE)
 def get_network_id(bin_addr, num_subnet_bits):
-    return bin_addr[:num_subnet_bits].ljust(32, "0")
+    return core.int_to_bin(
+        core.get_network_id(core.bin_to_int(bin_addr), num_subnet_bits)
+    )
 
 
 # Computes the broadcast ID given the binary address and the number of bits
 # used for the subnet
+@instrument.stage(instrument.COMPUTE)
 def get_broadcast_id(bin_addr, num_subnet_bits):
-    return bin_addr[:num_subnet_bits].ljust(32, "1")
+    return core.int_to_bin(
+        core.get_broadcast_id(core.bin_to_int(bin_addr), num_subnet_bits)
+    )
 
 
 # Computes the first available IP address in the defined subnet
+@instrument.stage(instrument.COMPUTE)
 def get_first_available_addr(bin_addr, num_subnet_bits):
-    return get_network_id(bin_addr, num_subnet_bits)[:31] + "1"
+    return core.int_to_bin(
+        core.get_first_available_addr(core.bin_to_int(bin_addr), num_subnet_bits)
+    )
 
 
 # Computes the last available IP address in the defined subnet
+@instrument.stage(instrument.COMPUTE)
 def get_last_available_addr(bin_addr, num_subnet_bits):
-    return get_broadcast_id(bin_addr, num_subnet_bits)[:31] + "0"
+    return core.int_to_bin(
+        core.get_last_available_addr(core.bin_to_int(bin_addr), num_subnet_bits)
+    )
 
 
 # Prettifies the given binary address by adding separating octets with dots
 def prettify_bin_addr(bin_addr):
-    return ".".join(get_addr_octets(bin_addr))
+    return core.int_to_bin_octets(core.bin_to_int(bin_addr))
 
 
 # Converts a binary address to a prettified decimal address
 def get_prettified_dec_addr(bin_addr):
-    octets = get_addr_octets(bin_addr)
-    return ".".join(map(str, map(functools.partial(int, base=2), octets)))
+    return core.int_to_dotted(core.bin_to_int(bin_addr))
 
 
 # Computes the subnet size given the number of bits used for the subnet ID
 def get_subnet_size(num_subnet_bits):
-    return 2 ** (32 - num_subnet_bits) - 2
+    return core.get_subnet_size(num_subnet_bits)
 
 
 # Returns True if the given IP address is reserved; otherwise, returns False
 def is_reserved(bin_addr, num_subnet_bits):
-    host_part = bin_addr[num_subnet_bits:]
-    return host_part.count("1") == len(host_part) or host_part.count("0") == len(
-        host_part
-    )
+    return core.is_reserved(core.bin_to_int(bin_addr), num_subnet_bits)
 
 
 # Computes the largest subnet mask that allows two IP addresses to communicate
+@instrument.stage(instrument.COMPUTE)
 def get_largest_subnet_mask(bin_addr_1, bin_addr_2):
-    for i in reversed(range(31)):  # pragma: no branch
-        bin_addr_1_left = bin_addr_1[:i]
-        bin_addr_2_left = bin_addr_2[:i]
-        if (
-            bin_addr_1_left == bin_addr_2_left
-            and not is_reserved(bin_addr_1, i)
-            and not is_reserved(bin_addr_2, i)
-        ):
-            break
-    return get_subnet_mask(i)
+    return get_subnet_mask(
+        core.get_largest_subnet_bits(
+            (core.bin_to_int(bin_addr_1), core.bin_to_int(bin_addr_2))
+        )
+    )
 
 
 # Indents the given output string
@@ -94,77 +120,381 @@ def indent(output, indent_level=1):
     return (" " * indent_level * SPACES_PER_INDENT) + output
 
 
-# Prints address for display in terminal
-def print_addr(bin_addr, num_subnet_bits=None, indent_level=1):
+# Formats the given 32-bit integer address for display in terminal, followed by
+# its binary form unless the binary column is hidden
+def format_ipv4_addr(addr, num_subnet_bits=None, indent_level=1):
+    prettified_dec_addr = core.int_to_dotted(addr)
     if num_subnet_bits is not None:
-        prettified_dec_addr = "{}/{}".format(
-            get_prettified_dec_addr(bin_addr), num_subnet_bits
-        )
-    else:
-        prettified_dec_addr = get_prettified_dec_addr(bin_addr)
-    prettified_bin_addr = prettify_bin_addr(bin_addr)
-    print(
-        indent(
-            "{:<18} {:<35}".format(prettified_dec_addr, prettified_bin_addr),
-            indent_level=indent_level,
-        )
+        prettified_dec_addr = "{}/{}".format(prettified_dec_addr, num_subnet_bits)
+    if not show_bin_addrs:
+        return indent(prettified_dec_addr, indent_level=indent_level)
+    return indent(
+        "{:<18} {:<35}".format(prettified_dec_addr, core.int_to_bin_octets(addr)),
+        indent_level=indent_level,
     )
 
 
+# Shows or hides the binary form of every IPv4 address displayed; cached
+# output was rendered with the previous setting, so every cache is cleared
+def set_show_bin_addrs(enabled):
+    global show_bin_addrs
+    show_bin_addrs = enabled
+    cache.clear_caches()
+
+
+# Prints address for display in terminal
+def print_addr(bin_addr, num_subnet_bits=None, indent_level=1):
+    print_int_addr(core.bin_to_int(bin_addr), num_subnet_bits, indent_level)
+
+
+# Prints the given integer IPv4 or IPv6 address for display in terminal
+def print_int_addr(addr, num_subnet_bits=None, indent_level=1, addr_len=core.ADDR_LEN):
+    print(format_int_addr(addr, num_subnet_bits, indent_level, addr_len))
+
+
 # Parses the full address string by separating the address from the number of
 # subnet bits
+@instrument.stage(instrument.PARSE)
 def parse_addr_str(addr_str):
-    addr_str_parts = addr_str.split("/")
-    bin_addr = "".join(map(dec_to_bin_octet, addr_str_parts[0].split(".")))
-    if len(addr_str_parts) == 2:
-        num_subnet_bits = int(addr_str_parts[1])
-    else:
-        num_subnet_bits = None
-    return bin_addr, num_subnet_bits
+    addr, num_subnet_bits = core.parse_addr(addr_str)
+    return core.int_to_bin(addr), num_subnet_bits
 
 
 # Parses command-line arguments passed to the utility
 def parse_cli_args():
+    # Importing argparse is a large share of the startup time, so bare queries
+    # (see get_bare_query()) never import it
+    import argparse
+
+    from cidrbrewer import parallel, ranges
+
     parser = argparse.ArgumentParser()
-    parser.add_argument("addr_str_1", metavar="ip_addr")
+    parser.add_argument("addr_str_1", metavar="ip_addr", nargs="?")
     parser.add_argument("addr_str_2", metavar="ip_addr", nargs="?")
-    parser.add_argument("--block-sizes", type=int, nargs="*")
-    parser.add_argument("--num-subnets", type=int)
-    return parser.parse_args()
+    parser.add_argument(
+        "--block-sizes",
+        type=int,
+        nargs="*",
+        help="allocate blocks of these sizes (rounded up to powers of two)",
+    )
+    parser.add_argument(
+        "--hosts",
+        type=int,
+        nargs="*",
+        metavar="NUM_HOSTS",
+        help="allocate blocks with room for these numbers of hosts",
+    )
+    parser.add_argument(
+        "--state",
+        metavar="FILE",
+        help="carve --block-sizes (or --hosts) from the space in the given subnet "
+        "left free by the blocks recorded in FILE, recording the new blocks",
+    )
+    parser.add_argument(
+        "--release",
+        nargs="*",
+        metavar="SUBNET",
+        help="return these blocks recorded in the --state FILE to the free space",
+    )
+    parser.add_argument(
+        "--label",
+        help="the label recorded in the --state FILE for every new block",
+    )
+    parser.add_argument(
+        "--num-subnets",
+        type=int,
+        help="split the given subnet into this many equal subnets",
+    )
+    parser.add_argument(
+        "--input",
+        metavar="FILE",
+        help="read one or two IP addresses per line from FILE ('-' for stdin)",
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=INPUT_FORMATS,
+        default=TEXT_INPUT_FORMAT,
+        help="the format of --input: text, packed 4-byte big-endian addresses, "
+        "or packed addresses each followed by a 1-byte prefix length",
+    )
+    parser.add_argument(
+        "--prefix-len",
+        type=int,
+        default=core.ADDR_LEN,
+        help="the prefix length of every address in a packed input file",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="the number of processes used for --input (0 for one per CPU)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=parallel.DEFAULT_CHUNK_SIZE,
+        help="the number of queries sent to a process at a time",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="write results as soon as they are ready rather than in input order",
+    )
+    parser.add_argument(
+        "--lookup",
+        metavar="TABLE",
+        help="find the subnets in TABLE (one per line, or a database compiled "
+        "with --compile) containing each IP address",
+    )
+    parser.add_argument(
+        "--compile",
+        metavar="DB",
+        help="compile the --lookup TABLE into a prefix database at DB, which "
+        "later lookups can load instantly",
+    )
+    parser.add_argument(
+        "--supernet",
+        action="store_true",
+        help="find the largest subnet allowing every given IP address to communicate",
+    )
+    parser.add_argument(
+        "--aggregate",
+        action="store_true",
+        help="collapse the given subnets into the smallest covering set",
+    )
+    parser.add_argument(
+        "--overlaps",
+        action="store_true",
+        help="report every pair of overlapping or duplicate subnets among the "
+        "given subnets (each optionally followed by a label in --input)",
+    )
+    parser.add_argument(
+        "--free",
+        metavar="FILE",
+        help="list the space in the given subnet not allocated by any subnet in FILE",
+    )
+    parser.add_argument(
+        "--enumerate",
+        action="store_true",
+        help="list every usable host address in the given subnets, one per line",
+    )
+    parser.add_argument(
+        "--stride",
+        type=int,
+        default=1,
+        help="list only every STRIDE-th host address with --enumerate",
+    )
+    parser.add_argument(
+        "--range",
+        action="store_true",
+        help="list the fewest subnets exactly covering the range between the "
+        "given first and last IP addresses (or each such pair in --input)",
+    )
+    parser.add_argument(
+        "--union",
+        metavar="FILE",
+        help="list the fewest subnets covering every address in the given "
+        "subnets or in the subnets in FILE",
+    )
+    parser.add_argument(
+        "--intersection",
+        metavar="FILE",
+        help="list the fewest subnets covering every address in both the given "
+        "subnets and the subnets in FILE",
+    )
+    parser.add_argument(
+        "--difference",
+        metavar="FILE",
+        help="list the fewest subnets covering every address in the given "
+        "subnets but not in the subnets in FILE",
+    )
+    parser.add_argument(
+        "--sorted",
+        action="store_true",
+        help="stream the subnets for --union, --intersection or --difference "
+        "with bounded memory rather than sorting them (both lists must already "
+        "be sorted by network ID)",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="answer queries (one or two IP addresses per line) sent to the Unix "
+        "socket SOCKET with one JSON response per line, until interrupted",
+    )
+    parser.add_argument(
+        "--format",
+        choices=formats.OUTPUT_FORMATS,
+        default=formats.TEXT_FORMAT,
+        help="the format in which results are written",
+    )
+    parser.add_argument(
+        "--no-binary",
+        action="store_false",
+        dest="show_bin_addrs",
+        help="display IPv4 addresses without their binary form",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=cache.DEFAULT_CACHE_SIZE,
+        help="the number of results cached per network and prefix length "
+        "(0 to disable caching)",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="report cache hits and misses to stderr when finished",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report the number of calls to and time spent parsing, computing, "
+        "formatting and writing results to stderr when finished",
+    )
+    parser.add_argument(
+        "--on-error",
+        choices=stream.ERROR_POLICIES,
+        default=stream.FAIL_ON_ERROR,
+        help="stop at the first malformed line of an input file, or report and "
+        "skip every malformed line",
+    )
+    cli_args = parser.parse_args()
+    if cli_args.hosts:
+        cli_args.block_sizes = (cli_args.block_sizes or []) + [
+            alloc.get_host_block_size(num_hosts) for num_hosts in cli_args.hosts
+        ]
+    if cli_args.compile is not None and cli_args.lookup is None:
+        parser.error("--compile requires a --lookup TABLE to compile")
+    if (
+        cli_args.addr_str_1 is None
+        and cli_args.input is None
+        and cli_args.compile is None
+        and cli_args.serve is None
+    ):
+        parser.error("an IP address or --input is required")
+    if cli_args.input_format != TEXT_INPUT_FORMAT and cli_args.input in (
+        None,
+        stream.STDIN_PATH,
+    ):
+        parser.error(
+            "--input-format {} requires an input file".format(cli_args.input_format)
+        )
+    if cli_args.free is not None and cli_args.addr_str_1 is None:
+        parser.error("--free requires the IP address of the parent subnet")
+    if cli_args.state is not None and cli_args.addr_str_1 is None:
+        parser.error("--state requires the IP address of the parent subnet")
+    if cli_args.state is None and (
+        cli_args.release is not None or cli_args.label is not None
+    ):
+        parser.error("--release and --label require a --state FILE")
+    if not 0 <= cli_args.prefix_len <= core.ADDR_LEN:
+        parser.error("--prefix-len must be 0-{}".format(core.ADDR_LEN))
+    if cli_args.cache_size < 0:
+        parser.error("--cache-size must be at least 0")
+    if cli_args.stride < 1:
+        parser.error("--stride must be at least 1")
+    if cli_args.input_format != TEXT_INPUT_FORMAT and (
+        cli_args.jobs != 1 or cli_args.block_sizes
+    ):
+        parser.error(
+            "--input-format {} does not support --jobs, --block-sizes or "
+            "--hosts".format(cli_args.input_format)
+        )
+    if cli_args.jobs < 0:
+        parser.error("--jobs must be at least 0")
+    if cli_args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    set_operations = [
+        (operation, getattr(cli_args, operation))
+        for operation in ranges.SET_OPERATIONS
+        if getattr(cli_args, operation) is not None
+    ]
+    if len(set_operations) > 1:
+        parser.error(
+            "only one of --union, --intersection and --difference may be given"
+        )
+    cli_args.set_operation, cli_args.set_operand = (
+        set_operations[0] if set_operations else (None, None)
+    )
+    return cli_args
 
 
-# Prints details (like network ID and broadcast ID) for the given IP address
-def print_addr_details(bin_addr, num_subnet_bits, indent_level=0):
-    print(indent("Network ID:", indent_level=indent_level))
-    print_addr(
-        get_network_id(bin_addr, num_subnet_bits),
-        num_subnet_bits=num_subnet_bits,
-        indent_level=indent_level + 1,
+# Formats an IPv6 address for display in terminal; unlike IPv4 addresses, IPv6
+# addresses are not shown in binary, which would take 128 digits
+@instrument.stage(instrument.FORMAT)
+def format_ipv6_addr(addr, num_subnet_bits=None, indent_level=1):
+    ipv6_addr = core.int_to_ipv6(addr)
+    if num_subnet_bits is not None:
+        ipv6_addr = "{}/{}".format(ipv6_addr, num_subnet_bits)
+    return indent(ipv6_addr, indent_level=indent_level)
+
+
+# Formats the given integer IPv4 or IPv6 address for display in terminal
+@instrument.stage(instrument.FORMAT)
+def format_int_addr(addr, num_subnet_bits=None, indent_level=1, addr_len=core.ADDR_LEN):
+    if addr_len == core.ADDR_LEN:
+        return format_ipv4_addr(addr, num_subnet_bits, indent_level)
+    return format_ipv6_addr(addr, num_subnet_bits, indent_level)
+
+
+# Formats the details (like network ID and broadcast ID) shared by every IP
+# address in the subnet with the given integer network ID; the details depend
+# only on the network, so they are rendered once per network rather than once
+# per address
+@instrument.stage(instrument.FORMAT)
+@cache.memoize
+def format_addr_details(
+    network_id, num_subnet_bits, indent_level=0, addr_len=core.ADDR_LEN
+):
+    return "\n".join(
+        (
+            indent("Network ID:", indent_level=indent_level),
+            format_int_addr(
+                network_id, num_subnet_bits, indent_level + 1, addr_len=addr_len
+            ),
+            indent("Broadcast ID:", indent_level=indent_level),
+            format_int_addr(
+                core.get_broadcast_id(network_id, num_subnet_bits, addr_len),
+                indent_level=indent_level + 1,
+                addr_len=addr_len,
+            ),
+            indent("First Available Address:", indent_level=indent_level),
+            format_int_addr(
+                core.get_first_available_addr(network_id, num_subnet_bits, addr_len),
+                indent_level=indent_level + 1,
+                addr_len=addr_len,
+            ),
+            indent("Last Available Address:", indent_level=indent_level),
+            format_int_addr(
+                core.get_last_available_addr(network_id, num_subnet_bits, addr_len),
+                indent_level=indent_level + 1,
+                addr_len=addr_len,
+            ),
+            indent(
+                "Subnet Size: 2^{} - 2 = {}".format(
+                    addr_len - num_subnet_bits,
+                    core.get_subnet_size(num_subnet_bits, addr_len),
+                ),
+                indent_level=indent_level,
+            ),
+        )
     )
 
-    print(indent("Broadcast ID:", indent_level=indent_level))
-    print_addr(
-        get_broadcast_id(bin_addr, num_subnet_bits), indent_level=indent_level + 1
-    )
 
-    print(indent("First Available Address:", indent_level=indent_level))
-    print_addr(
-        get_first_available_addr(bin_addr, num_subnet_bits),
-        indent_level=indent_level + 1,
-    )
+# Prints details (like network ID and broadcast ID) for the given IP address
+def print_addr_details(bin_addr, num_subnet_bits, indent_level=0):
+    print_subnet_details(core.bin_to_int(bin_addr), num_subnet_bits, indent_level)
 
-    print(indent("Last Available Address:", indent_level=indent_level))
-    print_addr(
-        get_last_available_addr(bin_addr, num_subnet_bits),
-        indent_level=indent_level + 1,
-    )
 
+# Prints details (like network ID and broadcast ID) for the subnet containing
+# the given integer IPv4 or IPv6 address
+def print_subnet_details(addr, num_subnet_bits, indent_level=0, addr_len=core.ADDR_LEN):
     print(
-        indent(
-            "Subnet Size: 2^{} - 2 = {}".format(
-                32 - num_subnet_bits, get_subnet_size(num_subnet_bits)
-            ),
-            indent_level=indent_level,
+        format_addr_details(
+            core.get_network_id(addr, num_subnet_bits, addr_len),
+            num_subnet_bits,
+            indent_level,
+            addr_len,
         )
     )
 
@@ -184,26 +514,47 @@ def print_addrs_can_communicate(
             print(indent("No"))
 
 
-# Takes the appropriate action when two IP addresses are passed to the utility
-def handle_two_addrs(addr_str_1, addr_str_2):
-    bin_addr_1, num_subnet_bits_1 = parse_addr_str(addr_str_1)
-    bin_addr_2, num_subnet_bits_2 = parse_addr_str(addr_str_2)
+# Parses two IP addresses which are to be compared, raising a ValueError if
+# one is an IPv4 address and the other is an IPv6 address
+def parse_addr_pair(addr_str_1, addr_str_2):
+    addr_1 = core.Addr.from_any_str(addr_str_1)
+    addr_2 = core.Addr.from_any_str(addr_str_2)
+    if addr_1.addr_len != addr_2.addr_len:
+        raise ValueError(
+            "cannot compare {!r} with {!r} (IPv4 and IPv6 addresses)".format(
+                addr_str_1, addr_str_2
+            )
+        )
+    return addr_1, addr_2
+
 
+# Takes the appropriate action when two parsed IP addresses (core.Addr
+# objects of the same address length) are passed to the utility
+def handle_addr_pair(addr_1, addr_2):
     print("Given IP addresses:")
-    print_addr(bin_addr_1, num_subnet_bits_1)
-    print_addr(bin_addr_2, num_subnet_bits_2)
+    print_int_addr(addr_1.value, addr_1.num_subnet_bits, addr_len=addr_1.addr_len)
+    print_int_addr(addr_2.value, addr_2.num_subnet_bits, addr_len=addr_2.addr_len)
 
-    print_addrs_can_communicate(
-        bin_addr_1, num_subnet_bits_1, bin_addr_2, num_subnet_bits_2
-    )
+    if addr_1.num_subnet_bits is not None and addr_2.num_subnet_bits is not None:
+        print("Can these IP addresses communicate?")
+        print(indent("Yes" if addr_1.network_id == addr_2.network_id else "No"))
 
     print("Largest subnet mask allowing communication:")
-    largest_subnet_mask = get_largest_subnet_mask(bin_addr_1, bin_addr_2)
-    num_subnet_bits = largest_subnet_mask.count("1")
+    num_subnet_bits = core.get_largest_subnet_bits(
+        (addr_1.value, addr_2.value), addr_1.addr_len
+    )
     print(indent("{} bits".format(num_subnet_bits), indent_level=1))
-    print_addr(largest_subnet_mask)
+    print_int_addr(
+        core.get_subnet_mask(num_subnet_bits, addr_1.addr_len),
+        addr_len=addr_1.addr_len,
+    )
+
+    print_subnet_details(addr_1.value, num_subnet_bits, addr_len=addr_1.addr_len)
 
-    print_addr_details(bin_addr_1, num_subnet_bits)
+
+# Takes the appropriate action when two IP addresses are passed to the utility
+def handle_two_addrs(addr_str_1, addr_str_2):
+    handle_addr_pair(*parse_addr_pair(addr_str_1, addr_str_2))
 
 
 def get_block_network_id(bin_addr, num_subnet_bits, block_size):
@@ -214,59 +565,909 @@ def get_block_network_id(bin_addr, num_subnet_bits, block_size):
 
 # Returns a list of blocks, where each block is a tuple containing its size,
 # network ID, and number of subnet bits
+@instrument.stage(instrument.COMPUTE)
 def get_blocks(bin_addr, num_subnet_bits, block_sizes):
-    prev_block_size = 0
-    block_network_id = bin_addr
-    blocks = []
-    for block_size in reversed(sorted(block_sizes)):
-        num_block_subnet_bits = 32 - int(math.log2(block_size))
-        block_network_id = get_block_network_id(
-            block_network_id, num_subnet_bits, prev_block_size
+    return [
+        (block_size, core.int_to_bin(block_network_id), num_block_subnet_bits)
+        for block_size, block_network_id, num_block_subnet_bits in (
+            alloc.allocate_blocks(
+                core.bin_to_int(bin_addr), num_subnet_bits, block_sizes
+            )
         )
-        blocks.append((block_size, block_network_id, num_block_subnet_bits))
-        prev_block_size = block_size
+    ]
 
-    return blocks
+
+# Prints the number and size of a block
+def print_block_heading(block_num, block_size):
+    print("Block {}:".format(block_num))
+    print(
+        indent("Block Size: 2^{} = {}".format(block_size.bit_length() - 1, block_size))
+    )
 
 
 # Prints details for every sub-block created from an IP address and a sequence
-# of block sizes
+# of block sizes, followed by any space left over in the given subnet
 def print_blocks(bin_addr, num_subnet_bits, block_sizes):
-    blocks = get_blocks(bin_addr, num_subnet_bits, block_sizes)
+    print_addr_blocks(core.Addr.from_bin(bin_addr, num_subnet_bits), block_sizes)
+
+
+# Prints details for every sub-block created from the given IPv4 or IPv6
+# address (a core.Addr) and a sequence of block sizes, followed by any space
+# left over in its subnet
+def print_addr_blocks(addr, block_sizes):
+    blocks = alloc.allocate_blocks(
+        addr.value, addr.num_subnet_bits, block_sizes, addr.addr_len
+    )
     for block_num, (block_size, block_network_id, num_block_subnet_bits) in enumerate(
         blocks, 1
     ):
-        print("Block {}:".format(block_num))
-        print(
-            indent(
-                "Block Size: 2^{} = {}".format(int(math.log2(block_size)), block_size)
+        print_block_heading(block_num, block_size)
+        print_subnet_details(
+            block_network_id,
+            num_block_subnet_bits,
+            indent_level=1,
+            addr_len=addr.addr_len,
+        )
+
+    free_blocks = alloc.get_free_blocks(
+        addr.value, addr.num_subnet_bits, blocks, addr.addr_len
+    )
+    if free_blocks:
+        print("Free Space:")
+        for free_network_id, num_free_subnet_bits in free_blocks:
+            print_int_addr(
+                free_network_id, num_free_subnet_bits, addr_len=addr.addr_len
             )
+
+
+# Prints details for every block newly allocated from the given subnet (a
+# core.Addr) by the given buddy allocator, followed by all of the space which
+# is still free
+def print_allocated_blocks(addr, allocator, blocks):
+    print("Given IP address:")
+    print(format_int_addr(addr.value, addr.num_subnet_bits))
+    for block_num, (block_size, block_network_id, num_block_subnet_bits) in enumerate(
+        blocks, 1
+    ):
+        print_block_heading(block_num, block_size)
+        print(format_addr_details(block_network_id, num_block_subnet_bits, 1))
+    print("Free Space:")
+    free_blocks = allocator.get_free_blocks()
+    if not free_blocks:
+        print(indent("None"))
+    for free_network_id, num_free_subnet_bits in free_blocks:
+        print(format_int_addr(free_network_id, num_free_subnet_bits))
+
+
+# Takes the appropriate action when blocks must be allocated from (or released
+# back to) the free space of the given subnet, whose existing allocations are
+# tracked in the state file at the given path; new blocks are carved from the
+# space left over rather than replanning the subnet, so existing blocks never
+# move, and the updated allocations are written back to the state file
+def handle_state(
+    addr_str,
+    state_path,
+    block_sizes=None,
+    released_cidr_strs=None,
+    label=None,
+    output_format=formats.TEXT_FORMAT,
+):
+    addr = core.Addr.from_str(addr_str)
+    core.check_slash_notation(addr_str, addr.num_subnet_bits)
+    from cidrbrewer import buddy
+
+    with buddy.open_allocator(
+        state_path, addr.value, addr.num_subnet_bits
+    ) as allocator:
+        for cidr_str in released_cidr_strs or ():
+            allocator.release(*core.parse_cidr_str(cidr_str))
+        blocks = allocator.allocate(block_sizes or (), label)
+
+    if output_format != formats.TEXT_FORMAT:
+        formats.write_records(
+            (
+                formats.get_details_record(
+                    block_network_id,
+                    num_block_subnet_bits,
+                    address=str(addr),
+                    block_size=block_size,
+                )
+                for block_size, block_network_id, num_block_subnet_bits in blocks
+            ),
+            sys.stdout,
+            output_format,
         )
-        print_addr_details(block_network_id, num_block_subnet_bits, indent_level=1)
+        return
+    print_allocated_blocks(addr, allocator, blocks)
 
 
-# Takes the appropriate action when one IP address is passed to the utility
+# Takes the appropriate action when one IP address (which must be in slash
+# notation) is passed to the utility
 def handle_one_addr(addr_str, block_sizes=None):
-    bin_addr, num_subnet_bits = parse_addr_str(addr_str)
+    addr = core.Addr.from_any_str(addr_str)
+    core.check_slash_notation(addr_str, addr.num_subnet_bits)
+    handle_addr(addr, block_sizes)
 
+
+# Prints the given parsed IP address (a core.Addr in slash notation) followed by
+# its details, or the details of every block if block sizes are given
+def handle_addr(addr, block_sizes=None):
     print("Given IP address:")
-    print_addr(bin_addr, num_subnet_bits)
+    print_int_addr(addr.value, addr.num_subnet_bits, addr_len=addr.addr_len)
 
     if block_sizes:
-        print_blocks(bin_addr, num_subnet_bits, block_sizes)
+        print_addr_blocks(addr, block_sizes)
     else:
         print("Subnet mask:")
-        print_addr(get_subnet_mask(num_subnet_bits))
-        print_addr_details(bin_addr, num_subnet_bits)
+        print_int_addr(addr.subnet_mask, addr_len=addr.addr_len)
+        print_subnet_details(addr.value, addr.num_subnet_bits, addr_len=addr.addr_len)
 
 
-def main():
-    cli_args = parse_cli_args()
-    if cli_args.addr_str_2:
+# Yields a structured record for the given parsed IP address (a core.Addr in
+# slash notation), or one record per block if block sizes are given
+def get_addr_records(addr, block_sizes=None):
+    if not block_sizes:
+        yield formats.get_details_record(
+            addr.value, addr.num_subnet_bits, addr.addr_len, address=str(addr)
+        )
+        return
+    blocks = alloc.allocate_blocks(
+        addr.value, addr.num_subnet_bits, block_sizes, addr.addr_len
+    )
+    for block_size, block_network_id, num_block_subnet_bits in blocks:
+        yield formats.get_details_record(
+            block_network_id,
+            num_block_subnet_bits,
+            addr.addr_len,
+            address=str(addr),
+            block_size=block_size,
+        )
+
+
+# Builds a structured record for two parsed IP addresses (core.Addr objects of
+# the same address length), describing the largest subnet allowing them to
+# communicate
+def get_addr_pair_record(addr_1, addr_2):
+    if addr_1.num_subnet_bits is not None and addr_2.num_subnet_bits is not None:
+        can_communicate = addr_1.network_id == addr_2.network_id
+    else:
+        can_communicate = None
+    num_subnet_bits = core.get_largest_subnet_bits(
+        (addr_1.value, addr_2.value), addr_1.addr_len
+    )
+    return formats.get_details_record(
+        addr_1.value,
+        num_subnet_bits,
+        addr_1.addr_len,
+        address=str(addr_1),
+        address_2=str(addr_2),
+        can_communicate=can_communicate,
+    )
+
+
+# Lazily yields the structured records for every query (a tuple of one or two
+# core.Addr objects, as parsed by stream.parse_query())
+def get_query_records(queries, block_sizes=None):
+    for query in queries:
+        if len(query) == 2:
+            yield get_addr_pair_record(*query)
+        else:
+            yield from get_addr_records(query[0], block_sizes)
+
+
+# Takes the appropriate action for a single query (a tuple of one or two
+# core.Addr objects, as parsed by stream.parse_query())
+def handle_query(query, block_sizes=None):
+    if len(query) == 2:
+        handle_addr_pair(*query)
+    else:
+        handle_addr(query[0], block_sizes)
+
+
+# Takes the appropriate action when one or two IP addresses are passed to the
+# utility as command-line arguments
+def handle_addr_strs(addr_strs, block_sizes=None):
+    if len(addr_strs) == 2:
+        handle_two_addrs(*addr_strs)
+    else:
+        handle_one_addr(addr_strs[0], block_sizes)
+
+
+# Takes the appropriate action for every query (a tuple of one or two
+# core.Addr objects), writing results in the given output format through a
+# single buffered stream
+def handle_queries(queries, block_sizes=None, output_format=formats.TEXT_FORMAT):
+    with stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                get_query_records(queries, block_sizes), out, output_format
+            )
+            return
+        for query in queries:
+            handle_query(query, block_sizes)
+
+
+# Takes the appropriate action for every query (one or two IP addresses per
+# line) read from the given input file, streaming results as they are computed
+def handle_input(
+    input_path,
+    block_sizes=None,
+    output_format=formats.TEXT_FORMAT,
+    on_error=stream.FAIL_ON_ERROR,
+):
+    with stream.open_input(input_path) as input_file:
+        handle_queries(
+            stream.read_queries(input_file, on_error), block_sizes, output_format
+        )
+
+
+# Prints the subnets from the given prefix table which contain the given IP
+# address (a core.Addr), including the longest (most specific) match
+def print_lookup(table, addr):
+    print("Given IP address:")
+    print_int_addr(addr.value, addr.num_subnet_bits)
+
+    matches = table.get_matches(addr.value)
+    print("Matching subnets:")
+    if not matches:
+        print(indent("None"))
+    for network_id, num_match_subnet_bits, _ in matches:
+        print_int_addr(network_id, num_match_subnet_bits)
+
+    if matches:
+        network_id, num_match_subnet_bits, label = matches[-1]
+        print("Longest matching subnet:")
+        print_int_addr(network_id, num_match_subnet_bits)
+        if label is not None:
+            print(indent("Label: {}".format(label)))
+
+
+# Looks up every given IP address (each a core.Addr) in the prefix table
+# (either a text table or a compiled prefix database) at the given path,
+# writing results in the given output format
+def handle_lookup(table_path, addrs, output_format=formats.TEXT_FORMAT):
+    from cidrbrewer import prefixdb
+
+    with prefixdb.open_table(table_path) as table, stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            records = (
+                formats.get_lookup_record(
+                    str(addr), table.get_longest_match(addr.value)
+                )
+                for addr in addrs
+            )
+            formats.write_records(
+                records, out, output_format, formats.LOOKUP_FIELD_NAMES
+            )
+            return
+        for addr in addrs:
+            print_lookup(table, addr)
+
+
+# Takes the appropriate action when a group of any number of IP addresses
+# (each a core.Addr) is passed to the utility, computing the largest subnet
+# mask allowing every address to communicate in a single pass
+def handle_supernet(addrs, output_format=formats.TEXT_FORMAT):
+    addr_values = (addr.value for addr in addrs)
+    first_addr = next(addr_values, None)
+    if first_addr is None:
+        return
+    num_subnet_bits = core.get_largest_subnet_bits(
+        itertools.chain((first_addr,), addr_values)
+    )
+
+    if output_format != formats.TEXT_FORMAT:
+        formats.write_records(
+            [formats.get_details_record(first_addr, num_subnet_bits)],
+            sys.stdout,
+            output_format,
+        )
+        return
+
+    print("Largest subnet mask allowing communication:")
+    print(indent("{} bits".format(num_subnet_bits), indent_level=1))
+    print_int_addr(core.get_subnet_mask(num_subnet_bits))
+
+    print_subnet_details(first_addr, num_subnet_bits)
+
+
+# Prints details for every equal subnet split from the given integer IP address
+def print_split_subnets(addr, num_subnet_bits, num_subnets):
+    num_split_subnet_bits = core.get_split_subnet_bits(num_subnet_bits, num_subnets)
+    network_ids = core.split_subnet(addr, num_subnet_bits, num_subnets)
+    for subnet_num, network_id in enumerate(network_ids, 1):
+        print("Subnet {}:".format(subnet_num))
+        print_subnet_details(network_id, num_split_subnet_bits, indent_level=1)
+
+
+# Lazily yields a structured record for every equal subnet split from each of
+# the given IP addresses (each a core.Addr)
+def get_split_records(addrs, num_subnets):
+    for addr in addrs:
+        num_split_subnet_bits = core.get_split_subnet_bits(
+            addr.num_subnet_bits, num_subnets
+        )
+        for network_id in core.split_subnet(
+            addr.value, addr.num_subnet_bits, num_subnets
+        ):
+            yield formats.get_details_record(
+                network_id, num_split_subnet_bits, address=str(addr)
+            )
+
+
+# Takes the appropriate action when the given IP addresses (each a core.Addr)
+# must each be split into the given number of equal subnets
+def handle_split(addrs, num_subnets, output_format=formats.TEXT_FORMAT):
+    with stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                get_split_records(addrs, num_subnets), out, output_format
+            )
+            return
+        for addr in addrs:
+            core.check_slash_notation(str(addr), addr.num_subnet_bits)
+            print("Given IP address:")
+            print_int_addr(addr.value, addr.num_subnet_bits)
+            print_split_subnets(addr.value, addr.num_subnet_bits, num_subnets)
+
+
+# Prints every given subnet (a tuple containing its integer network ID and
+# number of subnet bits) under the given heading, or writes one record per
+# subnet in a structured output format
+def print_cidrs(
+    heading, cidrs, output_format=formats.TEXT_FORMAT, addr_len=core.ADDR_LEN
+):
+    with stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                (formats.get_cidr_record(*cidr, addr_len=addr_len) for cidr in cidrs),
+                out,
+                output_format,
+                formats.CIDR_FIELD_NAMES,
+            )
+            return
+        print(heading)
+        num_cidrs = 0
+        for network_id, num_subnet_bits in cidrs:
+            print(format_int_addr(network_id, num_subnet_bits, addr_len=addr_len))
+            num_cidrs += 1
+        if num_cidrs == 0:
+            print(indent("None"))
+
+
+# Takes the appropriate action when the given subnets (each a tuple containing
+# its integer network ID and number of subnet bits) must be collapsed into the
+# smallest set of subnets covering the same addresses
+def handle_aggregate(cidrs, output_format=formats.TEXT_FORMAT):
+    from cidrbrewer import ranges
+
+    print_cidrs("Aggregated Subnets:", ranges.aggregate_cidrs(cidrs), output_format)
+
+
+# Prints the given table entry (a tuple containing the network ID, number of
+# subnet bits and label of a subnet) followed by its label, if any
+def print_table_entry(entry, indent_level=2):
+    network_id, num_subnet_bits, label = entry
+    print(format_int_addr(network_id, num_subnet_bits, indent_level))
+    if label is not None:
+        print(indent("Label: {}".format(label), indent_level=indent_level))
+
+
+# Prints a pair of overlapping table entries, where the first contains or
+# duplicates the second
+def print_overlap(overlap_num, enclosing_entry, entry):
+    num_colliding_bits = core.ADDR_LEN - entry[1]
+    print("Overlap {}:".format(overlap_num))
+    print(indent("Subnet:"))
+    print_table_entry(enclosing_entry)
+    print(indent("Duplicated by:" if enclosing_entry[1] == entry[1] else "Contains:"))
+    print_table_entry(entry)
+    print(
+        indent(
+            "Colliding Addresses: 2^{} = {}".format(
+                num_colliding_bits, 1 << num_colliding_bits
+            )
+        )
+    )
+
+
+# Takes the appropriate action when every pair of overlapping (or duplicate)
+# subnets among the given table entries must be reported, such as to audit a
+# list of allocations
+def handle_overlaps(entries, output_format=formats.TEXT_FORMAT):
+    from cidrbrewer import ranges
+
+    overlaps = ranges.get_overlaps(entries)
+    with stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                itertools.starmap(formats.get_overlap_record, overlaps),
+                out,
+                output_format,
+                formats.OVERLAP_FIELD_NAMES,
+            )
+            return
+        num_overlaps = 0
+        for overlap_num, (enclosing_entry, entry) in enumerate(overlaps, 1):
+            print_overlap(overlap_num, enclosing_entry, entry)
+            num_overlaps = overlap_num
+        if num_overlaps == 0:
+            print("No overlapping subnets")
+
+
+# Takes the appropriate action when the space in the given subnet which is not
+# allocated by any of the given subnets (each a tuple containing its integer
+# network ID and number of subnet bits) must be listed
+def handle_free(addr_str, allocated_cidrs, output_format=formats.TEXT_FORMAT):
+    from cidrbrewer import ranges
+
+    addr = core.Addr.from_str(addr_str)
+    cidrs = ranges.get_free_cidrs(addr.value, addr.num_subnet_bits, allocated_cidrs)
+    print_cidrs("Free Space:", cidrs, output_format)
+
+
+# Takes the appropriate action when every usable host address in the given
+# subnets (each a core.Addr) must be listed (or only every stride-th one);
+# hosts are generated lazily and written as plain addresses, one per line, so
+# that even a /8 can be piped into another tool without being held in memory
+def handle_enumerate(addrs, stride=1, output_format=formats.TEXT_FORMAT):
+    with stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                get_host_records(addrs, stride),
+                out,
+                output_format,
+                formats.HOST_FIELD_NAMES,
+            )
+            return
+        for addr in addrs:
+            out.writelines(iter_host_lines(get_addr_hosts(addr, stride), addr.addr_len))
+
+
+# Returns a lazy sequence of every usable host address in the subnet containing
+# the given Addr, which must be in slash notation
+def get_addr_hosts(addr, stride=1):
+    core.check_slash_notation(str(addr), addr.num_subnet_bits)
+    return core.get_hosts(addr.value, addr.num_subnet_bits, stride, addr.addr_len)
+
+
+# Lazily yields the given host addresses (a range) as lines of text; IPv4
+# addresses are rendered a /24 at a time, formatting the first three octets
+# once per block rather than once per address
+def iter_host_lines(hosts, addr_len=core.ADDR_LEN):
+    if addr_len != core.ADDR_LEN:
+        for host in hosts:
+            yield core.int_to_ipv6(host) + "\n"
+        return
+    host = hosts.start
+    while host < hosts.stop:
+        block_network_id = host & ~0xFF
+        octets = range(
+            host - block_network_id,
+            min(hosts.stop - block_network_id, 1 << 8),
+            hosts.step,
+        )
+        prefix = core.int_to_dotted(block_network_id)[:-1]
+        yield "".join([prefix + OCTET_LINES[octet] for octet in octets])
+        host += len(octets) * hosts.step
+
+
+# Lazily yields a structured record for every usable host address in the given
+# subnets (each a core.Addr), or only every stride-th one
+def get_host_records(addrs, stride=1):
+    for addr in addrs:
+        hosts = get_addr_hosts(addr, stride)
+        subnet_str = "{}/{}".format(
+            core.int_to_str(addr.network_id, addr.addr_len), addr.num_subnet_bits
+        )
+        for host in hosts:
+            yield formats.get_host_record(subnet_str, host, addr.addr_len)
+
+
+# Lazily yields the minimal list of subnets exactly covering each of the given
+# ranges (see stream.parse_range_line()), all of which must be of the given
+# address length
+def get_range_cidrs(ranges_, addr_len=core.ADDR_LEN):
+    from cidrbrewer import ranges
+
+    for start_addr, end_addr, range_addr_len in ranges_:
+        if range_addr_len != addr_len:
+            raise ValueError(
+                "cannot mix IPv4 and IPv6 ranges ({} {})".format(
+                    core.int_to_str(start_addr, range_addr_len),
+                    core.int_to_str(end_addr, range_addr_len),
+                )
+            )
+        yield from ranges.range_to_cidrs(start_addr, end_addr, addr_len)
+
+
+# Takes the appropriate action when the given ranges of IP addresses (each a
+# tuple containing its integer start and end addresses and its address length)
+# must be decomposed into the minimal list of subnets covering them, such as to
+# write ACLs
+def handle_range(ranges_, output_format=formats.TEXT_FORMAT):
+    ranges_ = iter(ranges_)
+    first_range = next(ranges_, None)
+    if first_range is None:
+        return
+    addr_len = first_range[2]
+    print_cidrs(
+        "Subnets:",
+        get_range_cidrs(itertools.chain((first_range,), ranges_), addr_len),
+        output_format,
+        addr_len,
+    )
+
+
+# Takes the appropriate action when the given set operation (union,
+# intersection or difference) must be applied to the given lists of subnets
+# (each a tuple containing its integer network ID and number of subnet bits),
+# such as to diff firewall allowlists
+def handle_set_operation(
+    operation,
+    cidrs_1,
+    cidrs_2,
+    presorted=False,
+    output_format=formats.TEXT_FORMAT,
+):
+    from cidrbrewer import ranges
+
+    cidrs = ranges.apply_set_operation(operation, cidrs_1, cidrs_2, presorted)
+    print_cidrs("{}:".format(operation.capitalize()), cidrs, output_format)
+
+
+# Returns the IP addresses passed as positional command-line arguments
+def get_cli_addr_strs(cli_args):
+    return tuple(filter(None, (cli_args.addr_str_1, cli_args.addr_str_2)))
+
+
+# Opens the IP addresses to process, each parsed into a core.Addr, which are
+# either read lazily from the input file (one per line) or passed as positional
+# command-line arguments; IPv6 addresses are malformed unless allow_ipv6 is
+# True
+@contextlib.contextmanager
+def open_cli_addrs(cli_args, allow_ipv6=False):
+    if cli_args.input is None:
+        parse_addr = core.Addr.from_any_str if allow_ipv6 else core.Addr.from_str
+        yield tuple(map(parse_addr, get_cli_addr_strs(cli_args)))
+    else:
+        with stream.open_input(cli_args.input) as input_file:
+            yield stream.read_addrs(input_file, cli_args.on_error, allow_ipv6)
+
+
+# Opens the subnets to process, which are either read lazily from the input
+# file (one per line) or passed as positional command-line arguments, parsing
+# each into a tuple containing its integer network ID and number of subnet
+# bits
+@contextlib.contextmanager
+def open_cli_cidrs(cli_args):
+    if cli_args.input is None:
+        yield map(core.parse_cidr_str, get_cli_addr_strs(cli_args))
+    else:
+        with stream.open_input(cli_args.input) as input_file:
+            yield stream.read_cidrs(input_file, cli_args.on_error)
+
+
+# Opens the table entries to process (see trie.parse_table_line()), which are
+# either read lazily from the input file (one subnet per line, optionally
+# followed by a label) or passed as positional command-line arguments
+@contextlib.contextmanager
+def open_cli_table_entries(cli_args):
+    from cidrbrewer import trie
+
+    if cli_args.input is None:
+        yield map(trie.parse_table_line, get_cli_addr_strs(cli_args))
+    else:
+        with stream.open_input(cli_args.input) as input_file:
+            yield stream.parse_lines(
+                input_file, trie.parse_table_line, cli_args.on_error
+            )
+
+
+# Computes the output for a chunk of query lines (each a tuple containing its
+# line number and contents) from the given input file in a worker process, so
+# that lines are parsed and validated in parallel rather than by the parent;
+# returns a tuple containing the output as a string, so that the parent process
+# can write chunks in any order, and the InputError raised by the first
+# malformed line (or None), so that the output preceding it is still written
+# when the error policy is to fail; any header is written once by the parent
+# process instead; workers need not share the parent's globals, so the display
+# setting is passed along explicitly
+def get_query_chunk_output(
+    numbered_lines,
+    input_name,
+    on_error,
+    block_sizes,
+    output_format,
+    show_bin_addrs_in_chunk=True,
+):
+    if show_bin_addrs_in_chunk != show_bin_addrs:
+        set_show_bin_addrs(show_bin_addrs_in_chunk)
+    queries = stream.parse_numbered_lines(
+        numbered_lines, stream.parse_query, on_error, input_name
+    )
+    out = io.StringIO()
+    try:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                get_query_records(queries, block_sizes),
+                out,
+                output_format,
+                write_header=False,
+            )
+        else:
+            with contextlib.redirect_stdout(out):
+                for query in queries:
+                    handle_query(query, block_sizes)
+    except stream.InputError as error:
+        return out.getvalue(), error
+    return out.getvalue(), None
+
+
+# Takes the appropriate action for every query read from the given input file,
+# sharding the raw query lines across a pool of worker processes in chunks (of
+# parallel.DEFAULT_CHUNK_SIZE lines unless a chunk size is given)
+def handle_input_parallel(
+    input_path,
+    block_sizes=None,
+    output_format=formats.TEXT_FORMAT,
+    num_jobs=0,
+    chunk_size=None,
+    ordered=True,
+    on_error=stream.FAIL_ON_ERROR,
+):
+    from cidrbrewer import parallel
+
+    if chunk_size is None:
+        chunk_size = parallel.DEFAULT_CHUNK_SIZE
+    with stream.open_input(input_path) as input_file, stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records([], out, output_format)
+        chunk_outputs = parallel.map_chunks(
+            get_query_chunk_output,
+            stream.read_numbered_lines(input_file),
+            stream.get_input_name(input_file),
+            on_error,
+            block_sizes,
+            output_format,
+            show_bin_addrs,
+            num_jobs=num_jobs,
+            chunk_size=chunk_size,
+            ordered=ordered,
+        )
+        for chunk_output, error in chunk_outputs:
+            out.write(chunk_output)
+            if error is not None:
+                raise error
+
+
+# Lazily yields a structured record for every address in the given buffer of
+# packed records, decoding and computing subnet details in vectorized chunks
+def get_packed_records(buffer, with_prefix=False, num_subnet_bits=core.ADDR_LEN):
+    from cidrbrewer import bulk, packed
+
+    for chunk_addrs, chunk_num_subnet_bits in packed.iter_packed_arrays(
+        buffer, PACKED_CHUNK_SIZE, with_prefix, num_subnet_bits
+    ):
+        yield from formats.get_bulk_records(
+            chunk_addrs,
+            chunk_num_subnet_bits,
+            bulk.get_subnets(chunk_addrs, chunk_num_subnet_bits),
+        )
+
+
+# Takes the appropriate action for every address in the given file of packed
+# binary addresses (each a 4-byte big-endian integer, optionally followed by a
+# 1-byte number of subnet bits), which is memory-mapped rather than read
+def handle_packed_input(
+    input_path,
+    with_prefix=False,
+    num_subnet_bits=core.ADDR_LEN,
+    output_format=formats.TEXT_FORMAT,
+):
+    from cidrbrewer import packed
+
+    with packed.open_packed(input_path) as buffer, stream.buffered_stdout() as out:
+        if output_format != formats.TEXT_FORMAT:
+            formats.write_records(
+                get_packed_records(buffer, with_prefix, num_subnet_bits),
+                out,
+                output_format,
+            )
+            return
+        for addr, addr_num_subnet_bits in packed.iter_packed(
+            buffer, with_prefix, num_subnet_bits
+        ):
+            handle_addr(core.Addr(addr, addr_num_subnet_bits))
+
+
+# Takes the appropriate action for the given command-line arguments
+def handle_cli_args(cli_args):
+    if cli_args.serve is not None:
+        # The server (and asyncio along with it) is only imported when serving
+        from cidrbrewer import server
+
+        server.serve(
+            cli_args.serve,
+            functools.partial(get_query_records, block_sizes=cli_args.block_sizes),
+        )
+    elif cli_args.compile is not None:
+        from cidrbrewer import prefixdb
+
+        prefixdb.compile_table_path(cli_args.lookup, cli_args.compile)
+    elif cli_args.lookup is not None:
+        with open_cli_addrs(cli_args) as addrs:
+            handle_lookup(cli_args.lookup, addrs, cli_args.format)
+    elif cli_args.enumerate:
+        with open_cli_addrs(cli_args, allow_ipv6=True) as addrs:
+            handle_enumerate(addrs, cli_args.stride, cli_args.format)
+    elif cli_args.range:
+        if cli_args.input is None:
+            handle_range(
+                [stream.parse_range_addr_strs(get_cli_addr_strs(cli_args))],
+                cli_args.format,
+            )
+        else:
+            with stream.open_input(cli_args.input) as input_file:
+                handle_range(
+                    stream.read_ranges(input_file, cli_args.on_error), cli_args.format
+                )
+    elif cli_args.set_operation is not None:
+        with open_cli_cidrs(cli_args) as cidrs_1:
+            with stream.open_input(cli_args.set_operand) as operand_file:
+                handle_set_operation(
+                    cli_args.set_operation,
+                    cidrs_1,
+                    stream.read_cidrs(operand_file, cli_args.on_error),
+                    cli_args.sorted,
+                    cli_args.format,
+                )
+    elif cli_args.overlaps:
+        with open_cli_table_entries(cli_args) as entries:
+            handle_overlaps(entries, cli_args.format)
+    elif cli_args.supernet:
+        with open_cli_addrs(cli_args) as addrs:
+            handle_supernet(addrs, cli_args.format)
+    elif cli_args.aggregate:
+        with open_cli_cidrs(cli_args) as cidrs:
+            handle_aggregate(cidrs, cli_args.format)
+    elif cli_args.free is not None:
+        with stream.open_input(cli_args.free) as allocated_file:
+            handle_free(
+                cli_args.addr_str_1,
+                stream.read_cidrs(allocated_file, cli_args.on_error),
+                cli_args.format,
+            )
+    elif cli_args.state is not None:
+        handle_state(
+            cli_args.addr_str_1,
+            cli_args.state,
+            cli_args.block_sizes,
+            cli_args.release,
+            cli_args.label,
+            cli_args.format,
+        )
+    elif cli_args.num_subnets is not None:
+        with open_cli_addrs(cli_args) as addrs:
+            handle_split(addrs, cli_args.num_subnets, cli_args.format)
+    elif cli_args.input_format != TEXT_INPUT_FORMAT:
+        handle_packed_input(
+            cli_args.input,
+            with_prefix=cli_args.input_format == PACKED_PREFIX_INPUT_FORMAT,
+            num_subnet_bits=cli_args.prefix_len,
+            output_format=cli_args.format,
+        )
+    elif cli_args.input is not None and cli_args.jobs != 1:
+        handle_input_parallel(
+            cli_args.input,
+            cli_args.block_sizes,
+            cli_args.format,
+            num_jobs=cli_args.jobs,
+            chunk_size=cli_args.chunk_size,
+            ordered=not cli_args.unordered,
+            on_error=cli_args.on_error,
+        )
+    elif cli_args.input is not None:
+        handle_input(
+            cli_args.input, cli_args.block_sizes, cli_args.format, cli_args.on_error
+        )
+    elif cli_args.format != formats.TEXT_FORMAT:
+        handle_queries(
+            [stream.parse_query_addr_strs(get_cli_addr_strs(cli_args))],
+            cli_args.block_sizes,
+            cli_args.format,
+        )
+    elif cli_args.addr_str_2:
         handle_two_addrs(cli_args.addr_str_1, cli_args.addr_str_2)
     else:
         handle_one_addr(cli_args.addr_str_1, cli_args.block_sizes)
 
 
+# Prints the number of calls to and time spent in every stage to stderr
+def print_profile():
+    elapsed_seconds = instrument.get_elapsed_seconds()
+    stage_seconds = 0.0
+    for stage_name, stats in instrument.get_stats().items():
+        print(
+            "profile: {}: {} calls, {:.3f}s".format(
+                stage_name, stats.calls, stats.seconds
+            ),
+            file=sys.stderr,
+        )
+        stage_seconds += stats.seconds
+    print(
+        "profile: other: {:.3f}s".format(max(elapsed_seconds - stage_seconds, 0.0)),
+        file=sys.stderr,
+    )
+    print("profile: total: {:.3f}s".format(elapsed_seconds), file=sys.stderr)
+
+
+# Prints the hit and miss counts of every cache to stderr
+def print_cache_stats():
+    for func_name, cache_info in cache.get_cache_stats().items():
+        print(
+            "{}: {} hits, {} misses, {}/{} entries".format(
+                func_name,
+                cache_info.hits,
+                cache_info.misses,
+                cache_info.currsize,
+                cache_info.maxsize,
+            ),
+            file=sys.stderr,
+        )
+
+
+# Returns the given command-line arguments as a query if they consist of just
+# one or two IP addresses without any options (by far the most common
+# invocation); otherwise, returns None
+def get_bare_query(argv):
+    if 1 <= len(argv) <= 2 and not any(arg.startswith("-") for arg in argv):
+        return tuple(argv)
+    return None
+
+
+# Calls the given handler with the given arguments, reporting malformed
+# addresses, impossible requests (like blocks which do not fit in their subnet)
+# and files which cannot be opened as a single line rather than a traceback
+def run_handler(handler, *args):
+    try:
+        handler(*args)
+    except ValueError as error:
+        sys.exit("{}: error: {}".format(PROGRAM_NAME, error))
+    except OSError as error:
+        if error.filename is None:
+            sys.exit("{}: error: {}".format(PROGRAM_NAME, error))
+        sys.exit(
+            "{}: error: {}: {}".format(PROGRAM_NAME, error.filename, error.strerror)
+        )
+
+
+def main():
+    # Bare queries are handled without building the argument parser, since
+    # doing so would cost more than the query itself
+    bare_query = get_bare_query(sys.argv[1:])
+    if bare_query is not None:
+        run_handler(handle_addr_strs, bare_query)
+        return
+    cli_args = parse_cli_args()
+    if cli_args.cache_size != cache.DEFAULT_CACHE_SIZE:
+        cache.set_cache_size(cli_args.cache_size)
+    if not cli_args.show_bin_addrs:
+        set_show_bin_addrs(False)
+    if cli_args.profile:
+        # Instrumentation rebinds memoized functions as currently bound, so it
+        # is enabled only once the cache size is set
+        instrument.enable()
+        with contextlib.redirect_stdout(instrument.wrap_output(sys.stdout)):
+            try:
+                run_handler(handle_cli_args, cli_args)
+            finally:
+                print_profile()
+    else:
+        run_handler(handle_cli_args, cli_args)
+    if cli_args.cache_stats:
+        print_cache_stats()
+
+
 if __name__ == "__main__":
     main()
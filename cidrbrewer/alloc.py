@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+from cidrbrewer import core, instrument, ranges
+
+# The number of addresses in every block which cannot be assigned to hosts (the
+# network ID and broadcast ID)
+NUM_RESERVED_ADDRS = 2
+
+
+# Rounds the given block size up to the nearest valid (power-of-two) block size
+def get_block_size(block_size):
+    if block_size < 1:
+        raise ValueError("block size must be at least 1")
+    return 1 << (block_size - 1).bit_length()
+
+
+# Computes the smallest valid block size with room for the given number of
+# hosts
+def get_host_block_size(num_hosts):
+    return get_block_size(num_hosts + NUM_RESERVED_ADDRS)
+
+
+# Computes the number of subnet bits used by a block of the given (valid) size
+def get_block_subnet_bits(block_size, addr_len=core.ADDR_LEN):
+    return addr_len - (block_size.bit_length() - 1)
+
+
+# Allocates a block of each given size (rounded up to a valid block size) from
+# the subnet containing the given integer address; returns a list of blocks,
+# where each block is a tuple containing its size, integer network ID, and
+# number of subnet bits; because every block size is a power of two, packing
+# the blocks from largest to smallest keeps every block aligned and leaves no
+# gaps, so the blocks fit if and only if their total size fits in the subnet
+@instrument.stage(instrument.COMPUTE)
+def allocate_blocks(addr, num_subnet_bits, block_sizes, addr_len=core.ADDR_LEN):
+    if num_subnet_bits is None:
+        raise ValueError("a subnet in slash notation is required to allocate blocks")
+    block_sizes = sorted(map(get_block_size, block_sizes), reverse=True)
+    subnet_size = 1 << (addr_len - num_subnet_bits)
+    total_block_size = sum(block_sizes)
+    if total_block_size > subnet_size:
+        raise ValueError(
+            "blocks totaling {} addresses do not fit in a /{} ({} addresses)".format(
+                total_block_size, num_subnet_bits, subnet_size
+            )
+        )
+    block_network_id = core.get_network_id(addr, num_subnet_bits, addr_len)
+    blocks = []
+    for block_size in block_sizes:
+        blocks.append(
+            (block_size, block_network_id, get_block_subnet_bits(block_size, addr_len))
+        )
+        block_network_id += block_size
+    return blocks
+
+
+# Computes the minimal list of subnets (each a tuple containing its integer
+# network ID and number of subnet bits) covering the space in the subnet
+# containing the given integer address which is left over after allocating
+# the given blocks (as returned by allocate_blocks())
+@instrument.stage(instrument.COMPUTE)
+def get_free_blocks(addr, num_subnet_bits, blocks, addr_len=core.ADDR_LEN):
+    free_addr = core.get_network_id(addr, num_subnet_bits, addr_len)
+    if blocks:
+        block_size, block_network_id, _ = blocks[-1]
+        free_addr = block_network_id + block_size
+    return list(
+        ranges.range_to_cidrs(
+            free_addr, core.get_broadcast_id(addr, num_subnet_bits, addr_len), addr_len
+        )
+    )
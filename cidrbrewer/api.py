@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import collections
+
+from cidrbrewer import alloc, core
+
+# The fields of a SubnetDetails which hold an integer address, any of which can
+# be rendered as a string
+ADDR_FIELD_NAMES = (
+    "addr",
+    "subnet_mask",
+    "network_id",
+    "broadcast_id",
+    "first_available_addr",
+    "last_available_addr",
+)
+
+
+# The details of an IP address and the subnet containing it; every field is an
+# integer, and strings are only rendered when asked for (see to_str() and
+# to_bin()), so results are cheap to build and hold
+class SubnetDetails(
+    collections.namedtuple(
+        "SubnetDetails",
+        (
+            "addr",
+            "num_subnet_bits",
+            "network_id",
+            "broadcast_id",
+            "first_available_addr",
+            "last_available_addr",
+            "subnet_size",
+            "addr_len",
+        ),
+    )
+):
+    __slots__ = ()
+
+    # Builds the details of the given integer address in the subnet with the
+    # given number of subnet bits
+    @classmethod
+    def from_int(cls, addr, num_subnet_bits, addr_len=core.ADDR_LEN):
+        return cls(
+            addr,
+            num_subnet_bits,
+            core.get_network_id(addr, num_subnet_bits, addr_len),
+            core.get_broadcast_id(addr, num_subnet_bits, addr_len),
+            core.get_first_available_addr(addr, num_subnet_bits, addr_len),
+            core.get_last_available_addr(addr, num_subnet_bits, addr_len),
+            core.get_subnet_size(num_subnet_bits, addr_len),
+            addr_len,
+        )
+
+    @property
+    def subnet_mask(self):
+        return core.get_subnet_mask(self.num_subnet_bits, self.addr_len)
+
+    # The total number of addresses in the subnet, including the network and
+    # broadcast IDs
+    @property
+    def num_addrs(self):
+        return 1 << (self.addr_len - self.num_subnet_bits)
+
+    # Returns True if this is an IPv6 address; otherwise, returns False
+    def is_ipv6(self):
+        return self.addr_len == core.IPV6_ADDR_LEN
+
+    # Returns True if the address is reserved (i.e. it is the network ID or
+    # broadcast ID); otherwise, returns False
+    def is_reserved(self):
+        return core.is_reserved(self.addr, self.num_subnet_bits, self.addr_len)
+
+    # Renders the given address field as a dotted-decimal (or IPv6) address
+    def to_str(self, field_name="addr"):
+        return core.int_to_str(self.get_addr_field(field_name), self.addr_len)
+
+    # Renders the given address field as a binary string with one character
+    # per bit
+    def to_bin(self, field_name="addr"):
+        return format(self.get_addr_field(field_name), "0{}b".format(self.addr_len))
+
+    def get_addr_field(self, field_name):
+        if field_name not in ADDR_FIELD_NAMES:
+            raise ValueError("{!r} is not an address field".format(field_name))
+        return getattr(self, field_name)
+
+    def __str__(self):
+        return "{}/{}".format(self.to_str(), self.num_subnet_bits)
+
+
+# The result of comparing two IP addresses: the details of each (None if it is
+# not in slash notation, since its subnet is unknown), whether they are in the
+# same subnet (None unless both are in slash notation) and the details of the
+# smallest subnet containing both
+class Comparison(
+    collections.namedtuple(
+        "Comparison", ("addr_1", "addr_2", "can_communicate", "supernet")
+    )
+):
+    __slots__ = ()
+
+    # The largest number of subnet bits allowing both addresses to communicate
+    @property
+    def num_subnet_bits(self):
+        return self.supernet.num_subnet_bits
+
+
+# The result of allocating blocks from a subnet: the details of every block
+# (from largest to smallest) and of the subnets covering the space left over
+Allocation = collections.namedtuple("Allocation", ("blocks", "free_blocks"))
+
+
+# Parses the given IPv4 or IPv6 address string (in slash notation) into a tuple
+# containing its integer address, number of subnet bits, and address length,
+# raising an AddrParseError if it is malformed or is not in slash notation
+# (since the subnet of a bare address is unknown)
+def parse_subnet_str(addr_str):
+    addr, num_subnet_bits, addr_len = core.parse_any_addr(addr_str)
+    if num_subnet_bits is None:
+        raise core.AddrParseError(
+            "expected a subnet in slash notation but found {!r}".format(addr_str)
+        )
+    return addr, num_subnet_bits, addr_len
+
+
+# Returns the details of the given IPv4 or IPv6 address (in slash notation) and
+# the subnet containing it, raising an AddrParseError if the address is
+# malformed or is not in slash notation
+def get_details(addr_str):
+    return SubnetDetails.from_int(*parse_subnet_str(addr_str))
+
+
+# Returns the details of the given parsed address (a core.Addr) and the subnet
+# containing it, or None if it is not in slash notation
+def get_addr_details(addr):
+    if addr.num_subnet_bits is None:
+        return None
+    return SubnetDetails.from_int(addr.value, addr.num_subnet_bits, addr.addr_len)
+
+
+# Compares the given IP addresses (both IPv4 or both IPv6, each optionally in
+# slash notation), raising a ValueError if either is malformed or they are of
+# different versions
+def compare(addr_str_1, addr_str_2):
+    addr_1 = core.Addr.from_any_str(addr_str_1)
+    addr_2 = core.Addr.from_any_str(addr_str_2)
+    if addr_1.addr_len != addr_2.addr_len:
+        raise ValueError(
+            "cannot compare {!r} with {!r} (IPv4 and IPv6 addresses)".format(
+                addr_str_1, addr_str_2
+            )
+        )
+    if addr_1.num_subnet_bits is not None and addr_2.num_subnet_bits is not None:
+        can_communicate = addr_1.network_id == addr_2.network_id
+    else:
+        can_communicate = None
+    return Comparison(
+        get_addr_details(addr_1),
+        get_addr_details(addr_2),
+        can_communicate,
+        SubnetDetails.from_int(
+            addr_1.value,
+            core.get_largest_subnet_bits((addr_1.value, addr_2.value), addr_1.addr_len),
+            addr_1.addr_len,
+        ),
+    )
+
+
+# Allocates a block of each given size (rounded up to a power of two) from the
+# subnet containing the given IP address (in slash notation), raising a
+# ValueError if the address is malformed or the blocks do not fit
+def allocate(addr_str, block_sizes):
+    addr, num_subnet_bits, addr_len = parse_subnet_str(addr_str)
+    blocks = alloc.allocate_blocks(addr, num_subnet_bits, block_sizes, addr_len)
+    return Allocation(
+        tuple(
+            SubnetDetails.from_int(network_id, block_subnet_bits, addr_len)
+            for _, network_id, block_subnet_bits in blocks
+        ),
+        tuple(
+            SubnetDetails.from_int(network_id, free_subnet_bits, addr_len)
+            for network_id, free_subnet_bits in alloc.get_free_blocks(
+                addr, num_subnet_bits, blocks, addr_len
+            )
+        ),
+    )
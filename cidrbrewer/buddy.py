@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+import contextlib
+import heapq
+import os
+
+from cidrbrewer import alloc, core, stream, trie
+
+
+# A buddy allocator of blocks from a parent subnet, which carves new blocks
+# from the remaining free space without moving existing blocks; the free space
+# is kept as aligned blocks indexed by prefix length, so allocating a block
+# takes a heap pop per prefix length searched, and releasing a block merges it
+# with its buddy (the other half of the block containing both) whenever the
+# buddy is also free
+class BuddyAllocator(object):
+    __slots__ = (
+        "network_id",
+        "num_subnet_bits",
+        "addr_len",
+        "allocations",
+        "free_network_ids",
+        "free_heaps",
+    )
+
+    def __init__(self, addr, num_subnet_bits, addr_len=core.ADDR_LEN):
+        self.network_id = core.get_network_id(addr, num_subnet_bits, addr_len)
+        self.num_subnet_bits = num_subnet_bits
+        self.addr_len = addr_len
+        # Every allocated block, keyed by its network ID (which is unique since
+        # blocks never overlap), as a tuple containing its number of subnet
+        # bits and label
+        self.allocations = {}
+        # The network IDs of the free blocks of every prefix length, both as a
+        # set (the source of truth) and as a min-heap (which may also contain
+        # stale network IDs, skipped when popped) for finding the lowest one
+        self.free_network_ids = {
+            bits: set() for bits in range(num_subnet_bits, addr_len + 1)
+        }
+        self.free_heaps = {bits: [] for bits in range(num_subnet_bits, addr_len + 1)}
+        self.add_free_block(self.network_id, num_subnet_bits)
+
+    def __len__(self):
+        return len(self.allocations)
+
+    # Adds the given block to the free space without merging it with its buddy
+    def add_free_block(self, network_id, num_subnet_bits):
+        self.free_network_ids[num_subnet_bits].add(network_id)
+        heapq.heappush(self.free_heaps[num_subnet_bits], network_id)
+
+    # Returns the given block to the free space, merging it with its buddy
+    # (repeatedly) while the buddy is also free
+    def free_block(self, network_id, num_subnet_bits):
+        while num_subnet_bits > self.num_subnet_bits:
+            buddy_network_id = network_id ^ (1 << (self.addr_len - num_subnet_bits))
+            free_network_ids = self.free_network_ids[num_subnet_bits]
+            if buddy_network_id not in free_network_ids:
+                break
+            free_network_ids.remove(buddy_network_id)
+            network_id = min(network_id, buddy_network_id)
+            num_subnet_bits -= 1
+        self.add_free_block(network_id, num_subnet_bits)
+
+    # Removes and returns the lowest free block with the given prefix length,
+    # or None if there is none
+    def pop_free_block(self, num_subnet_bits):
+        free_network_ids = self.free_network_ids[num_subnet_bits]
+        free_heap = self.free_heaps[num_subnet_bits]
+        while free_heap:
+            network_id = heapq.heappop(free_heap)
+            if network_id in free_network_ids:
+                free_network_ids.remove(network_id)
+                return network_id
+        return None
+
+    # Splits the given free block (already removed from the free space) down
+    # to the given prefix length, keeping the half containing the given
+    # network ID and freeing the other half at every step
+    def split_block(self, network_id, num_subnet_bits, target_network_id, target_bits):
+        while num_subnet_bits < target_bits:
+            num_subnet_bits += 1
+            half_size = 1 << (self.addr_len - num_subnet_bits)
+            if target_network_id & half_size:
+                self.add_free_block(network_id, num_subnet_bits)
+                network_id += half_size
+            else:
+                self.add_free_block(network_id + half_size, num_subnet_bits)
+        return network_id
+
+    # Allocates a block of the given number of subnet bits from the smallest
+    # free block large enough to hold it (the lowest, if tied), raising a
+    # ValueError if there is none
+    def allocate_block(self, num_subnet_bits, label=None):
+        for free_bits in range(num_subnet_bits, self.num_subnet_bits - 1, -1):
+            network_id = self.pop_free_block(free_bits)
+            if network_id is not None:
+                network_id = self.split_block(
+                    network_id, free_bits, network_id, num_subnet_bits
+                )
+                self.allocations[network_id] = (num_subnet_bits, label)
+                return network_id
+        raise ValueError(
+            "no free block of {} addresses left in {}/{}".format(
+                1 << (self.addr_len - num_subnet_bits),
+                core.int_to_str(self.network_id, self.addr_len),
+                self.num_subnet_bits,
+            )
+        )
+
+    # Allocates a block of each given size (rounded up to a valid block size),
+    # from largest to smallest; returns a list of blocks in the same form as
+    # alloc.allocate_blocks(); if any block does not fit, none are allocated
+    def allocate(self, block_sizes, label=None):
+        blocks = []
+        try:
+            for block_size in sorted(
+                map(alloc.get_block_size, block_sizes), reverse=True
+            ):
+                num_block_subnet_bits = alloc.get_block_subnet_bits(
+                    block_size, self.addr_len
+                )
+                blocks.append(
+                    (
+                        block_size,
+                        self.allocate_block(num_block_subnet_bits, label),
+                        num_block_subnet_bits,
+                    )
+                )
+        except ValueError:
+            for _, block_network_id, num_block_subnet_bits in blocks:
+                self.release(block_network_id, num_block_subnet_bits)
+            raise
+        return blocks
+
+    # Marks the given block (such as one read from a state file) as allocated,
+    # raising a ValueError if any of it is not free
+    def reserve(self, network_id, num_subnet_bits, label=None):
+        for free_bits in range(num_subnet_bits, self.num_subnet_bits - 1, -1):
+            free_network_id = core.get_network_id(network_id, free_bits, self.addr_len)
+            free_network_ids = self.free_network_ids[free_bits]
+            if free_network_id in free_network_ids:
+                free_network_ids.remove(free_network_id)
+                self.split_block(
+                    free_network_id, free_bits, network_id, num_subnet_bits
+                )
+                self.allocations[network_id] = (num_subnet_bits, label)
+                return
+        raise ValueError(
+            "{}/{} is not free in {}/{}".format(
+                core.int_to_str(network_id, self.addr_len),
+                num_subnet_bits,
+                core.int_to_str(self.network_id, self.addr_len),
+                self.num_subnet_bits,
+            )
+        )
+
+    # Returns the given allocated block to the free space, raising a
+    # ValueError if it was not allocated
+    def release(self, network_id, num_subnet_bits):
+        allocation = self.allocations.get(network_id)
+        if allocation is None or allocation[0] != num_subnet_bits:
+            raise ValueError(
+                "{}/{} is not allocated".format(
+                    core.int_to_str(network_id, self.addr_len), num_subnet_bits
+                )
+            )
+        del self.allocations[network_id]
+        self.free_block(network_id, num_subnet_bits)
+
+    # Returns a list of every allocated block (each a tuple containing its
+    # network ID, number of subnet bits and label), sorted by network ID
+    def get_allocations(self):
+        return [
+            (network_id, num_subnet_bits, label)
+            for network_id, (num_subnet_bits, label) in sorted(self.allocations.items())
+        ]
+
+    # Returns a list of every free block (each a tuple containing its network
+    # ID and number of subnet bits), sorted by network ID
+    def get_free_blocks(self):
+        return sorted(
+            (network_id, num_subnet_bits)
+            for num_subnet_bits, free_network_ids in self.free_network_ids.items()
+            for network_id in free_network_ids
+        )
+
+
+# The start of the comment line at the top of every state file recording the
+# parent subnet from which its blocks were allocated; being a comment, it is
+# skipped by trie.load_table(), so state files can still be used as tables
+PARENT_HEADER = "# parent: "
+
+
+# Returns the parent subnet of the given allocator in slash notation
+def get_parent_str(allocator):
+    return "{}/{}".format(
+        core.int_to_dotted(allocator.network_id), allocator.num_subnet_bits
+    )
+
+
+# Returns the parent subnet (in slash notation) recorded in the header of the
+# given state file, or None if it has no header (such as when it was written
+# by hand); the file is rewound afterward
+def read_parent_header(state_file):
+    header = state_file.readline()
+    state_file.seek(0)
+    if not header.startswith(PARENT_HEADER):
+        return None
+    return header[len(PARENT_HEADER) :].strip()
+
+
+# Builds an allocator for the subnet containing the given integer address from
+# the state file at the given path (in the format read by trie.load_table():
+# one allocated block per line, optionally followed by a label); a missing
+# state file means nothing has been allocated yet, and a state file recording
+# a different parent subnet is rejected with a ValueError rather than
+# reinterpreted
+def load_allocator(state_path, addr, num_subnet_bits):
+    allocator = BuddyAllocator(addr, num_subnet_bits)
+    parent_str = get_parent_str(allocator)
+    with contextlib.suppress(FileNotFoundError):
+        with open(state_path, "r") as state_file:
+            state_parent_str = read_parent_header(state_file)
+            if state_parent_str is not None and state_parent_str != parent_str:
+                raise ValueError(
+                    "{} records blocks of {}, not {}".format(
+                        state_path, state_parent_str, parent_str
+                    )
+                )
+            for network_id, block_subnet_bits, label in stream.parse_lines(
+                state_file, trie.parse_table_line
+            ):
+                allocator.reserve(network_id, block_subnet_bits, label)
+    return allocator
+
+
+# Writes every block allocated by the given allocator to the state file at the
+# given path, preceded by a header recording its parent subnet; like
+# prefixdb.compile_table_path(), the state is written to a temporary file which
+# then replaces the existing state in a single step, so an interrupted write
+# never loses allocations
+def save_allocator(allocator, state_path):
+    tmp_state_path = "{}.tmp{}".format(state_path, os.getpid())
+    try:
+        with open(tmp_state_path, "w") as state_file:
+            state_file.write(PARENT_HEADER + get_parent_str(allocator) + "\n")
+            for network_id, num_subnet_bits, label in allocator.get_allocations():
+                cidr_str = "{}/{}".format(
+                    core.int_to_dotted(network_id), num_subnet_bits
+                )
+                if label is None:
+                    state_file.write(cidr_str + "\n")
+                else:
+                    state_file.write("{} {}\n".format(cidr_str, label))
+        os.replace(tmp_state_path, state_path)
+    finally:
+        if os.path.exists(tmp_state_path):
+            os.remove(tmp_state_path)
+
+
+# Holds an exclusive lock on the state file at the given path, so that
+# concurrent runs (such as automation jobs sharing a state file) load, update
+# and save it one at a time rather than losing each other's allocations or
+# handing out the same block twice; the lock is taken on a separate lock file
+# next to the state file, since the state file itself is replaced on every save
+@contextlib.contextmanager
+def lock_state(state_path):
+    # fcntl is only available (and locking only needed) once a state file is
+    # actually used
+    import fcntl
+
+    with open("{}.lock".format(state_path), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# Loads the allocator for the given subnet from the state file at the given
+# path (see load_allocator()) while holding its lock, and saves it back unless
+# an error is raised before the block ends
+@contextlib.contextmanager
+def open_allocator(state_path, addr, num_subnet_bits):
+    with lock_state(state_path):
+        allocator = load_allocator(state_path, addr, num_subnet_bits)
+        yield allocator
+        save_allocator(allocator, state_path)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import collections
+import itertools
+
+from cidrbrewer import core, instrument
+
+# NumPy is an optional dependency (installed via the "numpy" extra); without
+# it, the pure-Python implementation is used instead; importing it takes far
+# longer than most queries, so it is imported by get_numpy() on first use (and
+# is False until then if it is not installed)
+numpy = None
+
+# The per-address results of a bulk subnet computation; each field is a NumPy
+# array when NumPy is used, or a list otherwise
+BulkSubnets = collections.namedtuple(
+    "BulkSubnets",
+    (
+        "network_ids",
+        "broadcast_ids",
+        "first_available_addrs",
+        "last_available_addrs",
+        "subnet_sizes",
+    ),
+)
+
+
+# Returns the NumPy module, importing it if necessary, or None if it is not
+# installed
+def get_numpy():
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as numpy_module
+        except ImportError:  # pragma: no cover
+            numpy_module = False
+        numpy = numpy_module
+    return numpy or None
+
+
+# Returns True if NumPy is available for vectorized computation; otherwise,
+# returns False
+def has_numpy():
+    return get_numpy() is not None
+
+
+# Converts the given array (or list) of values to a list of plain Python
+# values, which are much faster to iterate over than NumPy scalars
+def to_list(values):
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return values
+
+
+# Computes the subnet details for every address using vectorized uint32 mask
+# arithmetic
+def get_subnets_numpy(addrs, num_subnet_bits):
+    numpy = get_numpy()
+    addrs, num_subnet_bits = numpy.broadcast_arrays(
+        numpy.asarray(addrs, dtype=numpy.uint32),
+        numpy.asarray(num_subnet_bits, dtype=numpy.int64),
+    )
+    # Shifting a uint32 by 32 bits is undefined, so the host masks are computed
+    # with 64-bit integers before being narrowed
+    num_host_bits = (core.ADDR_LEN - num_subnet_bits).astype(numpy.uint64)
+    host_masks = (
+        numpy.left_shift(numpy.uint64(1), num_host_bits) - numpy.uint64(1)
+    ).astype(numpy.uint32)
+    network_ids = addrs & ~host_masks
+    broadcast_ids = addrs | host_masks
+    return BulkSubnets(
+        network_ids=network_ids,
+        broadcast_ids=broadcast_ids,
+        first_available_addrs=network_ids | numpy.uint32(1),
+        last_available_addrs=broadcast_ids & numpy.uint32(core.ALL_ONES ^ 1),
+        subnet_sizes=host_masks.astype(numpy.int64) - 1,
+    )
+
+
+# Computes the subnet details for every address using the per-address helpers
+# in the core module
+def get_subnets_python(addrs, num_subnet_bits):
+    if isinstance(num_subnet_bits, int):
+        num_subnet_bits = itertools.repeat(num_subnet_bits)
+    results = BulkSubnets([], [], [], [], [])
+    for addr, addr_num_subnet_bits in zip(addrs, num_subnet_bits):
+        host_mask = core.get_host_mask(addr_num_subnet_bits)
+        network_id = addr & ~host_mask
+        broadcast_id = addr | host_mask
+        results.network_ids.append(network_id)
+        results.broadcast_ids.append(broadcast_id)
+        results.first_available_addrs.append(network_id | 1)
+        results.last_available_addrs.append(broadcast_id & ~1)
+        results.subnet_sizes.append(host_mask - 1)
+    return results
+
+
+# Computes the network ID, broadcast ID, first/last available addresses and
+# subnet size for every integer address, given either a single number of
+# subnet bits or one per address; NumPy is used whenever it is available,
+# unless use_numpy is False
+@instrument.stage(instrument.COMPUTE)
+def get_subnets(addrs, num_subnet_bits, use_numpy=None):
+    if use_numpy is None:
+        use_numpy = has_numpy()
+    if use_numpy:
+        return get_subnets_numpy(addrs, num_subnet_bits)
+    return get_subnets_python(addrs, num_subnet_bits)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import functools
+import sys
+
+# The default maximum number of results kept by each memoized function; real
+# inputs are dominated by a few hundred distinct networks, so this comfortably
+# holds every hot result while bounding memory for inputs which are not
+DEFAULT_CACHE_SIZE = 4096
+
+# The undecorated version of every memoized function, keyed by the module and
+# name under which its memoized version is bound
+memoized_funcs = {}
+# The LRU cache wrapper currently in use by every memoized function, keyed like
+# memoized_funcs (omitting functions whose memoization is disabled); the
+# wrappers are tracked here rather than read back from their modules, since
+# the module attributes may be rebound to other wrappers (such as by
+# instrument.enable()) which do not expose the cache
+cached_funcs = {}
+# The maximum number of results currently kept by each memoized function (0
+# when memoization is disabled)
+cache_size = DEFAULT_CACHE_SIZE
+
+
+# Wraps the given function (whose arguments must be hashable) in a bounded LRU
+# cache; the wrapper is an ordinary functools.lru_cache, so cache hits cost no
+# more than a dictionary lookup
+def memoize(func):
+    key = (func.__module__, func.__name__)
+    memoized_funcs[key] = func
+    return wrap_func(key, func, cache_size)
+
+
+# Returns the given function wrapped in an LRU cache of the given size (and
+# registered under the given key), or the function itself if the size is 0
+def wrap_func(key, func, size):
+    if size == 0:
+        cached_funcs.pop(key, None)
+        return func
+    cached_func = functools.lru_cache(maxsize=size)(func)
+    cached_funcs[key] = cached_func
+    return cached_func
+
+
+# Rebinds every memoized function to a fresh cache of the given size (0 to
+# disable memoization entirely); functions are looked up by module attribute
+# at call time, so callers pick up the new caches immediately
+def set_cache_size(size):
+    global cache_size
+    if size < 0:
+        raise ValueError("cache size must be at least 0")
+    cache_size = size
+    for (module_name, func_name), func in memoized_funcs.items():
+        setattr(
+            sys.modules[module_name],
+            func_name,
+            wrap_func((module_name, func_name), func, size),
+        )
+
+
+# Empties the cache of every memoized function and resets its statistics
+def clear_caches():
+    for cached_func in cached_funcs.values():
+        cached_func.cache_clear()
+
+
+# Returns a dictionary mapping the qualified name of every memoized function to
+# its cache statistics (a functools CacheInfo with hits, misses, maxsize and
+# currsize), omitting functions whose memoization is disabled
+def get_cache_stats():
+    return {
+        "{}.{}".format(module_name, func_name): cached_func.cache_info()
+        for (module_name, func_name), cached_func in cached_funcs.items()
+    }
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+
+from cidrbrewer import instrument
+
+# The number of bits in an IPv4 address
+ADDR_LEN = 32
+# An IPv4 address with every bit set
+ALL_ONES = (1 << ADDR_LEN) - 1
+# The number of bits in an IPv6 address
+IPV6_ADDR_LEN = 128
+# The number of 16-bit groups in an IPv6 address
+NUM_IPV6_GROUPS = 8
+# The characters allowed in each group of an IPv6 address
+HEX_DIGITS = "0123456789abcdefABCDEF"
+# The integer value of every valid decimal octet string; leading zeroes, signs
+# and whitespace are rejected simply by being absent from the table
+OCTET_VALUES = {str(octet): octet for octet in range(256)}
+# The decimal and binary strings of every octet, by octet value, from which
+# IPv4 addresses are rendered without any per-octet conversions
+DEC_OCTETS = tuple(str(octet) for octet in range(1 << 8))
+BIN_OCTETS = tuple(format(octet, "08b") for octet in range(1 << 8))
+# The integer value of every valid number of subnet bits
+NUM_SUBNET_BITS_VALUES = {
+    str(num_subnet_bits): num_subnet_bits for num_subnet_bits in range(ADDR_LEN + 1)
+}
+# The integer value of every valid number of subnet bits for an IPv6 address
+IPV6_NUM_SUBNET_BITS_VALUES = {
+    str(num_subnet_bits): num_subnet_bits
+    for num_subnet_bits in range(IPV6_ADDR_LEN + 1)
+}
+
+
+# An error raised when an address string is malformed
+class AddrParseError(ValueError):
+    pass
+
+
+# Converts the given 32-bit integer address to a 32-character binary string
+def int_to_bin(addr):
+    return format(addr, "032b")
+
+
+# Converts the given 32-character binary string to a 32-bit integer address
+def bin_to_int(bin_addr):
+    return int(bin_addr, 2)
+
+
+# Converts the given dotted-decimal address (without slash notation) to a
+# 32-bit integer address, raising an AddrParseError if it is malformed
+def dotted_to_int(dotted_addr):
+    octets = dotted_addr.split(".")
+    if len(octets) != 4:
+        if ":" in dotted_addr:
+            raise AddrParseError(
+                "expected an IPv4 address but found {!r}".format(dotted_addr)
+            )
+        raise AddrParseError(
+            "expected 4 octets but found {} in {!r}".format(len(octets), dotted_addr)
+        )
+    try:
+        return (
+            (OCTET_VALUES[octets[0]] << 24)
+            | (OCTET_VALUES[octets[1]] << 16)
+            | (OCTET_VALUES[octets[2]] << 8)
+            | OCTET_VALUES[octets[3]]
+        )
+    except KeyError as error:
+        raise AddrParseError(
+            "invalid octet {!r} in {!r} (must be 0-255)".format(
+                error.args[0], dotted_addr
+            )
+        ) from None
+
+
+# Parses the given address string (optionally in slash notation) into a tuple
+# containing its integer address and number of subnet bits (or None if not in
+# slash notation), raising an AddrParseError if it is malformed
+@instrument.stage(instrument.PARSE)
+def parse_addr(addr_str):
+    dotted_addr, slash, num_subnet_bits_str = addr_str.partition("/")
+    addr = dotted_to_int(dotted_addr)
+    if not slash:
+        return addr, None
+    num_subnet_bits = NUM_SUBNET_BITS_VALUES.get(num_subnet_bits_str)
+    if num_subnet_bits is None:
+        raise AddrParseError(
+            "invalid prefix length {!r} in {!r} (must be 0-{})".format(
+                num_subnet_bits_str, addr_str, ADDR_LEN
+            )
+        )
+    return addr, num_subnet_bits
+
+
+# Converts the given colon-separated groups of an IPv6 address (which may be
+# empty) to a list of 16-bit integers; if allow_ipv4 is True, the last group
+# may be an embedded dotted-decimal IPv4 address (counting as two groups)
+def parse_ipv6_groups(groups_str, ipv6_addr, allow_ipv4):
+    if not groups_str:
+        return []
+    groups = groups_str.split(":")
+    values = []
+    for group_num, group in enumerate(groups, 1):
+        if allow_ipv4 and group_num == len(groups) and "." in group:
+            addr = dotted_to_int(group)
+            values.append(addr >> 16)
+            values.append(addr & 0xFFFF)
+        elif 1 <= len(group) <= 4 and not group.strip(HEX_DIGITS):
+            values.append(int(group, 16))
+        else:
+            raise AddrParseError(
+                "invalid group {!r} in {!r} (must be 1-4 hex digits)".format(
+                    group, ipv6_addr
+                )
+            )
+    return values
+
+
+# Converts the given IPv6 address (without slash notation, and optionally
+# compressed with '::') to a 128-bit integer address, raising an AddrParseError
+# if it is malformed
+def ipv6_to_int(ipv6_addr):
+    head, double_colon, tail = ipv6_addr.partition("::")
+    if "::" in tail:
+        raise AddrParseError("multiple '::' in {!r}".format(ipv6_addr))
+    values = parse_ipv6_groups(head, ipv6_addr, allow_ipv4=not double_colon)
+    if double_colon:
+        tail_values = parse_ipv6_groups(tail, ipv6_addr, allow_ipv4=True)
+        num_omitted_groups = NUM_IPV6_GROUPS - len(values) - len(tail_values)
+        if num_omitted_groups < 1:
+            raise AddrParseError("too many groups in {!r}".format(ipv6_addr))
+        values.extend([0] * num_omitted_groups)
+        values.extend(tail_values)
+    elif len(values) != NUM_IPV6_GROUPS:
+        raise AddrParseError(
+            "expected {} groups but found {} in {!r}".format(
+                NUM_IPV6_GROUPS, len(values), ipv6_addr
+            )
+        )
+    addr = 0
+    for value in values:
+        addr = (addr << 16) | value
+    return addr
+
+
+# Returns the number of bits in the address represented by the given address
+# string (128 for IPv6 addresses, which always contain a colon, or 32 for IPv4
+# addresses)
+def get_addr_len(addr_str):
+    if ":" in addr_str:
+        return IPV6_ADDR_LEN
+    return ADDR_LEN
+
+
+# Parses the given IPv4 or IPv6 address string (optionally in slash notation)
+# into a tuple containing its integer address, number of subnet bits (or None
+# if not in slash notation) and number of address bits, raising an
+# AddrParseError if it is malformed
+@instrument.stage(instrument.PARSE)
+def parse_any_addr(addr_str):
+    if ":" not in addr_str:
+        return parse_addr(addr_str) + (ADDR_LEN,)
+    ipv6_addr, slash, num_subnet_bits_str = addr_str.partition("/")
+    addr = ipv6_to_int(ipv6_addr)
+    if not slash:
+        return addr, None, IPV6_ADDR_LEN
+    num_subnet_bits = IPV6_NUM_SUBNET_BITS_VALUES.get(num_subnet_bits_str)
+    if num_subnet_bits is None:
+        raise AddrParseError(
+            "invalid prefix length {!r} in {!r} (must be 0-{})".format(
+                num_subnet_bits_str, addr_str, IPV6_ADDR_LEN
+            )
+        )
+    return addr, num_subnet_bits, IPV6_ADDR_LEN
+
+
+# Converts the given 32-bit integer address to a dotted-decimal address
+def int_to_dotted(addr):
+    return ".".join(
+        (
+            DEC_OCTETS[addr >> 24],
+            DEC_OCTETS[(addr >> 16) & 0xFF],
+            DEC_OCTETS[(addr >> 8) & 0xFF],
+            DEC_OCTETS[addr & 0xFF],
+        )
+    )
+
+
+# Converts the given 32-bit integer address to dot-separated binary octets
+def int_to_bin_octets(addr):
+    return ".".join(
+        (
+            BIN_OCTETS[addr >> 24],
+            BIN_OCTETS[(addr >> 16) & 0xFF],
+            BIN_OCTETS[(addr >> 8) & 0xFF],
+            BIN_OCTETS[addr & 0xFF],
+        )
+    )
+
+
+# Converts the given 128-bit integer address to an IPv6 address in its
+# canonical form (RFC 5952): lowercase hex groups without leading zeroes, with
+# the longest run of two or more zero groups (the first, if tied) compressed
+# to '::'
+def int_to_ipv6(addr):
+    groups = [(addr >> shift) & 0xFFFF for shift in range(IPV6_ADDR_LEN - 16, -1, -16)]
+    best_start = best_len = run_start = 0
+    for group_num, group in enumerate(groups):
+        if group:
+            run_start = group_num + 1
+        elif group_num + 1 - run_start > best_len:
+            best_start, best_len = run_start, group_num + 1 - run_start
+    if best_len < 2:
+        return ":".join(map("{:x}".format, groups))
+    return "{}::{}".format(
+        ":".join(map("{:x}".format, groups[:best_start])),
+        ":".join(map("{:x}".format, groups[best_start + best_len :])),
+    )
+
+
+# Converts the given integer address to a dotted-decimal IPv4 address or an
+# IPv6 address, depending on the number of address bits
+def int_to_str(addr, addr_len=ADDR_LEN):
+    if addr_len == ADDR_LEN:
+        return int_to_dotted(addr)
+    return int_to_ipv6(addr)
+
+
+# Computes the integer subnet mask given the number of bits used for the subnet
+def get_subnet_mask(num_subnet_bits, addr_len=ADDR_LEN):
+    all_ones = (1 << addr_len) - 1
+    return all_ones ^ (all_ones >> num_subnet_bits)
+
+
+# Computes the integer host mask (the inverse of the subnet mask) given the
+# number of bits used for the subnet
+def get_host_mask(num_subnet_bits, addr_len=ADDR_LEN):
+    return (1 << (addr_len - num_subnet_bits)) - 1
+
+
+# Computes the network ID given the integer address and the number of bits used
+# for the subnet
+@instrument.stage(instrument.COMPUTE)
+def get_network_id(addr, num_subnet_bits, addr_len=ADDR_LEN):
+    return addr & ~get_host_mask(num_subnet_bits, addr_len)
+
+
+# Computes the broadcast ID given the integer address and the number of bits
+# used for the subnet
+@instrument.stage(instrument.COMPUTE)
+def get_broadcast_id(addr, num_subnet_bits, addr_len=ADDR_LEN):
+    return addr | get_host_mask(num_subnet_bits, addr_len)
+
+
+# Computes the first available IP address in the defined subnet
+@instrument.stage(instrument.COMPUTE)
+def get_first_available_addr(addr, num_subnet_bits, addr_len=ADDR_LEN):
+    return get_network_id(addr, num_subnet_bits, addr_len) | 1
+
+
+# Computes the last available IP address in the defined subnet
+@instrument.stage(instrument.COMPUTE)
+def get_last_available_addr(addr, num_subnet_bits, addr_len=ADDR_LEN):
+    return get_broadcast_id(addr, num_subnet_bits, addr_len) & ~1
+
+
+# Computes the subnet size given the number of bits used for the subnet ID
+@instrument.stage(instrument.COMPUTE)
+def get_subnet_size(num_subnet_bits, addr_len=ADDR_LEN):
+    return 2 ** (addr_len - num_subnet_bits) - 2
+
+
+# Returns True if the given IP address is reserved (i.e. its host part is all
+# zeroes or all ones); otherwise, returns False
+@instrument.stage(instrument.COMPUTE)
+def is_reserved(addr, num_subnet_bits, addr_len=ADDR_LEN):
+    host_mask = get_host_mask(num_subnet_bits, addr_len)
+    host_part = addr & host_mask
+    return host_part == 0 or host_part == host_mask
+
+
+# Computes the number of trailing zero bits in the given integer address
+def get_num_trailing_zeros(addr, addr_len=ADDR_LEN):
+    if addr == 0:
+        return addr_len
+    return (addr & -addr).bit_length() - 1
+
+
+# Computes the number of leading bits shared by two integer addresses
+def get_common_prefix_len(addr_1, addr_2, addr_len=ADDR_LEN):
+    return addr_len - (addr_1 ^ addr_2).bit_length()
+
+
+# Computes the largest number of subnet bits at which the given integer address
+# is not reserved (i.e. its host part is neither all zeroes nor all ones), or
+# -1 if no such number exists; an address is reserved at a given number of
+# subnet bits exactly when its host part is no longer than its run of trailing
+# zeroes or trailing ones
+def get_max_unreserved_subnet_bits(addr, addr_len=ADDR_LEN):
+    num_trailing_bits = max(
+        get_num_trailing_zeros(addr, addr_len),
+        get_num_trailing_zeros(addr ^ ((1 << addr_len) - 1), addr_len),
+    )
+    return addr_len - 1 - num_trailing_bits
+
+
+# Computes the number of subnet bits in the largest subnet mask that allows
+# every given integer address to communicate (i.e. share a network ID without
+# any address being reserved), in a single pass over the addresses
+@instrument.stage(instrument.COMPUTE)
+def get_largest_subnet_bits(addrs, addr_len=ADDR_LEN):
+    num_subnet_bits = addr_len - 2
+    min_addr = max_addr = None
+    for addr in addrs:
+        if min_addr is None:
+            min_addr = max_addr = addr
+        elif addr < min_addr:
+            min_addr = addr
+        elif addr > max_addr:
+            max_addr = addr
+        num_subnet_bits = min(
+            num_subnet_bits, get_max_unreserved_subnet_bits(addr, addr_len)
+        )
+    # The prefix shared by every address is the prefix shared by the lowest and
+    # highest addresses
+    if min_addr is not None:
+        num_subnet_bits = min(
+            num_subnet_bits, get_common_prefix_len(min_addr, max_addr, addr_len)
+        )
+    return max(num_subnet_bits, 0)
+
+
+# Computes the number of subnet bits used by each subnet when splitting a
+# subnet into the given number of equal subnets; if the number of subnets is
+# not a power of two, it is rounded up to the next one
+@instrument.stage(instrument.COMPUTE)
+def get_split_subnet_bits(num_subnet_bits, num_subnets, addr_len=ADDR_LEN):
+    if num_subnet_bits is None:
+        raise ValueError("a subnet in slash notation is required to split it")
+    if num_subnets < 1:
+        raise ValueError("number of subnets must be at least 1")
+    num_split_subnet_bits = num_subnet_bits + (num_subnets - 1).bit_length()
+    if num_split_subnet_bits > addr_len:
+        raise ValueError(
+            "cannot split a /{} into {} subnets".format(num_subnet_bits, num_subnets)
+        )
+    return num_split_subnet_bits
+
+
+# Lazily yields the network ID of each of the given number of equal subnets
+# split from the subnet containing the given integer address; the network IDs
+# are never materialized, so even millions of subnets use constant memory
+def split_subnet(addr, num_subnet_bits, num_subnets, addr_len=ADDR_LEN):
+    num_split_subnet_bits = get_split_subnet_bits(
+        num_subnet_bits, num_subnets, addr_len
+    )
+    split_subnet_size = 1 << (addr_len - num_split_subnet_bits)
+    network_id = get_network_id(addr, num_subnet_bits, addr_len)
+    return iter(
+        range(
+            network_id,
+            network_id + num_subnets * split_subnet_size,
+            split_subnet_size,
+        )
+    )
+
+
+# Returns a lazy sequence (a range) of every usable host address (i.e. every
+# address but the network and broadcast IDs) in the subnet containing the
+# given integer address, or of only every stride-th one if a stride is given;
+# the addresses are never materialized, so even a /8 uses constant memory
+def get_hosts(addr, num_subnet_bits, stride=1, addr_len=ADDR_LEN):
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    return range(
+        get_first_available_addr(addr, num_subnet_bits, addr_len),
+        get_last_available_addr(addr, num_subnet_bits, addr_len) + 1,
+        stride,
+    )
+
+
+# Raises a ValueError if the given address string was not in slash notation
+# (i.e. it was parsed into None subnet bits), where a subnet is required
+def check_slash_notation(addr_str, num_subnet_bits):
+    if num_subnet_bits is None:
+        raise ValueError(
+            "expected a subnet in slash notation but found {!r}".format(addr_str)
+        )
+
+
+# Parses the given subnet string into a tuple containing its integer network ID
+# and number of subnet bits; addresses without slash notation are treated as
+# single-host subnets
+@instrument.stage(instrument.PARSE)
+def parse_cidr_str(cidr_str):
+    addr, num_subnet_bits = parse_addr(cidr_str)
+    if num_subnet_bits is None:
+        num_subnet_bits = ADDR_LEN
+    return get_network_id(addr, num_subnet_bits), num_subnet_bits
+
+
+# An IPv4 or IPv6 address (and optional number of subnet bits) backed by a
+# plain integer rather than a binary string
+class Addr(object):
+    __slots__ = ("value", "num_subnet_bits", "addr_len")
+
+    def __init__(self, value, num_subnet_bits=None, addr_len=ADDR_LEN):
+        self.value = value
+        self.num_subnet_bits = num_subnet_bits
+        self.addr_len = addr_len
+
+    # Builds an address from the given 32-character binary string
+    @classmethod
+    def from_bin(cls, bin_addr, num_subnet_bits=None):
+        return cls(bin_to_int(bin_addr), num_subnet_bits)
+
+    # Builds an address from the given address string (optionally in slash
+    # notation)
+    @classmethod
+    def from_str(cls, addr_str):
+        return cls(*parse_addr(addr_str))
+
+    # Builds an address from the given IPv4 or IPv6 address string (optionally
+    # in slash notation)
+    @classmethod
+    def from_any_str(cls, addr_str):
+        return cls(*parse_any_addr(addr_str))
+
+    # Returns True if this is an IPv6 address; otherwise, returns False
+    def is_ipv6(self):
+        return self.addr_len == IPV6_ADDR_LEN
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, str(self))
+
+    def __str__(self):
+        if self.num_subnet_bits is None:
+            return int_to_str(self.value, self.addr_len)
+        return "{}/{}".format(
+            int_to_str(self.value, self.addr_len), self.num_subnet_bits
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Addr):
+            return NotImplemented
+        return (self.value, self.num_subnet_bits, self.addr_len) == (
+            other.value,
+            other.num_subnet_bits,
+            other.addr_len,
+        )
+
+    def __hash__(self):
+        return hash((self.value, self.num_subnet_bits, self.addr_len))
+
+    def to_bin(self):
+        return int_to_bin(self.value)
+
+    @property
+    def subnet_mask(self):
+        return get_subnet_mask(self.num_subnet_bits, self.addr_len)
+
+    @property
+    def network_id(self):
+        return get_network_id(self.value, self.num_subnet_bits, self.addr_len)
+
+    @property
+    def broadcast_id(self):
+        return get_broadcast_id(self.value, self.num_subnet_bits, self.addr_len)
+
+    @property
+    def first_available_addr(self):
+        return get_first_available_addr(self.value, self.num_subnet_bits, self.addr_len)
+
+    @property
+    def last_available_addr(self):
+        return get_last_available_addr(self.value, self.num_subnet_bits, self.addr_len)
+
+    @property
+    def subnet_size(self):
+        return get_subnet_size(self.num_subnet_bits, self.addr_len)
+
+    def is_reserved(self):
+        return is_reserved(self.value, self.num_subnet_bits, self.addr_len)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import itertools
+
+from cidrbrewer import cache, core, instrument
+
+# The default output format, which is the human-readable indented text
+TEXT_FORMAT = "text"
+# The names of every field in a structured record, in column order
+FIELD_NAMES = (
+    "address",
+    "address_2",
+    "can_communicate",
+    "block_size",
+    "num_subnet_bits",
+    "subnet_mask",
+    "network_id",
+    "broadcast_id",
+    "first_available_addr",
+    "last_available_addr",
+    "subnet_size",
+)
+# The names of every field in a table lookup record, in column order
+LOOKUP_FIELD_NAMES = ("address", "subnet", "label")
+# The names of every field in a subnet record, in column order
+CIDR_FIELD_NAMES = ("subnet", "network_id", "broadcast_id", "num_addrs")
+# The names of every field in an overlap record, in column order
+OVERLAP_FIELD_NAMES = (
+    "subnet",
+    "label",
+    "overlapping_subnet",
+    "overlapping_label",
+    "duplicate",
+    "first_colliding_addr",
+    "last_colliding_addr",
+    "num_colliding_addrs",
+)
+# The names of every field in a host record, in column order
+HOST_FIELD_NAMES = ("subnet", "address")
+
+
+# Returns the dotted-decimal subnet mask for the given number of subnet bits
+@cache.memoize
+def get_dotted_subnet_mask(num_subnet_bits):
+    return core.int_to_dotted(core.get_subnet_mask(num_subnet_bits))
+
+
+# Returns the record fields shared by every address in the subnet with the
+# given integer network ID; the returned dictionary is cached, so it must be
+# copied rather than modified
+@cache.memoize
+def get_subnet_fields(network_id, num_subnet_bits, addr_len=core.ADDR_LEN):
+    return {
+        "num_subnet_bits": num_subnet_bits,
+        "subnet_mask": core.int_to_str(
+            core.get_subnet_mask(num_subnet_bits, addr_len), addr_len
+        ),
+        "network_id": core.int_to_str(network_id, addr_len),
+        "broadcast_id": core.int_to_str(
+            core.get_broadcast_id(network_id, num_subnet_bits, addr_len), addr_len
+        ),
+        "first_available_addr": core.int_to_str(
+            core.get_first_available_addr(network_id, num_subnet_bits, addr_len),
+            addr_len,
+        ),
+        "last_available_addr": core.int_to_str(
+            core.get_last_available_addr(network_id, num_subnet_bits, addr_len),
+            addr_len,
+        ),
+        "subnet_size": core.get_subnet_size(num_subnet_bits, addr_len),
+    }
+
+
+# Builds a structured record containing the details (like network ID and
+# broadcast ID) of the given integer IPv4 (or, given 128 address bits, IPv6)
+# address; any additional fields are merged into the record
+@instrument.stage(instrument.FORMAT)
+def get_details_record(addr, num_subnet_bits, addr_len=core.ADDR_LEN, **fields):
+    record = dict.fromkeys(FIELD_NAMES)
+    record.update(fields)
+    record.update(
+        get_subnet_fields(
+            core.get_network_id(addr, num_subnet_bits, addr_len),
+            num_subnet_bits,
+            addr_len,
+        )
+    )
+    return record
+
+
+# Lazily yields a structured record for every address from the results of a
+# bulk subnet computation (as returned by bulk.get_subnets()) on the given
+# integer addresses and numbers of subnet bits (either one per address or a
+# single number for all)
+def get_bulk_records(addrs, num_subnet_bits, subnets):
+    # Only packed input is computed in bulk, so bulk is imported along with it
+    from cidrbrewer import bulk
+
+    if isinstance(num_subnet_bits, int):
+        num_subnet_bits = itertools.repeat(num_subnet_bits)
+    else:
+        num_subnet_bits = bulk.to_list(num_subnet_bits)
+    for (
+        addr,
+        addr_num_subnet_bits,
+        network_id,
+        broadcast_id,
+        first_available_addr,
+        last_available_addr,
+        subnet_size,
+    ) in zip(bulk.to_list(addrs), num_subnet_bits, *map(bulk.to_list, subnets)):
+        record = dict.fromkeys(FIELD_NAMES)
+        record["address"] = "{}/{}".format(
+            core.int_to_dotted(addr), addr_num_subnet_bits
+        )
+        record["num_subnet_bits"] = addr_num_subnet_bits
+        record["subnet_mask"] = get_dotted_subnet_mask(addr_num_subnet_bits)
+        record["network_id"] = core.int_to_dotted(network_id)
+        record["broadcast_id"] = core.int_to_dotted(broadcast_id)
+        record["first_available_addr"] = core.int_to_dotted(first_available_addr)
+        record["last_available_addr"] = core.int_to_dotted(last_available_addr)
+        record["subnet_size"] = subnet_size
+        yield record
+
+
+# Builds a structured record describing the longest matching table entry (a
+# tuple containing the network ID, number of subnet bits and label) for the
+# given address string
+@instrument.stage(instrument.FORMAT)
+def get_lookup_record(addr_str, match):
+    if match is None:
+        return {"address": addr_str, "subnet": None, "label": None}
+    network_id, num_subnet_bits, label = match
+    return {
+        "address": addr_str,
+        "subnet": "{}/{}".format(core.int_to_dotted(network_id), num_subnet_bits),
+        "label": label,
+    }
+
+
+# Builds a structured record describing the subnet with the given integer
+# network ID and number of subnet bits
+@instrument.stage(instrument.FORMAT)
+def get_cidr_record(network_id, num_subnet_bits, addr_len=core.ADDR_LEN):
+    return {
+        "subnet": "{}/{}".format(
+            core.int_to_str(network_id, addr_len), num_subnet_bits
+        ),
+        "network_id": core.int_to_str(network_id, addr_len),
+        "broadcast_id": core.int_to_str(
+            core.get_broadcast_id(network_id, num_subnet_bits, addr_len), addr_len
+        ),
+        "num_addrs": 1 << (addr_len - num_subnet_bits),
+    }
+
+
+# Builds a structured record describing a pair of overlapping table entries
+# (each a tuple containing the network ID, number of subnet bits and label of
+# a subnet), where the first contains or duplicates the second; the colliding
+# addresses are exactly those of the second
+@instrument.stage(instrument.FORMAT)
+def get_overlap_record(enclosing_entry, entry):
+    network_id, num_subnet_bits, label = entry
+    return {
+        "subnet": "{}/{}".format(
+            core.int_to_dotted(enclosing_entry[0]), enclosing_entry[1]
+        ),
+        "label": enclosing_entry[2],
+        "overlapping_subnet": "{}/{}".format(
+            core.int_to_dotted(network_id), num_subnet_bits
+        ),
+        "overlapping_label": label,
+        "duplicate": enclosing_entry[1] == num_subnet_bits,
+        "first_colliding_addr": core.int_to_dotted(network_id),
+        "last_colliding_addr": core.int_to_dotted(
+            core.get_broadcast_id(network_id, num_subnet_bits)
+        ),
+        "num_colliding_addrs": 1 << (core.ADDR_LEN - num_subnet_bits),
+    }
+
+
+# Builds a structured record describing the given integer host address in the
+# given subnet (an address string)
+@instrument.stage(instrument.FORMAT)
+def get_host_record(subnet_str, host, addr_len=core.ADDR_LEN):
+    return {"subnet": subnet_str, "address": core.int_to_str(host, addr_len)}
+
+
+# Writes records as JSON Lines (one compact JSON object per line); every
+# record carries its own field names, so there is no header
+class JSONLinesWriter(object):
+    def __init__(self, output):
+        # The json and csv modules (and the re module they depend on) are only
+        # imported once records are actually written, which keeps them out of
+        # the startup time of text queries
+        import json
+
+        self.output = output
+        self.encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def write_all(self, records):
+        encode = self.encoder.encode
+        self.output.writelines(encode(record) + "\n" for record in records)
+
+
+# Writes records as CSV rows with the given columns, preceded by a header row
+# (unless write_header is False)
+class CSVWriter(object):
+    def __init__(self, output, field_names=FIELD_NAMES, write_header=True):
+        import csv
+
+        self.writer = csv.DictWriter(
+            output, fieldnames=field_names, lineterminator="\n"
+        )
+        if write_header:
+            self.writer.writeheader()
+
+    def write_all(self, records):
+        self.writer.writerows(records)
+
+
+# The names of every structured output format
+JSONL_FORMAT = "jsonl"
+CSV_FORMAT = "csv"
+# The names of every supported output format
+OUTPUT_FORMATS = (TEXT_FORMAT, JSONL_FORMAT, CSV_FORMAT)
+
+
+# Serializes every record from the given iterable to the given output stream
+# using the given structured output format; the header (if the format has one)
+# is omitted when write_header is False, such as when records are written in
+# several batches
+def write_records(
+    records, output, output_format, field_names=FIELD_NAMES, write_header=True
+):
+    if output_format == CSV_FORMAT:
+        writer = CSVWriter(output, field_names, write_header)
+    elif output_format == JSONL_FORMAT:
+        writer = JSONLinesWriter(output)
+    else:
+        raise ValueError("unsupported output format {!r}".format(output_format))
+    writer.write_all(records)
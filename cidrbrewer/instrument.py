@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import collections
+import functools
+import sys
+import time
+
+# The stages to which the time spent in instrumented functions is attributed
+PARSE = "parse"
+COMPUTE = "compute"
+FORMAT = "format"
+WRITE = "write"
+STAGES = (PARSE, COMPUTE, FORMAT, WRITE)
+
+# The number of calls to and cumulative time (in seconds) spent in a stage
+StageStats = collections.namedtuple("StageStats", ("calls", "seconds"))
+
+# The stage of every instrumented function, keyed by the module and name under
+# which it is bound
+instrumented_funcs = {}
+# The uninstrumented version of every instrumented function while
+# instrumentation is enabled, keyed like instrumented_funcs
+original_funcs = {}
+# The number of calls to each stage (nested calls to the same stage are counted
+# once) and the time spent in each stage, excluding time spent in other stages
+# called from it, so that the times of all stages never overlap
+stage_calls = dict.fromkeys(STAGES, 0)
+stage_seconds = dict.fromkeys(STAGES, 0.0)
+# The stages of the instrumented calls in progress, each a list containing the
+# stage and the time at which it was last entered or resumed
+active_stages = []
+# The functions called with the stage, qualified function name and duration
+# (in seconds) of every outermost call to a stage
+hooks = []
+# The time at which instrumentation was enabled, or None if it is disabled
+start_time = None
+
+
+# Marks the decorated function as belonging to the given stage; the function
+# itself is returned unchanged, so instrumentation costs nothing until it is
+# enabled (like cache.memoize(), functions are rebound by module attribute, so
+# this must be the outermost decorator); functions in modules imported lazily
+# once instrumentation is enabled are wrapped as soon as they are defined
+def stage(stage_name):
+    def register(func):
+        key = (func.__module__, func.__name__)
+        instrumented_funcs[key] = stage_name
+        if not is_enabled():
+            return func
+        original_funcs[key] = func
+        return wrap_func(func, stage_name, "{}.{}".format(*key))
+
+    return register
+
+
+# Returns the given function wrapped so that its calls are counted and timed
+# as part of the given stage
+def wrap_func(func, stage_name, func_name):
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def timed_func(*args, **kwargs):
+        enter_time = perf_counter()
+        if active_stages:
+            outer_stage = active_stages[-1]
+            stage_seconds[outer_stage[0]] += enter_time - outer_stage[1]
+            is_outermost = outer_stage[0] != stage_name
+        else:
+            is_outermost = True
+        if is_outermost:
+            stage_calls[stage_name] += 1
+        active_stages.append([stage_name, enter_time])
+        try:
+            return func(*args, **kwargs)
+        finally:
+            exit_time = perf_counter()
+            stage_seconds[stage_name] += exit_time - active_stages.pop()[1]
+            if active_stages:
+                active_stages[-1][1] = exit_time
+            if is_outermost:
+                for hook in hooks:
+                    hook(stage_name, func_name, exit_time - enter_time)
+
+    return timed_func
+
+
+# Returns True if instrumentation is enabled; otherwise, returns False
+def is_enabled():
+    return start_time is not None
+
+
+# Starts counting and timing calls to every instrumented function by rebinding
+# each to a timed wrapper; memoized functions are wrapped as currently bound,
+# so the cache size must be set (see cache.set_cache_size()) beforehand
+def enable():
+    global start_time
+    if is_enabled():
+        return
+    for (module_name, func_name), stage_name in instrumented_funcs.items():
+        module = sys.modules[module_name]
+        func = getattr(module, func_name)
+        original_funcs[(module_name, func_name)] = func
+        setattr(
+            module,
+            func_name,
+            wrap_func(func, stage_name, "{}.{}".format(module_name, func_name)),
+        )
+    start_time = time.perf_counter()
+
+
+# Stops counting and timing calls, restoring every instrumented function; the
+# statistics gathered so far are kept until reset() is called
+def disable():
+    global start_time
+    for (module_name, func_name), func in original_funcs.items():
+        setattr(sys.modules[module_name], func_name, func)
+    original_funcs.clear()
+    start_time = None
+
+
+# Discards the statistics gathered so far
+def reset():
+    global start_time
+    for stage_name in STAGES:
+        stage_calls[stage_name] = 0
+        stage_seconds[stage_name] = 0.0
+    if is_enabled():
+        start_time = time.perf_counter()
+
+
+# Calls the given function with the stage, qualified function name and
+# duration (in seconds) of every outermost call to a stage while
+# instrumentation is enabled
+def add_hook(hook):
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    hooks.remove(hook)
+
+
+# Returns a dictionary mapping every stage to its statistics (a StageStats with
+# its number of calls and cumulative time)
+def get_stats():
+    return {
+        stage_name: StageStats(stage_calls[stage_name], stage_seconds[stage_name])
+        for stage_name in STAGES
+    }
+
+
+# Returns the time (in seconds) since instrumentation was enabled or reset, or
+# 0 if it is disabled
+def get_elapsed_seconds():
+    if not is_enabled():
+        return 0.0
+    return time.perf_counter() - start_time
+
+
+# Wraps the given output stream so that every write to it is timed as part of
+# the write stage when instrumentation is enabled; otherwise, returns the
+# stream itself
+def wrap_output(out):
+    if not is_enabled():
+        return out
+    return TimedOutput(out)
+
+
+# An output stream whose writes are timed as part of the write stage; every
+# other attribute is looked up on the underlying stream
+class TimedOutput(object):
+    __slots__ = ("out", "write", "writelines")
+
+    def __init__(self, out):
+        self.out = out
+        self.write = wrap_func(out.write, WRITE, "write")
+        self.writelines = wrap_func(out.writelines, WRITE, "writelines")
+
+    def __getattr__(self, name):
+        return getattr(self.out, name)
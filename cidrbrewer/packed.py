@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import contextlib
+import mmap
+import os
+import struct
+
+from cidrbrewer import bulk, core
+
+# The struct format of a packed address (a 4-byte big-endian integer)
+ADDR_STRUCT = struct.Struct(">I")
+# The struct format of a packed address followed by a 1-byte number of subnet
+# bits
+ADDR_PREFIX_STRUCT = struct.Struct(">IB")
+
+
+# Returns the struct format of every record in a packed file
+def get_record_struct(with_prefix=False):
+    return ADDR_PREFIX_STRUCT if with_prefix else ADDR_STRUCT
+
+
+# Packs the given integer address (and number of subnet bits, if given) into
+# its binary representation
+def pack_addr(addr, num_subnet_bits=None):
+    if num_subnet_bits is None:
+        return ADDR_STRUCT.pack(addr)
+    return ADDR_PREFIX_STRUCT.pack(addr, num_subnet_bits)
+
+
+# Memory-maps the packed file at the given path for reading, so that its
+# records can be decoded without reading the file into memory
+@contextlib.contextmanager
+def open_packed(packed_path):
+    with open(packed_path, "rb") as packed_file:
+        # Empty files cannot be memory-mapped
+        if os.fstat(packed_file.fileno()).st_size == 0:
+            yield b""
+            return
+        buffer = mmap.mmap(packed_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield buffer
+        finally:
+            try:
+                buffer.close()
+            except BufferError:
+                # Views of the buffer are still alive (such as when an error
+                # interrupted processing), so the mapping is left to be
+                # released once they are garbage-collected
+                pass
+
+
+# Raises a ValueError if the given buffer does not contain a whole number of
+# packed records
+def check_packed_size(buffer, with_prefix=False):
+    record_size = get_record_struct(with_prefix).size
+    if len(buffer) % record_size != 0:
+        raise ValueError(
+            "packed input size ({} bytes) is not a multiple of {} bytes".format(
+                len(buffer), record_size
+            )
+        )
+
+
+# Raises a ValueError identifying the packed record with an invalid number of
+# subnet bits
+def raise_invalid_prefix_len(record_num, num_subnet_bits):
+    raise ValueError(
+        "invalid prefix length {} in packed record {} (must be 0-{})".format(
+            num_subnet_bits, record_num, core.ADDR_LEN
+        )
+    )
+
+
+# Lazily yields a tuple containing the integer address and number of subnet
+# bits for every record in the given buffer of packed records, decoding
+# directly from the buffer; records without a number of subnet bits use the
+# given one; errors identify records by their number in the whole file, where
+# the buffer starts at the given record
+def iter_packed(
+    buffer, with_prefix=False, num_subnet_bits=core.ADDR_LEN, first_record_num=1
+):
+    check_packed_size(buffer, with_prefix)
+    if with_prefix:
+        for record_num, (addr, addr_num_subnet_bits) in enumerate(
+            ADDR_PREFIX_STRUCT.iter_unpack(buffer), first_record_num
+        ):
+            if addr_num_subnet_bits > core.ADDR_LEN:
+                raise_invalid_prefix_len(record_num, addr_num_subnet_bits)
+            yield addr, addr_num_subnet_bits
+    else:
+        for (addr,) in ADDR_STRUCT.iter_unpack(buffer):
+            yield addr, num_subnet_bits
+
+
+# Decodes the given buffer of packed records into a tuple containing the
+# integer addresses and numbers of subnet bits, suitable for passing to
+# bulk.get_subnets(); with NumPy (used whenever it is available, unless
+# use_numpy is False), these are zero-copy array views of the buffer, and
+# otherwise they are lists; records without a number of subnet bits use the
+# given one, and errors identify records as in iter_packed()
+def get_packed_arrays(
+    buffer,
+    with_prefix=False,
+    num_subnet_bits=core.ADDR_LEN,
+    use_numpy=None,
+    first_record_num=1,
+):
+    check_packed_size(buffer, with_prefix)
+    if use_numpy is None:
+        use_numpy = bulk.has_numpy()
+    numpy = bulk.get_numpy() if use_numpy else None
+    if use_numpy and with_prefix:
+        records = numpy.frombuffer(
+            buffer,
+            dtype=numpy.dtype([("addr", ">u4"), ("num_subnet_bits", "u1")]),
+        )
+        invalid_indices = numpy.flatnonzero(records["num_subnet_bits"] > core.ADDR_LEN)
+        if len(invalid_indices):
+            raise_invalid_prefix_len(
+                first_record_num + invalid_indices[0],
+                records["num_subnet_bits"][invalid_indices[0]],
+            )
+        return records["addr"], records["num_subnet_bits"]
+    if use_numpy:
+        return numpy.frombuffer(buffer, dtype=">u4"), num_subnet_bits
+    addrs_and_bits = list(
+        iter_packed(buffer, with_prefix, num_subnet_bits, first_record_num)
+    )
+    addrs = [addr for addr, _ in addrs_and_bits]
+    if not with_prefix:
+        return addrs, num_subnet_bits
+    return addrs, [addr_num_subnet_bits for _, addr_num_subnet_bits in addrs_and_bits]
+
+
+# Lazily yields the integer addresses and numbers of subnet bits (as returned
+# by get_packed_arrays()) of every chunk of at most the given number of records
+# in the given buffer; each chunk is decoded from a view of the buffer only
+# once it is reached, so only one chunk is ever held in memory, even when the
+# records are decoded into lists without NumPy
+def iter_packed_arrays(
+    buffer,
+    chunk_size,
+    with_prefix=False,
+    num_subnet_bits=core.ADDR_LEN,
+    use_numpy=None,
+):
+    check_packed_size(buffer, with_prefix)
+    record_size = get_record_struct(with_prefix).size
+    chunk_len = chunk_size * record_size
+    view = memoryview(buffer)
+    for start in range(0, len(view), chunk_len):
+        yield get_packed_arrays(
+            view[start : start + chunk_len],
+            with_prefix,
+            num_subnet_bits,
+            use_numpy,
+            start // record_size + 1,
+        )
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import collections
+import itertools
+import os
+
+# The default number of queries processed by a worker at a time
+DEFAULT_CHUNK_SIZE = 1000
+# The number of chunks queued per worker, which keeps every worker busy while
+# bounding how much of the input is held in memory at once
+CHUNKS_PER_JOB = 2
+
+
+# Lazily splits the given iterable into lists of at most the given size
+def iter_chunks(iterable, chunk_size=DEFAULT_CHUNK_SIZE):
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, chunk_size))
+
+
+# Computes the number of worker processes to use for the given number of jobs,
+# where 0 means one per CPU
+def get_num_workers(num_jobs):
+    if num_jobs < 0:
+        raise ValueError("number of jobs must be at least 0")
+    if num_jobs == 0:
+        return os.cpu_count() or 1
+    return num_jobs
+
+
+# Lazily yields the result of calling the given function (with the given
+# additional arguments) on every chunk of the given iterable, using a pool of
+# worker processes; results are yielded in input order unless ordered is
+# False, in which case they are yielded as soon as they are ready; only a
+# bounded number of chunks are in flight at once, so memory use does not grow
+# with the size of the input
+def map_chunks(
+    func,
+    iterable,
+    *args,
+    num_jobs=0,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    ordered=True,
+):
+    # Importing concurrent.futures (and with it, multiprocessing) is only worth
+    # its cost when queries are actually processed in parallel
+    import concurrent.futures
+
+    num_workers = get_num_workers(num_jobs)
+    max_pending = num_workers * CHUNKS_PER_JOB
+    with concurrent.futures.ProcessPoolExecutor(num_workers) as executor:
+        if ordered:
+            pending = collections.deque()
+            for chunk in iter_chunks(iterable, chunk_size):
+                pending.append(executor.submit(func, chunk, *args))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for chunk in iter_chunks(iterable, chunk_size):
+                pending.add(executor.submit(func, chunk, *args))
+                if len(pending) >= max_pending:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        yield future.result()
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
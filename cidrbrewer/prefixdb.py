@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+import array
+import bisect
+import contextlib
+import os
+import struct
+import sys
+
+from cidrbrewer import core, packed, stream, trie
+
+# The bytes at the start of every compiled prefix database, which identify the
+# file format (and its version)
+MAGIC = b"CIDRPDB1"
+# The struct format of the database header: the magic bytes followed by the
+# number of entries, the number of ranges, and the size of the label data
+HEADER_STRUCT = struct.Struct("<8sIII")
+# The struct format of every entry: its network ID, number of subnet bits,
+# index of its parent entry (the longest entry containing it, or -1), and the
+# offset and length of its UTF-8 label (a length of -1 means no label)
+ENTRY_STRUCT = struct.Struct("<IIiIi")
+# The struct format of the start address and entry index of every range
+RANGE_START_STRUCT = struct.Struct("<I")
+RANGE_ENTRY_STRUCT = struct.Struct("<i")
+# The index stored for entries and ranges without a matching entry
+NO_ENTRY = -1
+
+
+# Computes the disjoint ranges of addresses which share the same longest
+# matching entry, given a list of entries (each a tuple containing its network
+# ID and number of subnet bits) sorted by network ID and then prefix length;
+# returns a tuple containing the index of each entry's parent, the start
+# address of each range, and the index of each range's longest matching entry;
+# because subnets are either nested or disjoint, a single sweep with a stack
+# of the enclosing entries finds every boundary
+def get_ranges(sorted_entries):
+    parent_indices = []
+    range_starts = [0]
+    range_entry_indices = [NO_ENTRY]
+
+    def add_range(start_addr, entry_index):
+        if range_starts[-1] == start_addr:
+            range_entry_indices[-1] = entry_index
+        elif range_entry_indices[-1] != entry_index:
+            range_starts.append(start_addr)
+            range_entry_indices.append(entry_index)
+
+    # Every entry in the stack is a tuple containing its index and broadcast ID
+    enclosing_entries = []
+
+    def close_entry():
+        _, broadcast_id = enclosing_entries.pop()
+        if broadcast_id < core.ALL_ONES:
+            add_range(
+                broadcast_id + 1,
+                enclosing_entries[-1][0] if enclosing_entries else NO_ENTRY,
+            )
+
+    for entry_index, (network_id, num_subnet_bits) in enumerate(sorted_entries):
+        while enclosing_entries and enclosing_entries[-1][1] < network_id:
+            close_entry()
+        parent_indices.append(
+            enclosing_entries[-1][0] if enclosing_entries else NO_ENTRY
+        )
+        add_range(network_id, entry_index)
+        enclosing_entries.append(
+            (entry_index, core.get_broadcast_id(network_id, num_subnet_bits))
+        )
+    while enclosing_entries:
+        close_entry()
+    return parent_indices, range_starts, range_entry_indices
+
+
+# Compiles the given entries (each a tuple containing the network ID, number of
+# subnet bits, and label of a subnet) into a prefix database, which is written
+# to the given binary file; later entries replace earlier entries for the same
+# subnet
+def write_db(entries, db_file):
+    labels = {}
+    for network_id, num_subnet_bits, label in entries:
+        labels[core.get_network_id(network_id, num_subnet_bits), num_subnet_bits] = (
+            label
+        )
+    sorted_entries = sorted(labels)
+    parent_indices, range_starts, range_entry_indices = get_ranges(sorted_entries)
+
+    encoded_labels = []
+    label_offset = 0
+    entry_data = []
+    for (network_id, num_subnet_bits), parent_index in zip(
+        sorted_entries, parent_indices
+    ):
+        label = labels[network_id, num_subnet_bits]
+        if label is None:
+            label_len = NO_ENTRY
+        else:
+            encoded_label = label.encode("utf-8")
+            encoded_labels.append(encoded_label)
+            label_len = len(encoded_label)
+        entry_data.append(
+            ENTRY_STRUCT.pack(
+                network_id, num_subnet_bits, parent_index, label_offset, label_len
+            )
+        )
+        label_offset += max(label_len, 0)
+
+    db_file.write(
+        HEADER_STRUCT.pack(MAGIC, len(sorted_entries), len(range_starts), label_offset)
+    )
+    db_file.writelines(entry_data)
+    db_file.write(array_to_bytes("I", range_starts))
+    db_file.write(array_to_bytes("i", range_entry_indices))
+    db_file.writelines(encoded_labels)
+
+
+# Converts the given integers to little-endian bytes of the given array type
+def array_to_bytes(typecode, values):
+    values = array.array(typecode, values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+# Returns a read-only sequence of the little-endian integers of the given array
+# type between the given offsets of the given buffer; on little-endian machines
+# (i.e. almost all), the sequence is a view of the buffer, so nothing is copied
+def bytes_to_array(typecode, buffer, start, end):
+    if sys.byteorder == "little":
+        return memoryview(buffer)[start:end].cast(typecode)
+    values = array.array(typecode, buffer[start:end])
+    values.byteswap()
+    return values
+
+
+# Compiles the prefix table in the given text file (in the format read by
+# trie.load_table()) into a prefix database, which is written to the given
+# binary file
+def compile_table(table_file, db_file):
+    write_db(stream.parse_lines(table_file, trie.parse_table_line), db_file)
+
+
+# Compiles the prefix table at the given path into a prefix database at the
+# given path; the database is written to a temporary file which then replaces
+# any existing database in a single step, so concurrent readers never see a
+# partially written database
+def compile_table_path(table_path, db_path):
+    tmp_db_path = "{}.tmp{}".format(db_path, os.getpid())
+    try:
+        with open(table_path, "r") as table_file, open(tmp_db_path, "wb") as db_file:
+            compile_table(table_file, db_file)
+        os.replace(tmp_db_path, db_path)
+    finally:
+        if os.path.exists(tmp_db_path):
+            os.remove(tmp_db_path)
+
+
+# Returns True if the given buffer contains a compiled prefix database;
+# otherwise, returns False
+def is_db(buffer):
+    return buffer[: len(MAGIC)] == MAGIC
+
+
+# A compiled prefix table backed by a (typically memory-mapped) buffer, which
+# answers the same queries as a PrefixTrie without parsing or building
+# anything up front: the longest match for an address is found by a binary
+# search over the disjoint ranges of addresses sharing the same longest match
+class PrefixDB(object):
+    __slots__ = (
+        "buffer",
+        "num_entries",
+        "entries_offset",
+        "range_starts",
+        "range_entry_indices",
+        "labels_offset",
+    )
+
+    def __init__(self, buffer):
+        if len(buffer) < HEADER_STRUCT.size or not is_db(buffer):
+            raise ValueError("not a compiled prefix database")
+        _, num_entries, num_ranges, labels_size = HEADER_STRUCT.unpack_from(buffer)
+        ranges_offset = HEADER_STRUCT.size + num_entries * ENTRY_STRUCT.size
+        range_entries_offset = ranges_offset + num_ranges * RANGE_START_STRUCT.size
+        labels_offset = range_entries_offset + num_ranges * RANGE_ENTRY_STRUCT.size
+        if len(buffer) != labels_offset + labels_size:
+            raise ValueError("compiled prefix database is truncated or corrupt")
+        self.buffer = buffer
+        self.num_entries = num_entries
+        self.entries_offset = HEADER_STRUCT.size
+        self.range_starts = bytes_to_array(
+            "I", buffer, ranges_offset, range_entries_offset
+        )
+        self.range_entry_indices = bytes_to_array(
+            "i", buffer, range_entries_offset, labels_offset
+        )
+        self.labels_offset = labels_offset
+
+    def __len__(self):
+        return self.num_entries
+
+    # Returns a tuple containing the entry at the given index (a tuple
+    # containing its network ID, number of subnet bits, and label) and the
+    # index of its parent entry
+    def get_entry(self, entry_index):
+        network_id, num_subnet_bits, parent_index, label_offset, label_len = (
+            ENTRY_STRUCT.unpack_from(
+                self.buffer, self.entries_offset + entry_index * ENTRY_STRUCT.size
+            )
+        )
+        if label_len == NO_ENTRY:
+            label = None
+        else:
+            label_start = self.labels_offset + label_offset
+            label = bytes(self.buffer[label_start : label_start + label_len]).decode(
+                "utf-8"
+            )
+        return (network_id, num_subnet_bits, label), parent_index
+
+    # Returns the index of the entry with the longest prefix containing the
+    # given integer address, or -1 if no subnet in the database contains it
+    def get_longest_match_index(self, addr):
+        range_index = bisect.bisect_right(self.range_starts, addr) - 1
+        return self.range_entry_indices[range_index]
+
+    # Returns a list of every entry whose subnet contains the given integer
+    # address, from the shortest prefix to the longest
+    def get_matches(self, addr):
+        matches = []
+        entry_index = self.get_longest_match_index(addr)
+        while entry_index != NO_ENTRY:
+            entry, entry_index = self.get_entry(entry_index)
+            matches.append(entry)
+        matches.reverse()
+        return matches
+
+    # Lazily yields every entry whose subnet contains the given integer
+    # address, from the shortest prefix to the longest
+    def iter_matches(self, addr):
+        return iter(self.get_matches(addr))
+
+    # Returns the entry with the longest prefix containing the given integer
+    # address, or None if no subnet in the database contains it
+    def get_longest_match(self, addr):
+        entry_index = self.get_longest_match_index(addr)
+        if entry_index == NO_ENTRY:
+            return None
+        return self.get_entry(entry_index)[0]
+
+    # Releases the views of the underlying buffer, so that it can be closed
+    def release(self):
+        for values in (self.range_starts, self.range_entry_indices):
+            if isinstance(values, memoryview):
+                values.release()
+
+
+# Opens the prefix table at the given path, which is either a compiled prefix
+# database (which is memory-mapped) or a text table (which is loaded into a
+# PrefixTrie)
+@contextlib.contextmanager
+def open_table(table_path):
+    with packed.open_packed(table_path) as buffer:
+        if is_db(buffer):
+            table = PrefixDB(buffer)
+            try:
+                yield table
+            finally:
+                table.release()
+            return
+    with open(table_path, "r") as table_file:
+        yield trie.load_table(table_file)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+import heapq
+
+from cidrbrewer import core
+
+# The supported set operations on lists of subnets
+UNION = "union"
+INTERSECTION = "intersection"
+DIFFERENCE = "difference"
+SET_OPERATIONS = (UNION, INTERSECTION, DIFFERENCE)
+
+
+# Lazily yields the minimal list of subnets (each a tuple containing its
+# network ID and number of subnet bits) exactly covering the given inclusive
+# range of integer addresses; each subnet is the largest aligned block which
+# starts at the current address and does not extend past the end of the range
+def range_to_cidrs(start_addr, end_addr, addr_len=core.ADDR_LEN):
+    while start_addr <= end_addr:
+        num_block_bits = min(
+            core.get_num_trailing_zeros(start_addr, addr_len),
+            (end_addr - start_addr + 1).bit_length() - 1,
+        )
+        yield start_addr, addr_len - num_block_bits
+        start_addr += 1 << num_block_bits
+
+
+# Computes the inclusive range of integer addresses (a tuple containing the
+# network ID and broadcast ID) covered by the given subnet
+def cidr_to_range(addr, num_subnet_bits):
+    return (
+        core.get_network_id(addr, num_subnet_bits),
+        core.get_broadcast_id(addr, num_subnet_bits),
+    )
+
+
+# Lazily merges the given inclusive address ranges, which must be sorted by
+# their start address, yielding the disjoint ranges covering the same
+# addresses; overlapping and adjacent ranges are combined in a single sweep
+def merge_ranges(sorted_ranges):
+    merged_start = merged_end = None
+    for start_addr, end_addr in sorted_ranges:
+        if merged_start is None:
+            merged_start, merged_end = start_addr, end_addr
+        elif start_addr <= merged_end + 1:
+            merged_end = max(merged_end, end_addr)
+        else:
+            yield merged_start, merged_end
+            merged_start, merged_end = start_addr, end_addr
+    if merged_start is not None:
+        yield merged_start, merged_end
+
+
+# Lazily yields the minimal list of subnets covering exactly the same addresses
+# as every given subnet (each a tuple containing its integer network ID and
+# number of subnet bits), in ascending order
+def aggregate_cidrs(cidrs):
+    sorted_ranges = sorted(cidr_to_range(*cidr) for cidr in cidrs)
+    for start_addr, end_addr in merge_ranges(sorted_ranges):
+        yield from range_to_cidrs(start_addr, end_addr)
+
+
+# Lazily yields the minimal list of subnets covering every address in the
+# given parent subnet which is not covered by any of the given allocated
+# subnets, in ascending order; allocations outside of the parent subnet are
+# ignored
+def get_free_cidrs(addr, num_subnet_bits, allocated_cidrs):
+    sorted_ranges = sorted(cidr_to_range(*cidr) for cidr in allocated_cidrs)
+    for start_addr, end_addr in subtract_ranges(
+        [cidr_to_range(addr, num_subnet_bits)], sorted_ranges
+    ):
+        yield from range_to_cidrs(start_addr, end_addr)
+
+
+# Lazily yields the disjoint ranges covering every address in either of the
+# given lists of inclusive address ranges, each sorted by start address
+def union_ranges(sorted_ranges_1, sorted_ranges_2):
+    return merge_ranges(heapq.merge(sorted_ranges_1, sorted_ranges_2))
+
+
+# Lazily yields the disjoint ranges covering every address in both of the given
+# lists of inclusive address ranges, each sorted by start address; both lists
+# are swept once in step, so only one range of each is held at a time
+def intersect_ranges(sorted_ranges_1, sorted_ranges_2):
+    ranges_2 = merge_ranges(sorted_ranges_2)
+    range_2 = next(ranges_2, None)
+    for start_addr_1, end_addr_1 in merge_ranges(sorted_ranges_1):
+        while range_2 is not None and range_2[0] <= end_addr_1:
+            start_addr_2, end_addr_2 = range_2
+            if end_addr_2 >= start_addr_1:
+                yield max(start_addr_1, start_addr_2), min(end_addr_1, end_addr_2)
+            if end_addr_2 > end_addr_1:
+                # The rest of this range may overlap the next range of the first
+                # list
+                break
+            range_2 = next(ranges_2, None)
+
+
+# Lazily yields the disjoint ranges covering every address in the first of the
+# given lists of inclusive address ranges but not in the second, each sorted by
+# start address; like intersect_ranges(), both lists are swept once in step
+def subtract_ranges(sorted_ranges_1, sorted_ranges_2):
+    ranges_2 = merge_ranges(sorted_ranges_2)
+    range_2 = next(ranges_2, None)
+    for start_addr_1, end_addr_1 in merge_ranges(sorted_ranges_1):
+        free_addr = start_addr_1
+        while range_2 is not None and range_2[0] <= end_addr_1:
+            start_addr_2, end_addr_2 = range_2
+            if end_addr_2 >= free_addr:
+                if start_addr_2 > free_addr:
+                    yield free_addr, start_addr_2 - 1
+                free_addr = end_addr_2 + 1
+            if end_addr_2 > end_addr_1:
+                break
+            range_2 = next(ranges_2, None)
+        if free_addr <= end_addr_1:
+            yield free_addr, end_addr_1
+
+
+# Lazily yields every pair of overlapping subnets among the given entries (each
+# a tuple whose first two items are the integer network ID and number of
+# subnet bits of a subnet, such as a table entry with a label), as tuples
+# containing the enclosing entry and the entry it contains (or duplicates);
+# because two subnets overlap only if one contains the other, a single sweep
+# over the entries sorted by network ID and prefix length, keeping a stack of
+# the subnets enclosing the current one, finds all k pairs in O(n log n + k)
+# rather than comparing every pair
+def get_overlaps(entries):
+    # Every item in the stack is a tuple containing the broadcast ID of an
+    # entry and the entry itself; each entry contains every entry above it
+    enclosing_entries = []
+    for entry in sorted(entries, key=get_entry_sort_key):
+        network_id, num_subnet_bits = entry[0], entry[1]
+        while enclosing_entries and enclosing_entries[-1][0] < network_id:
+            enclosing_entries.pop()
+        for _, enclosing_entry in enclosing_entries:
+            yield enclosing_entry, entry
+        enclosing_entries.append(
+            (core.get_broadcast_id(network_id, num_subnet_bits), entry)
+        )
+
+
+# Returns the key by which entries are sorted for a sweep: the network ID and
+# number of subnet bits, ignoring any other (possibly unorderable) items
+def get_entry_sort_key(entry):
+    return entry[0], entry[1]
+
+
+# The function implementing each set operation on sorted lists of ranges
+SET_OPERATION_FUNCS = {
+    UNION: union_ranges,
+    INTERSECTION: intersect_ranges,
+    DIFFERENCE: subtract_ranges,
+}
+
+
+# Lazily yields the inclusive address range covered by each of the given
+# subnets, which must already be sorted by network ID; raises a ValueError
+# (naming the given list) as soon as a subnet is out of order, since a set
+# operation on unsorted input would silently produce a wrong result
+def iter_sorted_ranges(sorted_cidrs, name="subnets"):
+    prev_start_addr = -1
+    for cidr in sorted_cidrs:
+        start_addr, end_addr = cidr_to_range(*cidr)
+        if start_addr < prev_start_addr:
+            raise ValueError(
+                "{} are not sorted ({}/{} follows {})".format(
+                    name,
+                    core.int_to_dotted(start_addr),
+                    cidr[1],
+                    core.int_to_dotted(prev_start_addr),
+                )
+            )
+        prev_start_addr = start_addr
+        yield start_addr, end_addr
+
+
+# Lazily yields the minimal list of subnets covering the result of the given
+# set operation (union, intersection or difference) on the given lists of
+# subnets, in ascending order; the lists are sorted in memory unless
+# presorted is True, in which case they are streamed with bounded memory and
+# must already be sorted by network ID
+def apply_set_operation(operation, cidrs_1, cidrs_2, presorted=False):
+    if presorted:
+        sorted_ranges_1 = iter_sorted_ranges(cidrs_1, "first subnets")
+        sorted_ranges_2 = iter_sorted_ranges(cidrs_2, "second subnets")
+    else:
+        sorted_ranges_1 = sorted(cidr_to_range(*cidr) for cidr in cidrs_1)
+        sorted_ranges_2 = sorted(cidr_to_range(*cidr) for cidr in cidrs_2)
+    for start_addr, end_addr in SET_OPERATION_FUNCS[operation](
+        sorted_ranges_1, sorted_ranges_2
+    ):
+        yield from range_to_cidrs(start_addr, end_addr)
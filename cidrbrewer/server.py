@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import socket
+import stat
+
+from cidrbrewer import stream
+
+# The maximum length (in bytes) of a single query line
+MAX_LINE_LEN = 1 << 16
+# The encoder for every response, which omits insignificant whitespace
+ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+# Computes the response to the given query line (one or two IP addresses), a
+# JSON object on a single line containing either the list of records built by
+# the given function (which takes an iterable of queries, like
+# __main__.get_query_records()) or an error message
+def get_response(line, get_query_records):
+    try:
+        query = stream.parse_query(line)
+        records = list(get_query_records([query]))
+    except ValueError as error:
+        response = {"error": str(error)}
+    else:
+        response = {"records": records}
+    return ENCODER.encode(response) + "\n"
+
+
+# Answers every query sent by a single client, in order; clients may pipeline
+# any number of queries without waiting for responses, since responses are
+# written as soon as each query is read and are only waited on when the
+# client falls behind in reading them
+async def handle_client(reader, writer, get_query_records):
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                writer.write(
+                    ENCODER.encode(
+                        {"error": "query exceeds {} bytes".format(MAX_LINE_LEN)}
+                    ).encode("utf-8")
+                    + b"\n"
+                )
+                break
+            if not line:
+                break
+            writer.write(
+                get_response(
+                    line.decode("utf-8", errors="replace"), get_query_records
+                ).encode("utf-8")
+            )
+            await writer.drain()
+        await writer.drain()
+    except ConnectionError:
+        # The client disconnected without reading every response
+        pass
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+# Starts listening for clients on the Unix domain socket at the given path,
+# returning the asyncio server
+async def start_server(socket_path, get_query_records):
+    return await asyncio.start_unix_server(
+        functools.partial(handle_client, get_query_records=get_query_records),
+        path=socket_path,
+        limit=MAX_LINE_LEN,
+    )
+
+
+# Removes the Unix domain socket at the given path if it exists (such as when
+# left behind by a server which was killed), refusing to remove anything else
+def remove_socket(socket_path):
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError("{} exists and is not a socket".format(socket_path))
+    os.remove(socket_path)
+
+
+# Removes the Unix domain socket at the given path if it was left behind by a
+# server which is no longer running (i.e. connecting to it is refused), raising
+# a ValueError if another server is still listening on it
+def remove_stale_socket(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+        else:
+            raise ValueError("a server is already running on {}".format(socket_path))
+    remove_socket(socket_path)
+
+
+async def serve_forever(socket_path, get_query_records):
+    server = await start_server(socket_path, get_query_records)
+    async with server:
+        await server.serve_forever()
+
+
+# Answers queries from any number of concurrent clients on the Unix domain
+# socket at the given path until interrupted
+def serve(socket_path, get_query_records):
+    remove_stale_socket(socket_path)
+    try:
+        asyncio.run(serve_forever(socket_path, get_query_records))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        remove_socket(socket_path)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+import contextlib
+import io
+import sys
+
+from cidrbrewer import core, instrument
+
+# The path which, when passed as an input file, refers to standard input
+STDIN_PATH = "-"
+# The size (in bytes) of the output buffer used when streaming results
+OUTPUT_BUFFER_SIZE = 1 << 16
+# The policies for handling malformed lines in an input file: either stop with
+# an error, or report the line and skip it
+FAIL_ON_ERROR = "fail"
+SKIP_ON_ERROR = "skip"
+ERROR_POLICIES = (FAIL_ON_ERROR, SKIP_ON_ERROR)
+
+
+# An error raised when a line of an input file is malformed
+class InputError(ValueError):
+    pass
+
+
+# Opens the given input path for reading (where "-" refers to stdin); the file
+# is only closed on exit if it was opened here
+@contextlib.contextmanager
+def open_input(input_path):
+    if input_path == STDIN_PATH:
+        yield sys.stdin
+    else:
+        with open(input_path, "r") as input_file:
+            yield input_file
+
+
+# Lazily yields a tuple containing the line number and contents of every
+# meaningful line of the given input file, skipping blank lines and comments
+def read_numbered_lines(input_file):
+    for line_num, line in enumerate(input_file, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line_num, line
+
+
+# Returns the name under which errors in the given input file are reported
+def get_input_name(input_file):
+    return getattr(input_file, "name", "<input>")
+
+
+# Lazily yields the result of parsing every meaningful line of the given input
+# file with the given function; if parsing a line raises a ValueError, an
+# InputError identifying the line is raised, or (if the error policy is to
+# skip) the error is reported to stderr and the line is skipped
+def parse_lines(input_file, parse_line, on_error=FAIL_ON_ERROR):
+    return parse_numbered_lines(
+        read_numbered_lines(input_file),
+        parse_line,
+        on_error,
+        get_input_name(input_file),
+    )
+
+
+# Like parse_lines(), but parses lines already read from the input file with
+# the given name (each a tuple containing its line number and contents, as
+# yielded by read_numbered_lines()), such as lines sent to a worker process
+def parse_numbered_lines(
+    numbered_lines, parse_line, on_error=FAIL_ON_ERROR, input_name="<input>"
+):
+    for line_num, line in numbered_lines:
+        try:
+            result = parse_line(line)
+        except ValueError as error:
+            message = "{}, line {}: {}".format(input_name, line_num, error)
+            if on_error == FAIL_ON_ERROR:
+                raise InputError(message) from None
+            print("warning: skipping {}".format(message), file=sys.stderr)
+            continue
+        yield result
+
+
+# Parses a query (a sequence of one or two IPv4 or IPv6 address strings) into
+# a tuple of core.Addr objects, raising a ValueError if it is malformed, is a
+# single address without slash notation (whose subnet is unknown) or pairs an
+# IPv4 address with an IPv6 address
+def parse_query_addr_strs(addr_strs):
+    if not 1 <= len(addr_strs) <= 2:
+        raise ValueError(
+            "expected one or two IP addresses but found {}".format(len(addr_strs))
+        )
+    addrs = tuple(map(core.Addr.from_any_str, addr_strs))
+    if len(addrs) == 1:
+        core.check_slash_notation(addr_strs[0], addrs[0].num_subnet_bits)
+    elif addrs[0].addr_len != addrs[1].addr_len:
+        raise ValueError(
+            "cannot compare {!r} with {!r} (IPv4 and IPv6 addresses)".format(*addr_strs)
+        )
+    return addrs
+
+
+# Parses a query line (see parse_query_addr_strs()) into a tuple of one or two
+# core.Addr objects, so that handlers never parse the same address again
+@instrument.stage(instrument.PARSE)
+def parse_query(line):
+    return parse_query_addr_strs(line.split())
+
+
+# Parses a range (a sequence of its first and last IPv4 or IPv6 address
+# strings, neither in slash notation) into a tuple containing its integer start
+# and end addresses and its address length, raising a ValueError if it is
+# malformed, is backwards or mixes an IPv4 address with an IPv6 address
+def parse_range_addr_strs(addr_strs):
+    if len(addr_strs) != 2:
+        raise ValueError(
+            "expected the first and last IP addresses of a range but found {!r}".format(
+                " ".join(addr_strs)
+            )
+        )
+    (start_addr, start_bits, addr_len), (end_addr, end_bits, end_addr_len) = map(
+        core.parse_any_addr, addr_strs
+    )
+    if start_bits is not None or end_bits is not None:
+        raise ValueError(
+            "expected the first and last IP addresses of a range without slash "
+            "notation but found {!r}".format(" ".join(addr_strs))
+        )
+    if addr_len != end_addr_len:
+        raise ValueError(
+            "cannot mix IPv4 and IPv6 addresses in a range ({})".format(
+                " ".join(addr_strs)
+            )
+        )
+    if start_addr > end_addr:
+        raise ValueError("range starts after it ends ({} > {})".format(*addr_strs))
+    return start_addr, end_addr, addr_len
+
+
+# Parses a range line (see parse_range_addr_strs()) into a tuple containing its
+# integer start and end addresses and its address length
+@instrument.stage(instrument.PARSE)
+def parse_range_line(line):
+    return parse_range_addr_strs(line.split())
+
+
+# Parses the first IPv4 address on the given line (ignoring any trailing
+# fields) into a core.Addr, raising a ValueError if it is malformed
+@instrument.stage(instrument.PARSE)
+def parse_first_addr(line):
+    return core.Addr.from_str(line.split(None, 1)[0])
+
+
+# Like parse_first_addr(), but accepts IPv6 addresses as well
+@instrument.stage(instrument.PARSE)
+def parse_first_any_addr(line):
+    return core.Addr.from_any_str(line.split(None, 1)[0])
+
+
+# Parses the subnet (in slash notation, or a single-host subnet) at the start of
+# the given line (ignoring any trailing fields) into a tuple containing its
+# integer network ID and number of subnet bits, raising a ValueError if it is
+# malformed
+@instrument.stage(instrument.PARSE)
+def parse_first_cidr(line):
+    return core.parse_cidr_str(line.split(None, 1)[0])
+
+
+# Lazily yields a tuple of one or two core.Addr objects for every query in the
+# given input file, handling malformed lines according to the given policy
+def read_queries(input_file, on_error=FAIL_ON_ERROR):
+    return parse_lines(input_file, parse_query, on_error)
+
+
+# Lazily yields the range on every line of the given input file (see
+# parse_range_line()), handling malformed lines according to the given policy
+def read_ranges(input_file, on_error=FAIL_ON_ERROR):
+    return parse_lines(input_file, parse_range_line, on_error)
+
+
+# Lazily yields the first address on every line of the given input file as a
+# core.Addr, ignoring any trailing fields and handling malformed lines according
+# to the given policy; IPv6 addresses are treated as malformed unless
+# allow_ipv6 is True
+def read_addrs(input_file, on_error=FAIL_ON_ERROR, allow_ipv6=False):
+    if allow_ipv6:
+        return parse_lines(input_file, parse_first_any_addr, on_error)
+    return parse_lines(input_file, parse_first_addr, on_error)
+
+
+# Lazily yields the subnet at the start of every line of the given input file
+# (see parse_first_cidr()), handling malformed lines according to the given
+# policy
+def read_cidrs(input_file, on_error=FAIL_ON_ERROR):
+    return parse_lines(input_file, parse_first_cidr, on_error)
+
+
+# Temporarily replaces stdout with a block-buffered stream so that results are
+# written in large chunks rather than line by line; streams without a file
+# descriptor (such as in-memory streams) are used as-is
+@contextlib.contextmanager
+def buffered_stdout(buffer_size=OUTPUT_BUFFER_SIZE):
+    try:
+        fileno = sys.stdout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        yield sys.stdout
+        return
+    sys.stdout.flush()
+    with open(
+        fileno,
+        "w",
+        buffering=buffer_size,
+        encoding=sys.stdout.encoding,
+        closefd=False,
+    ) as out:
+        out = instrument.wrap_output(out)
+        with contextlib.redirect_stdout(out):
+            yield out
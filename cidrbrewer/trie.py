@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+from cidrbrewer import core, instrument, stream
+
+# The indices of the fields stored in every trie node (nodes are plain lists
+# rather than objects to keep large tables compact)
+ZERO_CHILD = 0
+ONE_CHILD = 1
+ENTRY = 2
+
+
+# Creates a trie node with no children and no entry
+def create_node():
+    return [None, None, None]
+
+
+# A binary trie of subnets, keyed by the bits of each network ID, which answers
+# longest-prefix-match queries in at most 32 steps regardless of table size;
+# every entry is a tuple containing the network ID, number of subnet bits, and
+# label of a subnet
+class PrefixTrie(object):
+    __slots__ = ("root", "num_entries")
+
+    def __init__(self):
+        self.root = create_node()
+        self.num_entries = 0
+
+    def __len__(self):
+        return self.num_entries
+
+    # Adds the subnet containing the given integer address to the trie,
+    # replacing any existing entry for the same subnet
+    def insert(self, addr, num_subnet_bits, label=None):
+        network_id = core.get_network_id(addr, num_subnet_bits)
+        node = self.root
+        for shift in range(core.ADDR_LEN - 1, core.ADDR_LEN - num_subnet_bits - 1, -1):
+            bit = (network_id >> shift) & 1
+            if node[bit] is None:
+                node[bit] = create_node()
+            node = node[bit]
+        if node[ENTRY] is None:
+            self.num_entries += 1
+        node[ENTRY] = (network_id, num_subnet_bits, label)
+
+    # Lazily yields every entry whose subnet contains the given integer
+    # address, from the shortest prefix to the longest
+    def iter_matches(self, addr):
+        node = self.root
+        shift = core.ADDR_LEN
+        while node is not None:
+            if node[ENTRY] is not None:
+                yield node[ENTRY]
+            if shift == 0:
+                return
+            shift -= 1
+            node = node[(addr >> shift) & 1]
+
+    # Returns a list of every entry whose subnet contains the given integer
+    # address, from the shortest prefix to the longest
+    def get_matches(self, addr):
+        return list(self.iter_matches(addr))
+
+    # Returns the entry with the longest prefix containing the given integer
+    # address, or None if no subnet in the trie contains it
+    def get_longest_match(self, addr):
+        longest_match = None
+        node = self.root
+        shift = core.ADDR_LEN
+        while node is not None:
+            if node[ENTRY] is not None:
+                longest_match = node[ENTRY]
+            if shift == 0:
+                break
+            shift -= 1
+            node = node[(addr >> shift) & 1]
+        return longest_match
+
+
+# Parses a line of a table file into a tuple containing the network ID, number
+# of subnet bits, and label (or None) of a subnet
+@instrument.stage(instrument.PARSE)
+def parse_table_line(line):
+    fields = line.split(None, 1)
+    network_id, num_subnet_bits = core.parse_cidr_str(fields[0])
+    return network_id, num_subnet_bits, fields[1] if len(fields) == 2 else None
+
+
+# Builds a prefix trie from a table file containing one subnet per line (in
+# slash notation), optionally followed by a label; addresses without slash
+# notation are treated as single-host subnets
+def load_table(table_file):
+    table = PrefixTrie()
+    for network_id, num_subnet_bits, label in stream.parse_lines(
+        table_file, parse_table_line
+    ):
+        table.insert(network_id, num_subnet_bits, label)
+    return table
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer.alloc as alloc
+
+
+def test_get_block_size():
+    """Should round block sizes up to the nearest power of two."""
+    assert alloc.get_block_size(64) == 64
+    assert alloc.get_block_size(50) == 64
+    assert alloc.get_block_size(1) == 1
+
+
+def test_get_host_block_size():
+    """Should leave room for the network and broadcast IDs."""
+    assert alloc.get_host_block_size(14) == 16
+    assert alloc.get_host_block_size(15) == 32
+
+
+def test_allocate_blocks():
+    """Should pack blocks from largest to smallest without gaps."""
+    assert alloc.allocate_blocks(0x2A729880, 25, (16, 50, 16, 32)) == [
+        (64, 0x2A729880, 26),
+        (32, 0x2A7298C0, 27),
+        (16, 0x2A7298E0, 28),
+        (16, 0x2A7298F0, 28),
+    ]
+
+
+def test_allocate_blocks_ipv6():
+    """Should allocate blocks from an IPv6 subnet using 128-bit math."""
+    network_id = 0x20010DB8000000000000000000000000
+    blocks = alloc.allocate_blocks(network_id + 1, 120, (100, 20), 128)
+    assert blocks == [(128, network_id, 121), (32, network_id + 0x80, 123)]
+    assert alloc.get_free_blocks(network_id, 120, blocks, 128) == [
+        (network_id + 0xA0, 123),
+        (network_id + 0xC0, 122),
+    ]
+
+
+def test_allocate_blocks_from_network_id():
+    """Should allocate blocks starting from the network ID of the subnet."""
+    assert alloc.allocate_blocks(0x2A7298A3, 25, (32,)) == [(32, 0x2A729880, 27)]
+
+
+def test_allocate_blocks_too_large():
+    """Should refuse to allocate blocks which do not fit in the subnet."""
+    with pytest.raises(ValueError):
+        alloc.allocate_blocks(0x2A729880, 25, (64, 64, 16))
+
+
+def test_allocate_blocks_no_subnet():
+    """Should refuse to allocate blocks from an address without a subnet."""
+    with pytest.raises(ValueError, match="slash notation"):
+        alloc.allocate_blocks(0x2A729880, None, (64,))
+
+
+def test_get_free_blocks():
+    """Should compute the minimal subnets covering the leftover space."""
+    blocks = alloc.allocate_blocks(0x2A729880, 25, (64, 16))
+    assert alloc.get_free_blocks(0x2A729880, 25, blocks) == [
+        (0x2A7298D0, 28),
+        (0x2A7298E0, 27),
+    ]
+
+
+def test_get_free_blocks_none_allocated():
+    """Should treat the entire subnet as free if no blocks are allocated."""
+    assert alloc.get_free_blocks(0x2A729880, 25, []) == [(0x2A729880, 25)]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer
+
+
+def test_get_details():
+    """Should compute the integer details of an address and its subnet."""
+    details = cidrbrewer.get_details("192.168.19.100/25")
+    assert details == (
+        0xC0A81364,
+        25,
+        0xC0A81300,
+        0xC0A8137F,
+        0xC0A81301,
+        0xC0A8137E,
+        126,
+        32,
+    )
+    assert details.subnet_mask == 0xFFFFFF80
+    assert details.num_addrs == 128
+    assert not details.is_reserved()
+
+
+def test_get_details_strings():
+    """Should render address fields as strings only when asked."""
+    details = cidrbrewer.get_details("192.168.19.100/25")
+    assert str(details) == "192.168.19.100/25"
+    assert details.to_str("broadcast_id") == "192.168.19.127"
+    assert details.to_bin("subnet_mask") == "1" * 25 + "0" * 7
+    with pytest.raises(ValueError):
+        details.to_str("subnet_size")
+
+
+def test_get_details_ipv6():
+    """Should compute the details of an IPv6 address and its subnet."""
+    details = cidrbrewer.get_details("2001:db8::1/64")
+    assert details.num_subnet_bits == 64
+    assert details.is_ipv6()
+    assert details.to_str("network_id") == "2001:db8::"
+
+
+@pytest.mark.parametrize("addr_str", ["10.0.0.1", "2001:db8::1"])
+def test_get_details_no_subnet(addr_str):
+    """Should raise an AddrParseError for an address without slash notation."""
+    with pytest.raises(cidrbrewer.AddrParseError, match="slash notation"):
+        cidrbrewer.get_details(addr_str)
+
+
+def test_get_details_invalid():
+    """Should raise an AddrParseError for a malformed address."""
+    with pytest.raises(cidrbrewer.AddrParseError):
+        cidrbrewer.get_details("192.168.19.300")
+
+
+def test_get_details_immutable():
+    """Should not allow results to be modified."""
+    details = cidrbrewer.get_details("192.168.19.100/25")
+    with pytest.raises(AttributeError):
+        details.addr = 0
+    with pytest.raises(AttributeError):
+        details.label = "web"
+
+
+def test_compare():
+    """Should compute the smallest subnet containing both addresses."""
+    comparison = cidrbrewer.compare("10.0.0.1/24", "10.0.1.5/24")
+    assert comparison.can_communicate is False
+    assert comparison.num_subnet_bits == 23
+    assert comparison.supernet.to_str("network_id") == "10.0.0.0"
+    assert comparison.addr_2.network_id == 0x0A000100
+
+
+def test_compare_no_subnet():
+    """Should compare addresses without slash notation, whose subnets are unknown."""
+    comparison = cidrbrewer.compare("10.0.0.1", "10.0.0.9/24")
+    assert comparison.addr_1 is None
+    assert str(comparison.addr_2) == "10.0.0.9/24"
+    assert comparison.can_communicate is None
+    assert comparison.num_subnet_bits == 28
+
+
+def test_compare_mixed_versions():
+    """Should refuse to compare IPv4 and IPv6 addresses."""
+    with pytest.raises(ValueError):
+        cidrbrewer.compare("10.0.0.1", "2001:db8::1")
+
+
+def test_allocate():
+    """Should allocate blocks and list the space left over."""
+    allocation = cidrbrewer.allocate("10.0.0.0/24", [100, 20])
+    assert [str(block) for block in allocation.blocks] == [
+        "10.0.0.0/25",
+        "10.0.0.128/27",
+    ]
+    assert [str(block) for block in allocation.free_blocks] == [
+        "10.0.0.160/27",
+        "10.0.0.192/26",
+    ]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import benchmarks.bench as bench
+
+FORMAT_ADDR_DETAILS = "cidrbrewer.__main__.format_addr_details"
+
+
+def test_dataset_reproducible():
+    """Should generate the same synthetic addresses on every run."""
+    assert bench.Dataset(100).addr_strs == bench.Dataset(100).addr_strs
+
+
+def test_run_benchmarks():
+    """Should time every benchmark for every dataset size."""
+    results = bench.run_benchmarks(list(bench.BENCHMARKS), [10], num_repeats=1)
+    assert sorted(results) == sorted("{}@10".format(name) for name in bench.BENCHMARKS)
+    assert all(timing > 0 for timing in results.values())
+
+
+def test_find_regressions():
+    """Should report benchmarks slower than their baseline by the threshold."""
+    baselines = {"get_network_id@1000": 100.0, "parse_addr_str@1000": 100.0}
+    results = {
+        "get_network_id@1000": 130.0,
+        "parse_addr_str@1000": 120.0,
+        "get_blocks@1000": 500.0,
+    }
+    assert bench.find_regressions(results, baselines, threshold=0.25) == [
+        ("get_network_id@1000", 100.0, 130.0)
+    ]
+
+
+def test_time_benchmark_clears_caches():
+    """Should time every repeat without results cached by earlier repeats."""
+    misses = []
+
+    def bench_format_addr_details(dataset):
+        bench.cli.format_addr_details(0x0A000000, 24)
+        misses.append(bench.cache.get_cache_stats()[FORMAT_ADDR_DETAILS].misses)
+
+    bench.time_benchmark(bench_format_addr_details, bench.Dataset(1), num_repeats=3)
+    assert misses == [1, 1, 1]
+
+
+def test_save_baselines(tmp_path):
+    """Should store the threshold and conditions along with the timings."""
+    baselines_path = str(tmp_path / "baselines.json")
+    bench.save_baselines({"get_blocks@10": 12.34}, 0.5, 3, baselines_path)
+    baselines = bench.load_baselines(baselines_path)
+    assert baselines["results"] == {"get_blocks@10": 12.3}
+    assert baselines["threshold"] == 0.5
+    assert baselines["repeats"] == 3
+    assert bench.get_changed_conditions(baselines, 3) == []
+    assert bench.get_changed_conditions(baselines, 5) == ["repeats"]
+
+
+def test_load_baselines_missing(tmp_path):
+    """Should treat missing baselines as having no timings."""
+    assert bench.load_baselines(str(tmp_path / "missing.json")) == {"results": {}}
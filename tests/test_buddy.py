@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import time
+
+import pytest
+
+import cidrbrewer.buddy as buddy
+
+
+def test_allocate():
+    """Should carve blocks from largest to smallest without gaps."""
+    allocator = buddy.BuddyAllocator(0x0A000000, 24)
+    assert allocator.allocate((32, 50)) == [(64, 0x0A000000, 26), (32, 0x0A000040, 27)]
+    assert allocator.get_free_blocks() == [(0x0A000060, 27), (0x0A000080, 25)]
+
+
+def test_allocate_incremental():
+    """Should carve new blocks from the smallest free block that fits."""
+    allocator = buddy.BuddyAllocator(0x0A000000, 24)
+    allocator.allocate((64, 32))
+    assert allocator.allocate((16,)) == [(16, 0x0A000060, 28)]
+    assert allocator.allocate((64,)) == [(64, 0x0A000080, 26)]
+
+
+def test_allocate_no_space():
+    """Should allocate nothing if any block does not fit."""
+    allocator = buddy.BuddyAllocator(0x0A000000, 24)
+    allocator.allocate((128,))
+    with pytest.raises(ValueError):
+        allocator.allocate((64, 128))
+    assert len(allocator) == 1
+    assert allocator.get_free_blocks() == [(0x0A000080, 25)]
+
+
+def test_release():
+    """Should merge released blocks with their free buddies."""
+    allocator = buddy.BuddyAllocator(0x0A000000, 24)
+    blocks = allocator.allocate((64, 64, 64))
+    allocator.release(0x0A000040, 26)
+    assert allocator.get_free_blocks() == [(0x0A000040, 26), (0x0A0000C0, 26)]
+    allocator.release(0x0A000000, 26)
+    assert allocator.get_free_blocks() == [(0x0A000000, 25), (0x0A0000C0, 26)]
+    allocator.release(*blocks[2][1:])
+    assert allocator.get_free_blocks() == [(0x0A000000, 24)]
+
+
+def test_release_not_allocated():
+    """Should refuse to release a block which was not allocated."""
+    allocator = buddy.BuddyAllocator(0x0A000000, 24)
+    allocator.allocate((64,))
+    with pytest.raises(ValueError):
+        allocator.release(0x0A000000, 25)
+
+
+def test_reserve():
+    """Should mark existing blocks as allocated and refuse overlapping ones."""
+    allocator = buddy.BuddyAllocator(0x0A000000, 24)
+    allocator.reserve(0x0A000040, 26, "web")
+    assert allocator.get_free_blocks() == [(0x0A000000, 26), (0x0A000080, 25)]
+    with pytest.raises(ValueError):
+        allocator.reserve(0x0A000060, 27)
+    with pytest.raises(ValueError):
+        allocator.reserve(0x0B000000, 26)
+
+
+def test_save_and_load_allocator(tmp_path):
+    """Should persist allocations and their labels to a state file."""
+    state_path = tmp_path / "state.txt"
+    allocator = buddy.load_allocator(state_path, 0x0A000000, 24)
+    allocator.allocate((64,), "web")
+    allocator.allocate((32,))
+    buddy.save_allocator(allocator, state_path)
+    assert state_path.read_text() == (
+        "# parent: 10.0.0.0/24\n10.0.0.0/26 web\n10.0.0.64/27\n"
+    )
+    allocator = buddy.load_allocator(state_path, 0x0A000000, 24)
+    assert allocator.get_allocations() == [
+        (0x0A000000, 26, "web"),
+        (0x0A000040, 27, None),
+    ]
+    assert allocator.allocate((32,)) == [(32, 0x0A000060, 27)]
+
+
+def test_load_allocator_other_parent(tmp_path):
+    """Should refuse to reuse a state file recording another parent subnet."""
+    state_path = tmp_path / "state.txt"
+    state_path.write_text("# parent: 10.0.0.0/24\n10.0.0.0/26\n")
+    with pytest.raises(ValueError, match="records blocks of 10.0.0.0/24, not"):
+        buddy.load_allocator(state_path, 0x0A000000, 16)
+
+
+def test_load_allocator_without_header(tmp_path):
+    """Should load a state file without a header, such as one written by hand."""
+    state_path = tmp_path / "state.txt"
+    state_path.write_text("10.0.0.64/26 db\n")
+    allocator = buddy.load_allocator(state_path, 0x0A000000, 24)
+    assert allocator.get_allocations() == [(0x0A000040, 26, "db")]
+
+
+def allocate_from_state(state_path):
+    with buddy.open_allocator(state_path, 0x0A000000, 16) as allocator:
+        blocks = allocator.allocate((256,))
+        # Give any concurrent run time to load the same state
+        time.sleep(0.01)
+    return blocks[0][1]
+
+
+def test_open_allocator_concurrent(tmp_path):
+    """Should never hand out the same block to concurrent runs."""
+    state_path = str(tmp_path / "state.txt")
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        network_ids = list(executor.map(allocate_from_state, [state_path] * 16))
+    assert len(set(network_ids)) == 16
+    assert len(buddy.load_allocator(state_path, 0x0A000000, 16)) == 16
+
+
+def test_open_allocator_error(tmp_path):
+    """Should leave the state file untouched when an update fails."""
+    state_path = tmp_path / "state.txt"
+    state_path.write_text("# parent: 10.0.0.0/24\n10.0.0.0/25\n")
+    with pytest.raises(ValueError):
+        with buddy.open_allocator(state_path, 0x0A000000, 24) as allocator:
+            allocator.allocate((256,))
+    assert state_path.read_text() == "# parent: 10.0.0.0/24\n10.0.0.0/25\n"
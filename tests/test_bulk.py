@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer.bulk as bulk
+
+ADDRS = [0xC817105C, 0xC0A81364, 0x0A000001]
+NUM_SUBNET_BITS = [28, 25, 32]
+
+
+def test_get_subnets_python():
+    """Should compute subnet details for every address in pure Python."""
+    results = bulk.get_subnets(ADDRS, NUM_SUBNET_BITS, use_numpy=False)
+    assert results.network_ids == [0xC8171050, 0xC0A81300, 0x0A000001]
+    assert results.broadcast_ids == [0xC817105F, 0xC0A8137F, 0x0A000001]
+    assert results.first_available_addrs == [0xC8171051, 0xC0A81301, 0x0A000001]
+    assert results.last_available_addrs == [0xC817105E, 0xC0A8137E, 0x0A000000]
+    assert results.subnet_sizes == [14, 126, -1]
+
+
+def test_get_subnets_python_single_num_subnet_bits():
+    """Should apply a single number of subnet bits to every address."""
+    results = bulk.get_subnets(ADDRS, 8, use_numpy=False)
+    assert results.network_ids == [0xC8000000, 0xC0000000, 0x0A000000]
+
+
+def test_get_subnets_numpy():
+    """Should compute the same subnet details with vectorized arithmetic."""
+    pytest.importorskip("numpy")
+    expected = bulk.get_subnets(ADDRS, NUM_SUBNET_BITS, use_numpy=False)
+    results = bulk.get_subnets(ADDRS, NUM_SUBNET_BITS, use_numpy=True)
+    for field in bulk.BulkSubnets._fields:
+        assert getattr(results, field).tolist() == getattr(expected, field)
+
+
+def test_get_subnets_numpy_zero_subnet_bits():
+    """Should handle zero subnet bits without overflowing the host mask."""
+    pytest.importorskip("numpy")
+    results = bulk.get_subnets(ADDRS, 0, use_numpy=True)
+    assert results.network_ids.tolist() == [0, 0, 0]
+    assert results.broadcast_ids.tolist() == [0xFFFFFFFF] * 3
+    assert results.subnet_sizes.tolist() == [2**32 - 2] * 3
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+import cidrbrewer.cache as cache
+
+
+@cache.memoize
+def double(num):
+    return num * 2
+
+
+@pytest.fixture(autouse=True)
+def reset_cache_size():
+    yield
+    cache.set_cache_size(cache.DEFAULT_CACHE_SIZE)
+
+
+def get_double():
+    return sys.modules[__name__].double
+
+
+def test_memoize():
+    """Should compute each result once and record hits and misses."""
+    cache.clear_caches()
+    assert [get_double()(num) for num in (1, 2, 1, 1)] == [2, 4, 2, 2]
+    stats = cache.get_cache_stats()["{}.double".format(__name__)]
+    assert (stats.hits, stats.misses, stats.currsize) == (2, 2, 2)
+
+
+def test_set_cache_size():
+    """Should rebind memoized functions to caches of the given size."""
+    cache.set_cache_size(1)
+    for num in (1, 2, 1):
+        get_double()(num)
+    stats = cache.get_cache_stats()["{}.double".format(__name__)]
+    assert (stats.hits, stats.misses, stats.maxsize) == (0, 3, 1)
+
+
+def test_set_cache_size_zero():
+    """Should disable memoization entirely when the size is 0."""
+    cache.set_cache_size(0)
+    assert not hasattr(get_double(), "cache_info")
+    assert "{}.double".format(__name__) not in cache.get_cache_stats()
+    with pytest.raises(ValueError):
+        cache.set_cache_size(-1)
+
+
+def test_cache_stats_rebound():
+    """Should report and clear caches even when their functions are rebound."""
+    cache.clear_caches()
+    get_double()(3)
+    with patch.object(sys.modules[__name__], "double", lambda num: num * 2):
+        assert cache.get_cache_stats()["{}.double".format(__name__)].currsize == 1
+        cache.clear_caches()
+        assert cache.get_cache_stats()["{}.double".format(__name__)].currsize == 0
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer.core as core
+
+
+def test_dotted_to_int():
+    """Should convert a dotted-decimal address to an integer."""
+    assert core.dotted_to_int("200.23.16.92") == 0xC817105C
+
+
+def test_dotted_to_int_invalid():
+    """Should reject malformed dotted-decimal addresses."""
+    for dotted_addr in ("10.0.0", "10.0.0.0.0", "10.0.0.256", "10.0.0.-1", "10.0.0."):
+        with pytest.raises(core.AddrParseError):
+            core.dotted_to_int(dotted_addr)
+
+
+def test_dotted_to_int_leading_zeroes():
+    """Should reject octets with leading zeroes, which are ambiguous."""
+    with pytest.raises(core.AddrParseError, match="invalid octet '010'"):
+        core.dotted_to_int("10.0.0.010")
+
+
+def test_parse_addr():
+    """Should parse an address string with or without slash notation."""
+    assert core.parse_addr("192.168.19.100/25") == (0xC0A81364, 25)
+    assert core.parse_addr("192.168.19.100") == (0xC0A81364, None)
+
+
+def test_parse_addr_invalid_prefix_len():
+    """Should reject prefix lengths outside 0-32."""
+    for addr_str in ("10.0.0.1/33", "10.0.0.1/", "10.0.0.1/x", "10.0.0.1/1/2"):
+        with pytest.raises(core.AddrParseError, match="invalid prefix length"):
+            core.parse_addr(addr_str)
+
+
+def test_ipv6_to_int():
+    """Should convert full and compressed IPv6 addresses to integers."""
+    assert core.ipv6_to_int("2001:0db8:0000:0000:0000:0000:0000:0001") == (
+        0x20010DB8000000000000000000000001
+    )
+    assert core.ipv6_to_int("2001:DB8::1") == 0x20010DB8000000000000000000000001
+    assert core.ipv6_to_int("::") == 0
+    assert core.ipv6_to_int("::ffff:192.168.19.100") == 0xFFFFC0A81364
+
+
+def test_ipv6_to_int_invalid():
+    """Should reject malformed IPv6 addresses."""
+    for ipv6_addr in (
+        "1::2::3",
+        "1:2:3:4:5:6:7",
+        "1:2:3:4:5:6:7:8:9",
+        "1:2:3:4:5:6:7::8",
+        "12345::",
+        "g::",
+        "1.2.3.4::",
+        ":1::",
+    ):
+        with pytest.raises(core.AddrParseError):
+            core.ipv6_to_int(ipv6_addr)
+
+
+def test_int_to_ipv6():
+    """Should convert an integer to a canonical compressed IPv6 address."""
+    assert core.int_to_ipv6(0x20010DB8000000000000000000000001) == "2001:db8::1"
+    assert core.int_to_ipv6(0x20010DB8000000010000000000000001) == ("2001:db8:0:1::1")
+    assert core.int_to_ipv6(0x20010DB8000000000001000000000001) == ("2001:db8::1:0:0:1")
+    assert core.int_to_ipv6(0) == "::"
+
+
+def test_parse_any_addr():
+    """Should parse IPv4 and IPv6 addresses along with their length."""
+    assert core.parse_any_addr("192.168.19.100/25") == (0xC0A81364, 25, 32)
+    assert core.parse_any_addr("2001:db8::1/64") == (
+        0x20010DB8000000000000000000000001,
+        64,
+        128,
+    )
+    with pytest.raises(core.AddrParseError, match="must be 0-128"):
+        core.parse_any_addr("2001:db8::1/129")
+
+
+def test_parse_addr_ipv6():
+    """Should reject IPv6 addresses where only IPv4 is supported."""
+    with pytest.raises(core.AddrParseError, match="expected an IPv4 address"):
+        core.parse_addr("2001:db8::1/64")
+
+
+def test_int_to_dotted():
+    """Should convert an integer address to dotted-decimal notation."""
+    assert core.int_to_dotted(0xC817105C) == "200.23.16.92"
+
+
+def test_int_to_bin_octets():
+    """Should convert an integer address to dot-separated binary octets."""
+    assert core.int_to_bin_octets(0x0000FF01) == "00000000.00000000.11111111.00000001"
+
+
+def test_int_to_bin():
+    """Should convert an integer address to a 32-character binary string."""
+    assert core.int_to_bin(0xC817105C) == "11001000000101110001000001011100"
+
+
+def test_get_subnet_mask():
+    """Should compute the integer subnet mask."""
+    assert core.get_subnet_mask(28) == 0xFFFFFFF0
+    assert core.get_subnet_mask(0) == 0
+    assert core.get_subnet_mask(32) == 0xFFFFFFFF
+
+
+def test_get_network_id():
+    """Should compute the integer network ID of an address."""
+    assert core.get_network_id(0xC817105C, 28) == 0xC8171050
+
+
+def test_get_broadcast_id():
+    """Should compute the integer broadcast ID of an address."""
+    assert core.get_broadcast_id(0xC817105C, 28) == 0xC817105F
+
+
+def test_get_first_and_last_available_addr():
+    """Should compute the first and last available addresses."""
+    assert core.get_first_available_addr(0xC817105C, 28) == 0xC8171051
+    assert core.get_last_available_addr(0xC817105C, 28) == 0xC817105E
+
+
+def test_is_reserved():
+    """Should determine whether an integer address is reserved."""
+    assert core.is_reserved(0xC817105C, 28) is False
+    assert core.is_reserved(0xC8171050, 28) is True
+    assert core.is_reserved(0xC817105F, 28) is True
+    assert core.is_reserved(0xC817105C, 32) is True
+
+
+def test_addr_from_str():
+    """Should build an integer-backed address from slash notation."""
+    addr = core.Addr.from_str("192.168.19.100/25")
+    assert addr.value == 0xC0A81364
+    assert addr.num_subnet_bits == 25
+    assert addr.network_id == 0xC0A81300
+    assert addr.broadcast_id == 0xC0A8137F
+    assert addr.subnet_size == 126
+    assert str(addr) == "192.168.19.100/25"
+
+
+def test_addr_from_str_no_slash_notation():
+    """Should build an address without a number of subnet bits."""
+    addr = core.Addr.from_str("192.168.19.100")
+    assert addr.num_subnet_bits is None
+    assert addr == core.Addr.from_bin("11000000101010000001001101100100")
+
+
+def test_addr_from_any_str_ipv6():
+    """Should build an integer-backed IPv6 address with 128-bit math."""
+    addr = core.Addr.from_any_str("2001:db8:abcd:12::1/64")
+    assert addr.is_ipv6()
+    assert addr.subnet_mask == 0xFFFFFFFFFFFFFFFF0000000000000000
+    assert addr.network_id == 0x20010DB8ABCD00120000000000000000
+    assert addr.broadcast_id == 0x20010DB8ABCD0012FFFFFFFFFFFFFFFF
+    assert addr.subnet_size == 2**64 - 2
+    assert str(addr) == "2001:db8:abcd:12::1/64"
+
+
+def test_get_num_trailing_zeros():
+    """Should count the trailing zero bits of an integer address."""
+    assert core.get_num_trailing_zeros(0xC8171050) == 4
+    assert core.get_num_trailing_zeros(0) == 32
+
+
+def test_get_largest_subnet_bits():
+    """Should compute the largest subnet mask for two IP addresses."""
+    assert core.get_largest_subnet_bits((0x7D2F2021, 0x7D2F202F)) == 27
+    assert core.get_largest_subnet_bits((0xAC100B4A, 0xAC100B4E)) == 29
+
+
+def test_get_largest_subnet_bits_same_addr():
+    """Should leave room for the network and broadcast IDs."""
+    assert core.get_largest_subnet_bits((0x7D2F202A, 0x7D2F202A)) == 30
+
+
+def test_get_largest_subnet_bits_reserved():
+    """Should widen the subnet until no address is reserved."""
+    # 172.16.11.64 is the network ID of the /27 and /26 containing both
+    assert core.get_largest_subnet_bits((0xAC100B40, 0xAC100B4E)) == 25
+
+
+def test_get_largest_subnet_bits_group():
+    """Should compute the largest subnet mask for a group of addresses."""
+    addrs = iter((0xAC100B4A, 0xAC100B4E, 0xAC100B5A, 0xAC100B41))
+    assert core.get_largest_subnet_bits(addrs) == 27
+
+
+def test_get_largest_subnet_bits_ipv6():
+    """Should compute the largest subnet mask for IPv6 addresses."""
+    addrs = (0x20010DB8000000000000000000000001, 0x20010DB80000000000000000FF000001)
+    assert core.get_largest_subnet_bits(addrs, core.IPV6_ADDR_LEN) == 96
+
+
+def test_split_subnet():
+    """Should lazily yield the network IDs of equal subnets."""
+    network_ids = core.split_subnet(0xC0A81364, 24, 4)
+    assert next(network_ids) == 0xC0A81300
+    assert list(network_ids) == [0xC0A81340, 0xC0A81380, 0xC0A813C0]
+
+
+def test_split_subnet_not_power_of_two():
+    """Should size subnets for the next power of two."""
+    assert core.get_split_subnet_bits(24, 3) == 26
+    assert list(core.split_subnet(0xC0A81300, 24, 3)) == [
+        0xC0A81300,
+        0xC0A81340,
+        0xC0A81380,
+    ]
+
+
+def test_get_hosts():
+    """Should lazily list every usable host address in a subnet."""
+    hosts = core.get_hosts(0xC0A81364, 29)
+    assert list(hosts) == list(range(0xC0A81361, 0xC0A81367))
+    assert len(core.get_hosts(0x0A000000, 8)) == (1 << 24) - 2
+
+
+def test_get_hosts_stride():
+    """Should list only every stride-th usable host address."""
+    assert list(core.get_hosts(0xC0A81300, 24, stride=100)) == [
+        0xC0A81301,
+        0xC0A81365,
+        0xC0A813C9,
+    ]
+    with pytest.raises(ValueError):
+        core.get_hosts(0xC0A81300, 24, stride=0)
+
+
+def test_get_hosts_no_usable_hosts():
+    """Should list no hosts for /31 and /32 subnets."""
+    assert list(core.get_hosts(0xC0A81300, 31)) == []
+    assert list(core.get_hosts(0xC0A81301, 32)) == []
+
+
+def test_split_subnet_too_many():
+    """Should refuse to split a subnet into more subnets than will fit."""
+    with pytest.raises(ValueError):
+        core.split_subnet(0xC0A81300, 30, 8)
+
+
+def test_get_split_subnet_bits_no_subnet():
+    """Should refuse to split an address without a subnet."""
+    with pytest.raises(ValueError, match="slash notation"):
+        core.get_split_subnet_bits(None, 4)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import io
+import json
+
+import cidrbrewer.formats as formats
+
+
+def test_get_details_record():
+    """Should build a structured record of address details."""
+    record = formats.get_details_record(0xC0A81364, 25, address="192.168.19.100/25")
+    assert tuple(record) == formats.FIELD_NAMES
+    assert record["address"] == "192.168.19.100/25"
+    assert record["address_2"] is None
+    assert record["subnet_mask"] == "255.255.255.128"
+    assert record["network_id"] == "192.168.19.0"
+    assert record["broadcast_id"] == "192.168.19.127"
+    assert record["first_available_addr"] == "192.168.19.1"
+    assert record["last_available_addr"] == "192.168.19.126"
+    assert record["subnet_size"] == 126
+
+
+def test_get_details_record_ipv6():
+    """Should build a structured record of IPv6 address details."""
+    record = formats.get_details_record(
+        0x20010DB8000000000000000000000001, 64, 128, address="2001:db8::1/64"
+    )
+    assert record["subnet_mask"] == "ffff:ffff:ffff:ffff::"
+    assert record["network_id"] == "2001:db8::"
+    assert record["broadcast_id"] == "2001:db8::ffff:ffff:ffff:ffff"
+    assert record["subnet_size"] == 2**64 - 2
+
+
+def test_write_records_jsonl():
+    """Should write one JSON object per line."""
+    out = io.StringIO()
+    records = (
+        formats.get_details_record(addr, 24) for addr in (0x0A000001, 0x0B000001)
+    )
+    formats.write_records(records, out, "jsonl")
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line)["network_id"] for line in lines] == [
+        "10.0.0.0",
+        "11.0.0.0",
+    ]
+
+
+def test_write_records_csv():
+    """Should write a header row followed by one row per record."""
+    out = io.StringIO()
+    formats.write_records([formats.get_details_record(0x0A000001, 24)], out, "csv")
+    header, row = out.getvalue().splitlines()
+    assert header.split(",") == list(formats.FIELD_NAMES)
+    assert row == ",,,,24,255.255.255.0,10.0.0.0,10.0.0.255,10.0.0.1,10.0.0.254,254"
+
+
+def test_write_records_csv_without_header():
+    """Should write only the given columns, without a header row."""
+    out = io.StringIO()
+    formats.write_records(
+        [formats.get_cidr_record(0x0A000000, 24)],
+        out,
+        "csv",
+        formats.CIDR_FIELD_NAMES,
+        write_header=False,
+    )
+    assert out.getvalue() == "10.0.0.0/24,10.0.0.0,10.0.0.255,256\n"
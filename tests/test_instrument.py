@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+
+import pytest
+
+import cidrbrewer.instrument as instrument
+
+
+@instrument.stage(instrument.FORMAT)
+def format_num(num):
+    return "{}".format(parse_num(str(num)))
+
+
+@instrument.stage(instrument.PARSE)
+def parse_num(num_str):
+    return int(num_str)
+
+
+@pytest.fixture(autouse=True)
+def disable_instrumentation():
+    yield
+    instrument.disable()
+    instrument.reset()
+    instrument.hooks.clear()
+
+
+def get_module():
+    return sys.modules[__name__]
+
+
+def test_stage_disabled():
+    """Should leave instrumented functions untouched until enabled."""
+    assert not hasattr(get_module().parse_num, "__wrapped__")
+    assert not instrument.is_enabled()
+    assert get_module().parse_num("5") == 5
+    assert instrument.get_stats()[instrument.PARSE] == (0, 0.0)
+
+
+def test_enable():
+    """Should count calls to each stage, including nested stages."""
+    instrument.enable()
+    assert [get_module().format_num(num) for num in (1, 2, 3)] == ["1", "2", "3"]
+    get_module().parse_num("4")
+    stats = instrument.get_stats()
+    assert stats[instrument.FORMAT].calls == 3
+    assert stats[instrument.PARSE].calls == 4
+    assert stats[instrument.WRITE] == (0, 0.0)
+    assert stats[instrument.FORMAT].seconds > 0
+    assert instrument.get_elapsed_seconds() >= sum(
+        stage_stats.seconds for stage_stats in stats.values()
+    )
+
+
+def test_disable():
+    """Should restore every instrumented function and keep the statistics."""
+    instrument.enable()
+    get_module().parse_num("1")
+    instrument.disable()
+    assert not hasattr(get_module().parse_num, "__wrapped__")
+    get_module().parse_num("2")
+    assert instrument.get_stats()[instrument.PARSE].calls == 1
+
+
+def test_stage_enabled():
+    """Should wrap functions defined once instrumentation is enabled."""
+    instrument.enable()
+
+    @instrument.stage(instrument.PARSE)
+    def parse_late_num(num_str):
+        return int(num_str)
+
+    get_module().parse_late_num = parse_late_num
+    try:
+        assert get_module().parse_late_num("6") == 6
+        assert instrument.get_stats()[instrument.PARSE].calls == 1
+        instrument.disable()
+        assert not hasattr(get_module().parse_late_num, "__wrapped__")
+    finally:
+        del get_module().parse_late_num
+        instrument.instrumented_funcs.pop((__name__, "parse_late_num"))
+
+
+def test_add_hook():
+    """Should call hooks with the stage and duration of outermost calls."""
+    calls = []
+    instrument.add_hook(lambda *args: calls.append(args))
+    instrument.enable()
+    get_module().format_num(1)
+    assert [(stage_name, func_name) for stage_name, func_name, _ in calls] == [
+        (instrument.PARSE, "{}.parse_num".format(__name__)),
+        (instrument.FORMAT, "{}.format_num".format(__name__)),
+    ]
+
+
+def test_wrap_output():
+    """Should time writes to an output stream only when enabled."""
+    out = io.StringIO()
+    assert instrument.wrap_output(out) is out
+    instrument.enable()
+    timed_out = instrument.wrap_output(out)
+    print("10.0.0.1", file=timed_out)
+    assert out.getvalue() == timed_out.getvalue() == "10.0.0.1\n"
+    assert instrument.get_stats()[instrument.WRITE].calls == 2
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer.packed as packed
+
+PACKED_ADDRS = packed.pack_addr(0xC0A81364) + packed.pack_addr(0x0A000001)
+PACKED_PREFIXES = packed.pack_addr(0xC0A81364, 25) + packed.pack_addr(0x0A000001, 8)
+
+
+def test_pack_addr():
+    """Should pack an address (and number of subnet bits) as big-endian."""
+    assert packed.pack_addr(0xC0A81364) == b"\xc0\xa8\x13\x64"
+    assert packed.pack_addr(0xC0A81364, 25) == b"\xc0\xa8\x13\x64\x19"
+
+
+def test_iter_packed():
+    """Should decode packed addresses with the given number of subnet bits."""
+    assert list(packed.iter_packed(PACKED_ADDRS, num_subnet_bits=24)) == [
+        (0xC0A81364, 24),
+        (0x0A000001, 24),
+    ]
+
+
+def test_iter_packed_with_prefix():
+    """Should decode packed addresses followed by numbers of subnet bits."""
+    assert list(packed.iter_packed(PACKED_PREFIXES, with_prefix=True)) == [
+        (0xC0A81364, 25),
+        (0x0A000001, 8),
+    ]
+
+
+def test_iter_packed_truncated():
+    """Should refuse to decode a buffer containing a partial record."""
+    with pytest.raises(ValueError):
+        list(packed.iter_packed(PACKED_ADDRS[:-1]))
+
+
+def test_iter_packed_invalid_prefix_len():
+    """Should refuse to decode a record with more than 32 subnet bits."""
+    buffer = PACKED_PREFIXES + packed.pack_addr(0x0A000001, 33)
+    with pytest.raises(ValueError, match="prefix length 33 in packed record 3"):
+        list(packed.iter_packed(buffer, with_prefix=True))
+
+
+def test_get_packed_arrays_python():
+    """Should decode packed records into lists without NumPy."""
+    assert packed.get_packed_arrays(
+        PACKED_PREFIXES, with_prefix=True, use_numpy=False
+    ) == ([0xC0A81364, 0x0A000001], [25, 8])
+    assert packed.get_packed_arrays(PACKED_ADDRS, use_numpy=False) == (
+        [0xC0A81364, 0x0A000001],
+        32,
+    )
+
+
+def test_get_packed_arrays_numpy():
+    """Should decode packed records into zero-copy NumPy views."""
+    pytest.importorskip("numpy")
+    addrs, num_subnet_bits = packed.get_packed_arrays(
+        PACKED_PREFIXES, with_prefix=True, use_numpy=True
+    )
+    assert addrs.tolist() == [0xC0A81364, 0x0A000001]
+    assert num_subnet_bits.tolist() == [25, 8]
+    assert not addrs.flags.owndata
+
+
+def test_open_packed(tmp_path):
+    """Should memory-map a packed file for reading."""
+    packed_path = tmp_path / "addrs.bin"
+    packed_path.write_bytes(PACKED_PREFIXES)
+    with packed.open_packed(str(packed_path)) as buffer:
+        assert list(packed.iter_packed(buffer, with_prefix=True)) == [
+            (0xC0A81364, 25),
+            (0x0A000001, 8),
+        ]
+
+
+def test_get_packed_arrays_numpy_invalid_prefix_len():
+    """Should refuse to decode a record with more than 32 subnet bits."""
+    pytest.importorskip("numpy")
+    buffer = packed.pack_addr(0x0A000001, 40) + PACKED_PREFIXES
+    with pytest.raises(ValueError, match="prefix length 40 in packed record 1"):
+        packed.get_packed_arrays(buffer, with_prefix=True, use_numpy=True)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_iter_packed_arrays(use_numpy):
+    """Should decode packed records one chunk at a time."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    buffer = PACKED_PREFIXES + packed.pack_addr(0x0A000002, 16)
+    chunks = [
+        (list(addrs), list(num_subnet_bits))
+        for addrs, num_subnet_bits in packed.iter_packed_arrays(
+            buffer, 2, with_prefix=True, use_numpy=use_numpy
+        )
+    ]
+    assert chunks == [([0xC0A81364, 0x0A000001], [25, 8]), ([0x0A000002], [16])]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_iter_packed_arrays_invalid_prefix_len(use_numpy):
+    """Should identify an invalid record by its number in the whole buffer."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    buffer = PACKED_PREFIXES * 2 + packed.pack_addr(0x0A000001, 33)
+    with pytest.raises(ValueError, match="prefix length 33 in packed record 5"):
+        list(
+            packed.iter_packed_arrays(buffer, 2, with_prefix=True, use_numpy=use_numpy)
+        )
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer.parallel as parallel
+
+
+def sum_chunk(chunk, offset):
+    return sum(chunk) + offset
+
+
+def test_iter_chunks():
+    """Should lazily split an iterable into chunks of the given size."""
+    assert list(parallel.iter_chunks(iter(range(7)), 3)) == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6],
+    ]
+
+
+def test_iter_chunks_invalid_size():
+    """Should reject chunk sizes which would never yield anything."""
+    with pytest.raises(ValueError, match="chunk size"):
+        list(parallel.iter_chunks(range(7), 0))
+
+
+def test_get_num_workers():
+    """Should use one worker per CPU when the number of jobs is 0."""
+    assert parallel.get_num_workers(3) == 3
+    assert parallel.get_num_workers(0) >= 1
+    with pytest.raises(ValueError, match="number of jobs"):
+        parallel.get_num_workers(-1)
+
+
+def test_map_chunks_ordered():
+    """Should yield the result for every chunk in input order."""
+    results = parallel.map_chunks(
+        sum_chunk, range(10), 100, num_jobs=2, chunk_size=3, ordered=True
+    )
+    assert list(results) == [103, 112, 121, 109]
+
+
+def test_map_chunks_unordered():
+    """Should yield the result for every chunk in any order."""
+    results = parallel.map_chunks(
+        sum_chunk, range(10), 100, num_jobs=2, chunk_size=3, ordered=False
+    )
+    assert sorted(results) == [103, 109, 112, 121]
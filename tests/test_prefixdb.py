@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import io
+
+import pytest
+
+import cidrbrewer.prefixdb as prefixdb
+import cidrbrewer.trie as trie
+
+TABLE = """
+# routing table
+10.0.0.0/8 corp
+10.1.0.0/16\tdc1 core
+10.1.2.0/24
+10.1.2.3
+10.2.0.0/16 dc2
+192.168.0.0/16 lab
+"""
+
+
+def compile_db(table):
+    db_file = io.BytesIO()
+    prefixdb.compile_table(io.StringIO(table), db_file)
+    return prefixdb.PrefixDB(db_file.getvalue())
+
+
+def test_get_longest_match():
+    """Should find the entry with the longest prefix containing an address."""
+    db = compile_db(TABLE)
+    assert len(db) == 6
+    assert db.get_longest_match(0x0A010203) == (0x0A010203, 32, None)
+    assert db.get_longest_match(0x0A010204) == (0x0A010200, 24, None)
+    assert db.get_longest_match(0x0A030000) == (0x0A000000, 8, "corp")
+    assert db.get_longest_match(0x0B000000) is None
+    assert db.get_longest_match(0xFFFFFFFF) is None
+
+
+def test_get_matches():
+    """Should find every entry containing an address, shortest first."""
+    db = compile_db(TABLE)
+    assert db.get_matches(0x0A010203) == [
+        (0x0A000000, 8, "corp"),
+        (0x0A010000, 16, "dc1 core"),
+        (0x0A010200, 24, None),
+        (0x0A010203, 32, None),
+    ]
+    assert db.get_matches(0x09FFFFFF) == []
+
+
+def test_matches_trie():
+    """Should answer every query exactly as the equivalent trie does."""
+    db = compile_db(TABLE + "0.0.0.0/0 default\n10.1.0.0/16 replaced\n")
+    table = trie.load_table(
+        io.StringIO(TABLE + "0.0.0.0/0 default\n10.1.0.0/16 replaced\n")
+    )
+    for addr in (0, 0x0A000000, 0x0A010203, 0x0A01FFFF, 0x0A020001, 0xFFFFFFFF):
+        assert db.get_matches(addr) == table.get_matches(addr)
+
+
+def test_invalid_db():
+    """Should refuse to load a buffer which is not a valid database."""
+    with pytest.raises(ValueError):
+        prefixdb.PrefixDB(b"10.0.0.0/8 corp\n")
+    db_file = io.BytesIO()
+    prefixdb.compile_table(io.StringIO(TABLE), db_file)
+    with pytest.raises(ValueError):
+        prefixdb.PrefixDB(db_file.getvalue()[:-1])
+
+
+def test_open_table(tmp_path):
+    """Should open either a text table or a compiled database."""
+    table_path = tmp_path / "table.txt"
+    table_path.write_text(TABLE)
+    db_path = tmp_path / "table.db"
+    prefixdb.compile_table_path(table_path, db_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "table.db",
+        "table.txt",
+    ]
+    with prefixdb.open_table(db_path) as db:
+        assert isinstance(db, prefixdb.PrefixDB)
+        assert db.get_longest_match(0x0A020001) == (0x0A020000, 16, "dc2")
+    with prefixdb.open_table(table_path) as table:
+        assert isinstance(table, trie.PrefixTrie)
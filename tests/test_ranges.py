@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import cidrbrewer.ranges as ranges
+
+
+def test_range_to_cidrs():
+    """Should decompose a range into the minimal list of subnets."""
+    # 10.0.0.5 - 10.0.0.20
+    assert list(ranges.range_to_cidrs(0x0A000005, 0x0A000014)) == [
+        (0x0A000005, 32),
+        (0x0A000006, 31),
+        (0x0A000008, 29),
+        (0x0A000010, 30),
+        (0x0A000014, 32),
+    ]
+
+
+def test_range_to_cidrs_aligned():
+    """Should yield a single subnet for an aligned range."""
+    assert list(ranges.range_to_cidrs(0x0A000000, 0x0AFFFFFF)) == [(0x0A000000, 8)]
+
+
+def test_range_to_cidrs_everything():
+    """Should yield a single subnet for the entire address space."""
+    assert list(ranges.range_to_cidrs(0, 0xFFFFFFFF)) == [(0, 0)]
+
+
+def test_merge_ranges():
+    """Should merge overlapping and adjacent ranges."""
+    assert list(ranges.merge_ranges([(0, 9), (5, 12), (13, 20), (30, 40)])) == [
+        (0, 20),
+        (30, 40),
+    ]
+
+
+def test_merge_ranges_contained():
+    """Should merge ranges contained entirely within another range."""
+    assert list(ranges.merge_ranges([(0, 100), (5, 12), (50, 60)])) == [(0, 100)]
+
+
+def test_aggregate_cidrs():
+    """Should collapse subnets into the smallest covering set."""
+    cidrs = [
+        (0xC0A80000, 16),
+        (0x0A000100, 24),
+        (0x0A000000, 24),
+        (0x0A000200, 23),
+        (0x0A000305, 32),
+    ]
+    assert list(ranges.aggregate_cidrs(cidrs)) == [
+        (0x0A000000, 22),
+        (0xC0A80000, 16),
+    ]
+
+
+def test_get_free_cidrs():
+    """Should compute the minimal subnets covering the unallocated space."""
+    allocated_cidrs = [(0x0A000040, 26), (0x0A000000, 26), (0x0B000000, 8)]
+    assert list(ranges.get_free_cidrs(0x0A000000, 24, allocated_cidrs)) == [
+        (0x0A000080, 25)
+    ]
+
+
+def test_get_free_cidrs_gaps():
+    """Should compute the free space before, between and after allocations."""
+    allocated_cidrs = [(0x0A000010, 28), (0x0A000080, 26)]
+    assert list(ranges.get_free_cidrs(0x0A000000, 24, allocated_cidrs)) == [
+        (0x0A000000, 28),
+        (0x0A000020, 27),
+        (0x0A000040, 26),
+        (0x0A0000C0, 26),
+    ]
+
+
+def test_union_ranges():
+    """Should merge the ranges of both lists."""
+    assert list(ranges.union_ranges([(0, 9), (20, 29)], [(5, 14), (30, 39)])) == [
+        (0, 14),
+        (20, 39),
+    ]
+
+
+def test_intersect_ranges():
+    """Should yield only the addresses in both lists."""
+    assert list(
+        ranges.intersect_ranges([(0, 9), (20, 29)], [(5, 24), (26, 26), (28, 40)])
+    ) == [(5, 9), (20, 24), (26, 26), (28, 29)]
+
+
+def test_subtract_ranges():
+    """Should yield only the addresses in the first list but not the second."""
+    assert list(
+        ranges.subtract_ranges([(0, 9), (20, 29)], [(5, 6), (8, 21), (29, 40)])
+    ) == [(0, 4), (7, 7), (22, 28)]
+
+
+def test_subtract_ranges_everything():
+    """Should handle ranges ending at the last address."""
+    assert list(ranges.subtract_ranges([(0, 0xFFFFFFFF)], [(1, 0xFFFFFFFF)])) == [
+        (0, 0)
+    ]
+
+
+def test_apply_set_operation():
+    """Should yield the minimal subnets covering the result of each operation."""
+    # 10.0.0.0/24 and 10.0.1.0/25 versus 10.0.0.128/25 and 10.0.1.0/24
+    cidrs_1 = [(0x0A000000, 24), (0x0A000100, 25)]
+    cidrs_2 = [(0x0A000100, 24), (0x0A000080, 25)]
+    assert list(ranges.apply_set_operation("union", cidrs_1, cidrs_2)) == [
+        (0x0A000000, 23)
+    ]
+    assert list(ranges.apply_set_operation("intersection", cidrs_1, cidrs_2)) == [
+        (0x0A000080, 25),
+        (0x0A000100, 25),
+    ]
+    assert list(ranges.apply_set_operation("difference", cidrs_1, cidrs_2)) == [
+        (0x0A000000, 25)
+    ]
+
+
+def test_apply_set_operation_presorted():
+    """Should stream presorted subnets and refuse unsorted ones."""
+    cidrs_1 = [(0x0A000000, 24), (0x0A000100, 24)]
+    cidrs_2 = [(0x0A000080, 25)]
+    assert list(
+        ranges.apply_set_operation("difference", cidrs_1, cidrs_2, presorted=True)
+    ) == [(0x0A000000, 25), (0x0A000100, 24)]
+    with pytest.raises(ValueError, match="not sorted"):
+        list(
+            ranges.apply_set_operation("union", cidrs_1[::-1], cidrs_2, presorted=True)
+        )
+
+
+def test_get_overlaps():
+    """Should yield every pair of nested subnets."""
+    # 10.0.0.0/24, 10.0.1.0/24, 10.0.0.128/25 and 10.0.0.130/32
+    entries = [(0x0A000000, 24), (0x0A000100, 24), (0x0A000080, 25), (0x0A000082, 32)]
+    assert list(ranges.get_overlaps(entries)) == [
+        ((0x0A000000, 24), (0x0A000080, 25)),
+        ((0x0A000000, 24), (0x0A000082, 32)),
+        ((0x0A000080, 25), (0x0A000082, 32)),
+    ]
+
+
+def test_get_overlaps_duplicates():
+    """Should yield duplicate subnets in input order, ignoring labels."""
+    entries = [(0x0A000000, 24, "b"), (0x0B000000, 8, None), (0x0A000000, 24, "a")]
+    assert list(ranges.get_overlaps(entries)) == [
+        ((0x0A000000, 24, "b"), (0x0A000000, 24, "a"))
+    ]
+
+
+def test_get_overlaps_none():
+    """Should yield nothing for disjoint subnets."""
+    assert list(ranges.get_overlaps([(0x0A000100, 24), (0x0A000000, 24)])) == []
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import socket
+
+import pytest
+
+import cidrbrewer.__main__ as main
+import cidrbrewer.server as server
+
+
+def test_get_response():
+    """Should respond to a query with its records as a line of JSON."""
+    response = server.get_response(
+        "125.47.32.170/25 125.47.32.53/25\n", main.get_query_records
+    )
+    assert response.endswith("\n")
+    (record,) = json.loads(response)["records"]
+    assert record["can_communicate"] is False
+    assert record["num_subnet_bits"] == 24
+
+
+def test_get_response_error():
+    """Should respond to a malformed query with an error message."""
+    response = json.loads(server.get_response("10.0.0.256\n", main.get_query_records))
+    assert response == {"error": "invalid octet '256' in '10.0.0.256' (must be 0-255)"}
+    response = json.loads(server.get_response("\n", main.get_query_records))
+    assert "error" in response
+
+
+def test_serve_pipelined_clients(tmp_path):
+    """Should answer pipelined queries from concurrent clients in order."""
+    socket_path = str(tmp_path / "cidr-brewer.sock")
+
+    async def query(addr_strs):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write("".join(addr_str + "\n" for addr_str in addr_strs).encode())
+        writer.write_eof()
+        responses = [json.loads(line) async for line in reader]
+        writer.close()
+        return [response["records"][0]["network_id"] for response in responses]
+
+    async def run_clients():
+        async with await server.start_server(socket_path, main.get_query_records):
+            return await asyncio.gather(
+                query(["10.0.0.1/8", "10.1.0.1/16", "10.1.2.1/24"]),
+                query(["192.168.19.100/25"] * 100),
+            )
+
+    network_ids_1, network_ids_2 = asyncio.run(run_clients())
+    assert network_ids_1 == ["10.0.0.0", "10.1.0.0", "10.1.2.0"]
+    assert network_ids_2 == ["192.168.19.0"] * 100
+
+
+def test_remove_stale_socket(tmp_path):
+    """Should remove a socket left behind by a server which is not running."""
+    socket_path = str(tmp_path / "cidr-brewer.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale_socket:
+        stale_socket.bind(socket_path)
+    server.remove_stale_socket(socket_path)
+    assert not (tmp_path / "cidr-brewer.sock").exists()
+
+
+def test_remove_stale_socket_running(tmp_path):
+    """Should refuse to remove the socket of a server which is still running."""
+    socket_path = str(tmp_path / "cidr-brewer.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as running_socket:
+        running_socket.bind(socket_path)
+        running_socket.listen()
+        with pytest.raises(ValueError, match="already running"):
+            server.remove_stale_socket(socket_path)
+    assert (tmp_path / "cidr-brewer.sock").exists()
+
+
+def test_remove_stale_socket_not_socket(tmp_path):
+    """Should refuse to remove a file which is not a socket."""
+    file_path = tmp_path / "cidr-brewer.sock"
+    file_path.write_text("")
+    with pytest.raises(ValueError, match="not a socket"):
+        server.remove_stale_socket(str(file_path))
+    assert file_path.exists()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import subprocess
+import sys
+
+import cidrbrewer.__main__ as main
+
+# The modules which must not be imported until a code path needs them
+LAZY_MODULES = (
+    "argparse",
+    "asyncio",
+    "concurrent.futures",
+    "csv",
+    "json",
+    "mmap",
+    "numpy",
+    "cidrbrewer.buddy",
+    "cidrbrewer.bulk",
+    "cidrbrewer.packed",
+    "cidrbrewer.parallel",
+    "cidrbrewer.prefixdb",
+    "cidrbrewer.server",
+    "cidrbrewer.trie",
+)
+# The maximum time (in microseconds) to import the command-line entry point,
+# as measured by python -X importtime
+IMPORT_TIME_BUDGET = 20000
+# The number of times the import time is measured (the fastest is used, since
+# slower runs only measure noise from the rest of the system)
+NUM_IMPORT_TIME_RUNS = 5
+
+
+def run_python(args, tmp_path):
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=str(tmp_path))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def get_import_time(tmp_path):
+    stderr = run_python(
+        ["-X", "importtime", "-c", "import cidrbrewer.__main__"], tmp_path
+    ).stderr
+    match = re.search(r"\|\s*(\d+) \| cidrbrewer\.__main__$", stderr, re.MULTILINE)
+    return int(match.group(1))
+
+
+def test_lazy_imports(tmp_path):
+    """Should not import optional subsystems' dependencies at startup."""
+    stdout = run_python(
+        [
+            "-c",
+            "import sys, cidrbrewer.__main__; "
+            "print(*(name for name in {!r} if name in sys.modules))".format(
+                LAZY_MODULES
+            ),
+        ],
+        tmp_path,
+    ).stdout
+    assert stdout.split() == []
+
+
+def test_import_time_budget(tmp_path):
+    """Should import the command-line entry point within the time budget."""
+    # The first run also compiles every module, which is not measured
+    run_python(["-c", "import cidrbrewer.__main__"], tmp_path)
+    import_time = min(get_import_time(tmp_path) for _ in range(NUM_IMPORT_TIME_RUNS))
+    assert import_time < IMPORT_TIME_BUDGET
+
+
+def test_get_bare_query():
+    """Should only treat one or two arguments without options as a query."""
+    assert main.get_bare_query(["10.0.0.1/8"]) == ("10.0.0.1/8",)
+    assert main.get_bare_query(["10.0.0.1", "10.0.0.2"]) == ("10.0.0.1", "10.0.0.2")
+    assert main.get_bare_query([]) is None
+    assert main.get_bare_query(["10.0.0.1/8", "--format", "jsonl"]) is None
+    assert main.get_bare_query(["-h"]) is None
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import contextlib
+import io
+
+import pytest
+
+import cidrbrewer.core as core
+import cidrbrewer.stream as stream
+
+
+def test_read_numbered_lines():
+    """Should number meaningful lines, skipping blank lines and comments."""
+    input_file = io.StringIO("# comment\n10.0.0.1/8\n\n  10.0.0.2/8  \n")
+    assert list(stream.read_numbered_lines(input_file)) == [
+        (2, "10.0.0.1/8"),
+        (4, "10.0.0.2/8"),
+    ]
+
+
+def test_read_queries():
+    """Should yield a tuple of parsed addresses for every query line."""
+    input_file = io.StringIO("192.168.19.100/25\n172.16.11.74 172.16.11.78\n")
+    assert list(stream.read_queries(input_file)) == [
+        (core.Addr(0xC0A81364, 25),),
+        (core.Addr(0xAC100B4A), core.Addr(0xAC100B4E)),
+    ]
+
+
+def test_read_queries_is_lazy():
+    """Should not consume the input file before queries are requested."""
+    input_file = io.StringIO("10.0.0.1/8\n10.0.0.2/8\n")
+    queries = stream.read_queries(input_file)
+    assert input_file.tell() == 0
+    assert next(queries) == (core.Addr(0x0A000001, 8),)
+
+
+def test_read_queries_invalid():
+    """Should identify the line of the input file containing an error."""
+    input_file = io.StringIO("# comment\n10.0.0.1/8\n\n10.0.0.1/8 10.0.0\n")
+    with pytest.raises(stream.InputError, match="<input>, line 4: expected 4 octets"):
+        list(stream.read_queries(input_file))
+
+
+def test_read_queries_too_many_addrs():
+    """Should reject lines with more than two addresses."""
+    input_file = io.StringIO("10.0.0.1 10.0.0.2 10.0.0.3\n")
+    with pytest.raises(stream.InputError, match="line 1: expected one or two"):
+        list(stream.read_queries(input_file))
+
+
+def test_read_queries_no_subnet():
+    """Should reject a single address without slash notation."""
+    input_file = io.StringIO("10.0.0.1/8\n10.0.0.9\n")
+    with pytest.raises(stream.InputError, match="line 2: expected a subnet"):
+        list(stream.read_queries(input_file))
+
+
+def test_read_queries_mixed_versions():
+    """Should reject a line pairing an IPv4 address with an IPv6 address."""
+    input_file = io.StringIO("10.0.0.1/8 2001:db8::1/64\n")
+    with pytest.raises(stream.InputError, match="line 1: cannot compare"):
+        list(stream.read_queries(input_file))
+
+
+def test_read_ranges():
+    """Should parse the first and last addresses of every range line."""
+    input_file = io.StringIO("10.0.0.5 10.0.0.20\n2001:db8:: 2001:db8::ff\n")
+    assert list(stream.read_ranges(input_file)) == [
+        (0x0A000005, 0x0A000014, 32),
+        (0x20010DB8 << 96, (0x20010DB8 << 96) | 0xFF, 128),
+    ]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "10.0.0.20 10.0.0.5",
+        "10.0.0.5",
+        "10.0.0.5 10.0.0.9 10.0.0.20",
+        "10.0.0.5 2001:db8::",
+        "10.0.0.0/24 10.0.0.255",
+    ],
+)
+def test_parse_range_line_invalid(line):
+    """Should refuse backwards, incomplete, mixed-version and prefixed ranges."""
+    with pytest.raises(ValueError):
+        stream.parse_range_line(line)
+
+
+def test_read_cidrs():
+    """Should parse the subnet at the start of every line."""
+    input_file = io.StringIO("10.0.1.7/24 a\n10.0.0.5\n")
+    assert list(stream.read_cidrs(input_file)) == [(0x0A000100, 24), (0x0A000005, 32)]
+
+
+def test_read_addrs_ipv6():
+    """Should accept IPv6 addresses only when allowed."""
+    input_file = io.StringIO("10.0.0.0/30 a\n2001:db8::/126 b\n")
+    assert list(stream.read_addrs(input_file, allow_ipv6=True)) == [
+        core.Addr(0x0A000000, 30),
+        core.Addr(0x20010DB8 << 96, 126, core.IPV6_ADDR_LEN),
+    ]
+    input_file.seek(0)
+    with pytest.raises(stream.InputError, match="line 2: expected an IPv4 address"):
+        list(stream.read_addrs(input_file))
+
+
+def test_read_addrs_skip_errors():
+    """Should report and skip malformed lines when the policy is to skip."""
+    input_file = io.StringIO("10.0.0.1/8 a\n10.0.0.x/8 b\n10.0.0.2/8 c\n")
+    err = io.StringIO()
+    with contextlib.redirect_stderr(err):
+        addrs = list(stream.read_addrs(input_file, stream.SKIP_ON_ERROR))
+    assert addrs == [core.Addr(0x0A000001, 8), core.Addr(0x0A000002, 8)]
+    assert "line 2: invalid octet 'x'" in err.getvalue()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import io
+
+import cidrbrewer.trie as trie
+
+TABLE = """
+# routing table
+0.0.0.0/0 default
+10.0.0.0/8 corp
+10.1.0.0/16\tdc1 core
+10.1.2.0/24
+10.1.2.3
+"""
+
+
+def test_load_table():
+    """Should load every subnet (and its label) from a table file."""
+    table = trie.load_table(io.StringIO(TABLE))
+    assert len(table) == 5
+    assert table.get_longest_match(0x0A010000) == (0x0A010000, 16, "dc1 core")
+
+
+def test_insert_replaces_entry():
+    """Should replace an existing entry for the same subnet."""
+    table = trie.PrefixTrie()
+    table.insert(0x0A000001, 8, "first")
+    table.insert(0x0A0000FF, 8, "second")
+    assert len(table) == 1
+    assert table.get_matches(0x0A123456) == [(0x0A000000, 8, "second")]
+
+
+def test_get_matches():
+    """Should find every subnet containing an address, shortest first."""
+    table = trie.load_table(io.StringIO(TABLE))
+    assert table.get_matches(0x0A010203) == [
+        (0x00000000, 0, "default"),
+        (0x0A000000, 8, "corp"),
+        (0x0A010000, 16, "dc1 core"),
+        (0x0A010200, 24, None),
+        (0x0A010203, 32, None),
+    ]
+
+
+def test_get_longest_match():
+    """Should find the most specific subnet containing an address."""
+    table = trie.load_table(io.StringIO(TABLE))
+    assert table.get_longest_match(0x0A010204) == (0x0A010200, 24, None)
+    assert table.get_longest_match(0x0A020304) == (0x0A000000, 8, "corp")
+    assert table.get_longest_match(0xC0A80001) == (0x00000000, 0, "default")
+
+
+def test_get_longest_match_none():
+    """Should return None if no subnet contains an address."""
+    table = trie.PrefixTrie()
+    table.insert(0x0A000000, 8)
+    assert table.get_longest_match(0xC0A80001) is None
+    assert table.get_matches(0xC0A80001) == []
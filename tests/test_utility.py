@@ -131,7 +131,7 @@ def test_get_blocks():
     """Should compute the list of data for each block."""
     assert main.get_blocks(
         "00010000001000111001110110000000",
-        num_subnet_bits=26,
+        num_subnet_bits=25,
         block_sizes=(16, 64, 16, 32),
     ) == [
         (64, "00010000001000111001110110000000", 26),
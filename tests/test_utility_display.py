@@ -2,10 +2,15 @@
 
 import contextlib
 import io
+import json
 import re
 from unittest.mock import call, patch
 
+import pytest
+
 import cidrbrewer.__main__ as main
+import cidrbrewer.core as core
+import cidrbrewer.stream as stream
 
 
 def test_print_addr():
@@ -36,6 +41,36 @@ def test_print_addr_num_subnet_bits():
     )
 
 
+def test_print_addr_no_binary():
+    """Should print IP address without its binary form when hidden."""
+    out = io.StringIO()
+    main.set_show_bin_addrs(False)
+    try:
+        with contextlib.redirect_stdout(out):
+            main.print_addr("11001000000101110001000001011100", num_subnet_bits=26)
+            main.print_addr_details("11001000000101110001000001011100", 26)
+    finally:
+        main.set_show_bin_addrs(True)
+    assert out.getvalue().splitlines()[:3] == [
+        "   200.23.16.92/26",
+        "Network ID:",
+        "   200.23.16.64/26",
+    ]
+
+
+@patch("sys.argv", [main.__file__, "200.23.16.92/26", "--no-binary"])
+def test_main_no_binary():
+    """Should hide the binary column when running main function."""
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            main.main()
+    finally:
+        main.set_show_bin_addrs(True)
+    assert "   200.23.16.92/26\n" in out.getvalue()
+    assert "00010111" not in out.getvalue()
+
+
 def test_print_addr_details():
     """Should print IP address details (subnet mask, network ID, etc.)"""
     out = io.StringIO()
@@ -76,8 +111,8 @@ def test_print_addr_details():
     ), "Last available address not printed"
 
 
-@patch("cidrbrewer.__main__.print_addr_details")
-def test_handle_two_addrs(print_addr_details):
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_two_addrs(print_subnet_details):
     """Should display information for two IP addresses."""
     out = io.StringIO()
     with contextlib.redirect_stdout(out):
@@ -102,11 +137,11 @@ def test_handle_two_addrs(print_addr_details):
         ),
         output,
     ), "Largest subnet mask not printed"
-    print_addr_details.assert_called_once_with("10101100000100000000101101001010", 29)
+    print_subnet_details.assert_called_once_with(0xAC100B4A, 29, addr_len=32)
 
 
-@patch("cidrbrewer.__main__.print_addr_details")
-def test_handle_two_addrs_slash_notation_communicate_no(print_addr_details):
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_two_addrs_slash_notation_communicate_no(print_subnet_details):
     """Should print info for two IP addresses in slash notation."""
     out = io.StringIO()
     with contextlib.redirect_stdout(out):
@@ -126,11 +161,11 @@ def test_handle_two_addrs_slash_notation_communicate_no(print_addr_details):
         r"{}\n\s+{}".format(r"Can these IP addresses communicate\?", "No"),
         output,
     ), '"Can communicate" message not printed'
-    print_addr_details.assert_called_once_with("01111101001011110010000010101010", 24)
+    print_subnet_details.assert_called_once_with(0x7D2F20AA, 24, addr_len=32)
 
 
-@patch("cidrbrewer.__main__.print_addr_details")
-def test_handle_two_addrs_slash_notation_communicate_yes(print_addr_details):
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_two_addrs_slash_notation_communicate_yes(print_subnet_details):
     """
     Should print info for two same-subnet IP addresses in slash notation.
     """
@@ -152,11 +187,11 @@ def test_handle_two_addrs_slash_notation_communicate_yes(print_addr_details):
         r"{}\n\s+{}".format(r"Can these IP addresses communicate\?", "Yes"),
         output,
     ), '"Can communicate" message not printed'
-    print_addr_details.assert_called_once_with("01111101001011110010000010101010", 24)
+    print_subnet_details.assert_called_once_with(0x7D2F20AA, 24, addr_len=32)
 
 
-@patch("cidrbrewer.__main__.print_addr_details")
-def test_print_blocks(print_addr_details):
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_print_blocks(print_subnet_details):
     """Should print details for IP address blocks."""
     out = io.StringIO()
     with contextlib.redirect_stdout(out):
@@ -181,16 +216,38 @@ def test_print_blocks(print_addr_details):
     assert block_1_matches.start(0) < block_2_matches.start(0)
     assert block_2_matches.start(0) < block_3_matches.start(0)
     assert block_3_matches.start(0) < block_4_matches.start(0)
-    assert print_addr_details.call_args_list == [
-        call("00101010011100101001100010000000", 26, indent_level=1),
-        call("00101010011100101001100011000000", 27, indent_level=1),
-        call("00101010011100101001100011100000", 28, indent_level=1),
-        call("00101010011100101001100011110000", 28, indent_level=1),
+    assert print_subnet_details.call_args_list == [
+        call(0x2A729880, 26, indent_level=1, addr_len=32),
+        call(0x2A7298C0, 27, indent_level=1, addr_len=32),
+        call(0x2A7298E0, 28, indent_level=1, addr_len=32),
+        call(0x2A7298F0, 28, indent_level=1, addr_len=32),
     ]
 
 
-@patch("cidrbrewer.__main__.print_addr_details")
-def test_handle_one_addr(print_addr_details):
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_print_blocks_free_space(print_subnet_details):
+    """Should print the space left over after allocating blocks."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.print_blocks(
+            "00101010011100101001100010000000",
+            num_subnet_bits=25,
+            block_sizes=(64, 16),
+        )
+    assert re.search(
+        r"{}\n\s+{}\s+{}\n\s+{}\s+{}".format(
+            "Free Space:",
+            r"42\.114\.152\.208/28",
+            r"00101010\.01110010\.10011000\.11010000",
+            r"42\.114\.152\.224/27",
+            r"00101010\.01110010\.10011000\.11100000",
+        ),
+        out.getvalue(),
+    ), "Free space not printed"
+
+
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_one_addr(print_subnet_details):
     """Should display information for one IP address."""
     out = io.StringIO()
     with contextlib.redirect_stdout(out):
@@ -212,18 +269,47 @@ def test_handle_one_addr(print_addr_details):
         ),
         output,
     ), "Subnet mask not printed"
-    print_addr_details.assert_called_once_with("11000000101010000001001101100100", 25)
+    print_subnet_details.assert_called_once_with(0xC0A81364, 25, addr_len=32)
+
+
+def test_handle_one_addr_ipv6():
+    """Should display information for one IPv6 address."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_one_addr("2001:db8:abcd:12::1/64")
+    output = out.getvalue()
+    assert "Subnet mask:\n   ffff:ffff:ffff:ffff::\n" in output
+    assert "Network ID:\n   2001:db8:abcd:12::/64\n" in output
+    assert "Broadcast ID:\n   2001:db8:abcd:12:ffff:ffff:ffff:ffff\n" in output
+    assert "Subnet Size: 2^64 - 2 = 18446744073709551614" in output
+
+
+def test_handle_two_addrs_ipv6():
+    """Should display the largest subnet mask for two IPv6 addresses."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_two_addrs("2001:db8::1/64", "2001:db8::ff:1/64")
+    output = out.getvalue()
+    assert "Can these IP addresses communicate?\n   Yes\n" in output
+    assert "   104 bits\n   ffff:ffff:ffff:ffff:ffff:ffff:ff00:0\n" in output
+    assert "Network ID:\n   2001:db8::/104\n" in output
+
 
+def test_handle_two_addrs_mixed_versions():
+    """Should refuse to compare an IPv4 address with an IPv6 address."""
+    with pytest.raises(ValueError, match="IPv4 and IPv6"):
+        main.handle_two_addrs("10.0.0.1/8", "2001:db8::1/64")
 
-@patch("cidrbrewer.__main__.print_blocks")
-def test_handle_one_addr_block_sizes(print_blocks):
+
+@patch("cidrbrewer.__main__.print_addr_blocks")
+def test_handle_one_addr_block_sizes(print_addr_blocks):
     """
     Should display information for one IP address and given block sizes.
     """
     with contextlib.redirect_stdout(None):
         main.handle_one_addr("192.168.19.100/25", [16, 64, 16, 32])
-    print_blocks.assert_called_once_with(
-        "11000000101010000001001101100100", 25, [16, 64, 16, 32]
+    print_addr_blocks.assert_called_once_with(
+        core.Addr(0xC0A81364, 25), [16, 64, 16, 32]
     )
 
 
@@ -243,3 +329,655 @@ def test_main_two_addrs(handle_two_addrs):
     with contextlib.redirect_stdout(None):
         main.main()
     handle_two_addrs.assert_called_once_with("125.47.32.170/25", "125.47.32.53/25")
+
+
+@patch("cidrbrewer.__main__.handle_addr_pair")
+@patch("cidrbrewer.__main__.handle_addr")
+@patch("sys.stdin", io.StringIO("192.168.19.100/25\n\n172.16.11.74 172.16.11.78\n"))
+def test_handle_input(handle_addr, handle_addr_pair):
+    """Should handle every query read from the given input file."""
+    main.handle_input("-", [16, 32])
+    handle_addr.assert_called_once_with(core.Addr(0xC0A81364, 25), [16, 32])
+    handle_addr_pair.assert_called_once_with(
+        core.Addr(0xAC100B4A), core.Addr(0xAC100B4E)
+    )
+
+
+@patch("cidrbrewer.__main__.handle_input")
+@patch("sys.argv", [__file__, "--input", "-"])
+def test_main_input(handle_input):
+    """Should handle an input file when running main function."""
+    with contextlib.redirect_stdout(None):
+        main.main()
+    handle_input.assert_called_once_with("-", None, "text", "fail")
+
+
+@patch("sys.argv", [__file__, "192.168.19.300/25"])
+def test_main_invalid_addr():
+    """Should exit with a one-line error when given a malformed address."""
+    with pytest.raises(SystemExit) as exc_info:
+        main.main()
+    assert exc_info.value.code == (
+        "cidr-brewer: error: invalid octet '300' in '192.168.19.300' (must be 0-255)"
+    )
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        ["--input", "{missing}"],
+        ["--lookup", "{missing}"],
+        ["--free", "{missing}"],
+        ["--union", "{missing}"],
+    ],
+)
+def test_main_missing_file(option, tmp_path):
+    """Should exit with a one-line error when a file cannot be opened."""
+    missing_path = str(tmp_path / "missing.txt")
+    argv = [main.__file__, "10.0.0.0/24"] + [
+        arg.format(missing=missing_path) for arg in option
+    ]
+    with patch("sys.argv", argv), pytest.raises(SystemExit) as error:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.main()
+    assert error.value.code == (
+        "cidr-brewer: error: {}: No such file or directory".format(missing_path)
+    )
+
+
+@patch("sys.stdin", io.StringIO("192.168.19.100/25\n10.0.0.256\n172.16.11.74/33\n"))
+def test_handle_input_skip_errors():
+    """Should report and skip malformed lines of the input file."""
+    out = io.StringIO()
+    err = io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        main.handle_input("-", output_format="jsonl", on_error="skip")
+    assert len(out.getvalue().splitlines()) == 1
+    assert err.getvalue().splitlines() == [
+        "warning: skipping <input>, line 2: "
+        "invalid octet '256' in '10.0.0.256' (must be 0-255)",
+        "warning: skipping <input>, line 3: "
+        "invalid prefix length '33' in '172.16.11.74/33' (must be 0-32)",
+    ]
+
+
+@pytest.mark.parametrize("output_format", ["text", "jsonl"])
+def test_handle_input_skip_mixed_versions(output_format):
+    """Should report and skip a line pairing IPv4 and IPv6 addresses."""
+    out = io.StringIO()
+    err = io.StringIO()
+    lines = "10.0.0.1/30\n10.0.0.1/8 2001:db8::1/64\n2001:db8::1/64\n"
+    with patch("sys.stdin", io.StringIO(lines)):
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            main.handle_input("-", output_format=output_format, on_error="skip")
+    assert "10.0.0.1/30" in out.getvalue()
+    assert "2001:db8::1/64" in out.getvalue()
+    assert err.getvalue() == (
+        "warning: skipping <input>, line 2: cannot compare '10.0.0.1/8' with "
+        "'2001:db8::1/64' (IPv4 and IPv6 addresses)\n"
+    )
+
+
+@pytest.mark.parametrize("output_format", ["text", "csv"])
+def test_handle_input_skip_no_subnet(output_format):
+    """Should report and skip a single address without slash notation."""
+    out = io.StringIO()
+    err = io.StringIO()
+    with patch("sys.stdin", io.StringIO("192.168.19.100/25\n10.0.0.9\n10.0.0.1/30\n")):
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            main.handle_input("-", output_format=output_format, on_error="skip")
+    assert "10.0.0.1/30" in out.getvalue()
+    assert err.getvalue() == (
+        "warning: skipping <input>, line 2: "
+        "expected a subnet in slash notation but found '10.0.0.9'\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["10.0.0.1"],
+        ["2001:db8::1"],
+        ["10.0.0.1", "--format", "jsonl"],
+        ["10.0.0.1", "--block-sizes", "4"],
+        ["10.0.0.1", "--num-subnets", "2"],
+        ["10.0.0.1", "--num-subnets", "2", "--format", "csv"],
+    ],
+)
+def test_main_no_subnet(args):
+    """Should exit with a one-line error when a single address has no subnet."""
+    with patch("sys.argv", [main.__file__] + args), pytest.raises(SystemExit) as error:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.main()
+    assert "slash notation" in error.value.code
+
+
+@patch(
+    "sys.argv", [__file__, "125.47.32.170/25", "125.47.32.53/25", "--format", "jsonl"]
+)
+def test_main_format_jsonl():
+    """Should write a JSON Lines record when running main function."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.main()
+    record = json.loads(out.getvalue())
+    assert record["address"] == "125.47.32.170/25"
+    assert record["address_2"] == "125.47.32.53/25"
+    assert record["can_communicate"] is False
+    assert record["num_subnet_bits"] == 24
+    assert record["network_id"] == "125.47.32.0"
+
+
+def test_handle_lookup(tmp_path):
+    """Should print the subnets from a table which contain an IP address."""
+    table_path = tmp_path / "table.txt"
+    table_path.write_text("10.0.0.0/8 corp\n10.1.0.0/16 dc1\n")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_lookup(str(table_path), [core.Addr.from_str("10.1.2.3")])
+    output = out.getvalue()
+    assert re.search(
+        r"{}\n\s+{}\s+\S+\n\s+{}\s+\S+".format(
+            "Matching subnets:", r"10\.0\.0\.0/8", r"10\.1\.0\.0/16"
+        ),
+        output,
+    ), "Matching subnets not printed"
+    assert re.search(
+        r"{}\n\s+{}\s+\S+\n\s+{}".format(
+            "Longest matching subnet:", r"10\.1\.0\.0/16", "Label: dc1"
+        ),
+        output,
+    ), "Longest matching subnet not printed"
+
+
+def test_handle_lookup_jsonl(tmp_path):
+    """Should write a lookup record for every IP address."""
+    table_path = tmp_path / "table.txt"
+    table_path.write_text("10.0.0.0/8 corp\n")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_lookup(
+            str(table_path),
+            map(core.Addr.from_str, ["10.1.2.3", "11.0.0.1"]),
+            "jsonl",
+        )
+    assert list(map(json.loads, out.getvalue().splitlines())) == [
+        {"address": "10.1.2.3", "subnet": "10.0.0.0/8", "label": "corp"},
+        {"address": "11.0.0.1", "subnet": None, "label": None},
+    ]
+
+
+def test_main_compile_lookup(tmp_path):
+    """Should compile a prefix table and look up addresses in it."""
+    table_path = tmp_path / "table.txt"
+    table_path.write_text("10.0.0.0/8 corp\n")
+    db_path = tmp_path / "table.db"
+    with patch(
+        "sys.argv",
+        [__file__, "--lookup", str(table_path), "--compile", str(db_path)],
+    ):
+        main.main()
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_lookup(str(db_path), [core.Addr.from_str("10.1.2.3")], "jsonl")
+    assert json.loads(out.getvalue()) == {
+        "address": "10.1.2.3",
+        "subnet": "10.0.0.0/8",
+        "label": "corp",
+    }
+
+
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_supernet(print_subnet_details):
+    """Should display the largest subnet mask for a group of IP addresses."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_supernet(
+            map(
+                core.Addr.from_str,
+                ["172.16.11.74", "172.16.11.78", "172.16.11.90", "172.16.11.65"],
+            )
+        )
+    output = out.getvalue()
+    assert re.search(
+        r"{}\n\s+{}\n\s+{}\s+{}".format(
+            "Largest subnet mask [^:]+:",
+            "27 bits",
+            r"255\.255\.255\.224",
+            r"11111111\.11111111\.11111111\.11100000",
+        ),
+        output,
+    ), "Largest subnet mask not printed"
+    print_subnet_details.assert_called_once_with(0xAC100B4A, 27)
+
+
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_split(print_subnet_details):
+    """Should print details for every equal subnet split from an IP address."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_split([core.Addr.from_str("192.168.19.0/24")], 4)
+    output = out.getvalue()
+    assert re.search(
+        r"{}\n\s+{}\s+{}\n{}".format(
+            "Given IP address:",
+            r"192\.168\.19\.0/24",
+            r"11000000\.10101000\.00010011\.00000000",
+            r"Subnet 1:\nSubnet 2:\nSubnet 3:\nSubnet 4:",
+        ),
+        output,
+    ), "Subnets not printed"
+    assert print_subnet_details.call_args_list == [
+        call(0xC0A81300, 26, indent_level=1),
+        call(0xC0A81340, 26, indent_level=1),
+        call(0xC0A81380, 26, indent_level=1),
+        call(0xC0A813C0, 26, indent_level=1),
+    ]
+
+
+@patch("cidrbrewer.__main__.handle_split")
+@patch("sys.argv", [__file__, "192.168.19.0/24", "--num-subnets", "4"])
+def test_main_num_subnets(handle_split):
+    """Should split an IP address when running main function."""
+    with contextlib.redirect_stdout(None):
+        main.main()
+    handle_split.assert_called_once_with((core.Addr(0xC0A81300, 24),), 4, "text")
+
+
+def test_handle_aggregate():
+    """Should print the smallest set of subnets covering the given subnets."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_aggregate([(0x0A000100, 24), (0x0A000000, 24), (0x0A000200, 23)])
+    assert re.search(
+        r"{}\n\s+{}\s+{}\n$".format(
+            "Aggregated Subnets:",
+            r"10\.0\.0\.0/22",
+            r"00001010\.00000000\.00000000\.00000000",
+        ),
+        out.getvalue(),
+    ), "Aggregated subnets not printed"
+
+
+def test_handle_free():
+    """Should print the space in a subnet not allocated by other subnets."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_free("10.0.0.0/24", [(0x0A000000, 25), (0x0A0000C0, 26)], "csv")
+    assert out.getvalue().splitlines() == [
+        "subnet,network_id,broadcast_id,num_addrs",
+        "10.0.0.128/26,10.0.0.128,10.0.0.191,64",
+    ]
+
+
+def test_main_aggregate_skip_errors(tmp_path):
+    """Should skip malformed subnets when aggregating an input file."""
+    input_path = tmp_path / "subnets.txt"
+    input_path.write_text("10.0.1.0/24\n10.0.0.300/24\n10.0.0.0/24\n")
+    argv = [
+        main.__file__,
+        "--input",
+        str(input_path),
+        "--aggregate",
+        "--on-error",
+        "skip",
+        "--format",
+        "csv",
+    ]
+    out = io.StringIO()
+    err = io.StringIO()
+    with patch("sys.argv", argv), contextlib.redirect_stdout(out):
+        with contextlib.redirect_stderr(err):
+            main.main()
+    assert out.getvalue().splitlines()[1:] == ["10.0.0.0/23,10.0.0.0,10.0.1.255,512"]
+    assert "line 2" in err.getvalue()
+
+
+def test_main_free_invalid_line(tmp_path):
+    """Should report the malformed line of an allocations file."""
+    allocated_path = tmp_path / "allocated.txt"
+    allocated_path.write_text("10.0.0.0/25\nnot-a-subnet\n")
+    argv = [main.__file__, "10.0.0.0/24", "--free", str(allocated_path)]
+    with patch("sys.argv", argv), pytest.raises(SystemExit) as error:
+        main.main()
+    assert "line 2" in str(error.value)
+
+
+def test_main_enumerate_input_ipv6(tmp_path):
+    """Should enumerate IPv4 and IPv6 subnets read from an input file."""
+    input_path = tmp_path / "subnets.txt"
+    input_path.write_text("10.0.0.0/30\n2001:db8::/126\n")
+    argv = [main.__file__, "--enumerate", "--input", str(input_path)]
+    out = io.StringIO()
+    with patch("sys.argv", argv), contextlib.redirect_stdout(out):
+        main.main()
+    assert out.getvalue().splitlines() == [
+        "10.0.0.1",
+        "10.0.0.2",
+        "2001:db8::1",
+        "2001:db8::2",
+    ]
+
+
+def test_handle_enumerate():
+    """Should print every usable host address in a subnet, one per line."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_enumerate(
+            map(core.Addr.from_any_str, ["10.0.0.254/23", "2001:db8::/126"]),
+            stride=127,
+        )
+    assert out.getvalue().splitlines() == [
+        "10.0.0.1",
+        "10.0.0.128",
+        "10.0.0.255",
+        "10.0.1.126",
+        "10.0.1.253",
+        "2001:db8::1",
+    ]
+
+
+def test_handle_enumerate_csv():
+    """Should write a record for every usable host address in a subnet."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_enumerate([core.Addr.from_str("10.0.0.5/30")], output_format="csv")
+    assert out.getvalue().splitlines() == [
+        "subnet,address",
+        "10.0.0.4/30,10.0.0.5",
+        "10.0.0.4/30,10.0.0.6",
+    ]
+
+
+def test_handle_enumerate_no_prefix():
+    """Should refuse to enumerate an IP address without a prefix length."""
+    with pytest.raises(ValueError):
+        main.handle_enumerate([core.Addr.from_str("10.0.0.5")])
+
+
+def test_handle_range():
+    """Should print the fewest subnets exactly covering a range."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_range(
+            [(0x0A000005, 0x0A000014, 32), (0x0A000100, 0x0A0001FF, 32)], "csv"
+        )
+    assert [line.split(",")[0] for line in out.getvalue().splitlines()] == [
+        "subnet",
+        "10.0.0.5/32",
+        "10.0.0.6/31",
+        "10.0.0.8/29",
+        "10.0.0.16/30",
+        "10.0.0.20/32",
+        "10.0.1.0/24",
+    ]
+
+
+def test_handle_range_ipv6():
+    """Should print the subnets covering a range of IPv6 addresses."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_range([stream.parse_range_line("2001:db8:: 2001:db8::1:ffff")])
+    assert re.search(r"Subnets:\n\s+2001:db8::/111\n$", out.getvalue()), (
+        "Covering subnet not printed"
+    )
+
+
+def test_handle_range_mixed_versions():
+    """Should refuse ranges of IPv4 and IPv6 addresses in the same list."""
+    with pytest.raises(ValueError, match="cannot mix IPv4 and IPv6 ranges"):
+        main.handle_range([(0, 1, 32), (0, 1, 128)])
+
+
+@patch("sys.argv", [main.__file__, "10.0.0.0", "10.0.0.255", "--range"])
+@patch("cidrbrewer.__main__.handle_range")
+def test_main_range(handle_range):
+    """Should decompose a range when running main function."""
+    main.main()
+    handle_range.assert_called_once_with([(0x0A000000, 0x0A0000FF, 32)], "text")
+
+
+def test_main_range_input_skip_errors(tmp_path):
+    """Should report and skip malformed lines of a file of ranges."""
+    input_path = tmp_path / "ranges.txt"
+    input_path.write_text("10.0.0.0 10.0.0.3\n10.0.1.0\n10.0.2.0/24 10.0.2.255\n")
+    argv = [main.__file__, "--range", "--input", str(input_path), "--on-error", "skip"]
+    out = io.StringIO()
+    err = io.StringIO()
+    with patch("sys.argv", argv), contextlib.redirect_stdout(out):
+        with contextlib.redirect_stderr(err):
+            main.main()
+    assert out.getvalue().startswith("Subnets:\n   10.0.0.0/30 ")
+    assert len(out.getvalue().splitlines()) == 2
+    assert err.getvalue().splitlines() == [
+        "warning: skipping {}, line 2: expected the first and last IP addresses "
+        "of a range but found '10.0.1.0'".format(input_path),
+        "warning: skipping {}, line 3: expected the first and last IP addresses "
+        "of a range without slash notation but found "
+        "'10.0.2.0/24 10.0.2.255'".format(input_path),
+    ]
+
+
+def test_main_difference(tmp_path):
+    """Should print the subnets in one list but not another."""
+    allowed_path = tmp_path / "allowed.txt"
+    allowed_path.write_text("10.0.0.0/24\n10.0.1.0/24\n")
+    observed_path = tmp_path / "observed.txt"
+    observed_path.write_text("10.0.0.128/25\n")
+    argv = [
+        main.__file__,
+        "--input",
+        str(allowed_path),
+        "--difference",
+        str(observed_path),
+        "--sorted",
+        "--format",
+        "csv",
+    ]
+    out = io.StringIO()
+    with patch("sys.argv", argv), contextlib.redirect_stdout(out):
+        main.main()
+    assert [line.split(",")[0] for line in out.getvalue().splitlines()] == [
+        "subnet",
+        "10.0.0.0/25",
+        "10.0.1.0/24",
+    ]
+
+
+def test_handle_overlaps():
+    """Should print every pair of overlapping subnets and their labels."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_overlaps(
+            [(0x0A000080, 25, "dmz"), (0x0A000000, 24, "web"), (0x0A000100, 24, None)]
+        )
+    assert re.search(
+        r"^Overlap 1:\n\s+Subnet:\n\s+10\.0\.0\.0/24 .*\n\s+Label: web\n"
+        r"\s+Contains:\n\s+10\.0\.0\.128/25 .*\n\s+Label: dmz\n"
+        r"\s+Colliding Addresses: 2\^7 = 128\n$",
+        out.getvalue(),
+    ), "Overlap not printed"
+
+
+def test_main_overlaps_csv(tmp_path):
+    """Should write a record for every pair of overlapping subnets."""
+    input_path = tmp_path / "allocations.txt"
+    input_path.write_text("10.0.0.0/24 web\n10.0.1.0/24\n10.0.0.0/24 web-2\n")
+    argv = [main.__file__, "--input", str(input_path), "--overlaps", "--format", "csv"]
+    out = io.StringIO()
+    with patch("sys.argv", argv), contextlib.redirect_stdout(out):
+        main.main()
+    assert out.getvalue().splitlines() == [
+        ",".join(main.formats.OVERLAP_FIELD_NAMES),
+        "10.0.0.0/24,web,10.0.0.0/24,web-2,True,10.0.0.0,10.0.0.255,256",
+    ]
+
+
+def test_handle_state(tmp_path):
+    """Should carve new blocks from the space left free by earlier runs."""
+    state_path = tmp_path / "state.txt"
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_state("10.0.0.0/24", state_path, [64], output_format="csv")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_state(
+            "10.0.0.0/24", state_path, [32], label="db", output_format="csv"
+        )
+    assert out.getvalue().splitlines()[1].split(",")[6] == "10.0.0.64"
+    assert state_path.read_text() == (
+        "# parent: 10.0.0.0/24\n10.0.0.0/26\n10.0.0.64/27 db\n"
+    )
+
+
+def test_handle_state_release(tmp_path):
+    """Should print the free space after releasing a block."""
+    state_path = tmp_path / "state.txt"
+    state_path.write_text("10.0.0.0/25\n10.0.0.128/25\n")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_state("10.0.0.0/24", state_path, released_cidr_strs=["10.0.0.0/25"])
+    assert re.search(r"Free Space:\n\s+10\.0\.0\.0/25 .*\n$", out.getvalue())
+    assert state_path.read_text() == "# parent: 10.0.0.0/24\n10.0.0.128/25\n"
+
+
+def test_handle_input_parallel(tmp_path):
+    """Should write results for every chunk of queries in input order."""
+    input_path = tmp_path / "addresses.txt"
+    input_path.write_text("10.0.0.1/8\n172.16.11.74 172.16.11.78\n192.168.1.1/24\n")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_input_parallel(
+            str(input_path), output_format="csv", num_jobs=2, chunk_size=1
+        )
+    rows = out.getvalue().splitlines()
+    assert rows[0].startswith("address,")
+    assert [row.split(",")[0] for row in rows[1:]] == [
+        "10.0.0.1/8",
+        "172.16.11.74",
+        "192.168.1.1/24",
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2])
+def test_handle_input_parallel_invalid_line(tmp_path, chunk_size):
+    """Should write results up to the first malformed line, then fail."""
+    input_path = tmp_path / "addresses.txt"
+    input_path.write_text("10.0.0.1/8\n10.0.0.300/8\n192.168.1.1/24\n")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        with pytest.raises(main.stream.InputError, match=r"addresses\.txt, line 2"):
+            main.handle_input_parallel(
+                str(input_path), output_format="csv", num_jobs=2, chunk_size=chunk_size
+            )
+    assert [row.split(",")[0] for row in out.getvalue().splitlines()[1:]] == [
+        "10.0.0.1/8"
+    ]
+
+
+def test_handle_input_parallel_skip_errors(tmp_path):
+    """Should report and skip malformed lines in the workers."""
+    input_path = tmp_path / "addresses.txt"
+    input_path.write_text("10.0.0.300/8\n192.168.1.1/24\n")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_input_parallel(
+            str(input_path),
+            output_format="jsonl",
+            num_jobs=2,
+            chunk_size=1,
+            on_error="skip",
+        )
+    assert [json.loads(line)["address"] for line in out.getvalue().splitlines()] == [
+        "192.168.1.1/24"
+    ]
+
+
+@pytest.mark.parametrize(
+    "option, value", [("--chunk-size", "0"), ("--chunk-size", "-5"), ("--jobs", "-1")]
+)
+def test_main_invalid_parallel_options(option, value):
+    """Should reject chunk sizes and numbers of jobs which cannot be used."""
+    argv = [main.__file__, "--input", "-", "--jobs", "2", option, value]
+    with patch("sys.argv", argv), contextlib.redirect_stderr(io.StringIO()) as err:
+        with pytest.raises(SystemExit):
+            main.main()
+    assert "{} must be at least".format(option) in err.getvalue()
+
+
+def test_handle_packed_input(tmp_path):
+    """Should write a record for every address in a packed file."""
+    packed_path = tmp_path / "addrs.bin"
+    packed_path.write_bytes(b"\xc0\xa8\x13\x64\x19\x0a\x00\x00\x01\x08")
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        main.handle_packed_input(
+            str(packed_path), with_prefix=True, output_format="jsonl"
+        )
+    records = list(map(json.loads, out.getvalue().splitlines()))
+    assert [record["address"] for record in records] == [
+        "192.168.19.100/25",
+        "10.0.0.1/8",
+    ]
+    assert [record["broadcast_id"] for record in records] == [
+        "192.168.19.127",
+        "10.255.255.255",
+    ]
+
+
+@pytest.mark.parametrize("option", [["--jobs", "2"], ["--block-sizes", "4"]])
+def test_main_packed_input_unsupported_option(option, tmp_path):
+    """Should reject options which packed input does not support."""
+    packed_path = tmp_path / "addrs.bin"
+    packed_path.write_bytes(b"\xc0\xa8\x13\x64")
+    argv = [main.__file__, "--input", str(packed_path), "--input-format", "packed"]
+    with patch("sys.argv", argv + option), contextlib.redirect_stderr(io.StringIO()):
+        with pytest.raises(SystemExit):
+            main.main()
+
+
+@patch("cidrbrewer.__main__.print_subnet_details")
+def test_handle_packed_input_text(print_subnet_details, tmp_path):
+    """Should print details for every address in a packed file."""
+    packed_path = tmp_path / "addrs.bin"
+    packed_path.write_bytes(b"\xc0\xa8\x13\x64")
+    with contextlib.redirect_stdout(None):
+        main.handle_packed_input(str(packed_path), num_subnet_bits=25)
+    print_subnet_details.assert_called_once_with(0xC0A81364, 25, addr_len=32)
+
+
+@patch("sys.argv", [__file__, "192.168.19.100/25", "--cache-stats"])
+def test_main_cache_stats():
+    """Should report cache statistics to stderr when running main function."""
+    err = io.StringIO()
+    with contextlib.redirect_stdout(None), contextlib.redirect_stderr(err):
+        main.main()
+    assert re.search(r"format_addr_details: \d+ hits, \d+ misses", err.getvalue())
+
+
+@patch("sys.argv", [__file__, "192.168.19.100/25", "--cache-stats", "--profile"])
+def test_main_cache_stats_profile():
+    """Should report cache statistics of functions wrapped for profiling."""
+    err = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(err):
+            main.main()
+    finally:
+        main.instrument.disable()
+        main.instrument.reset()
+    assert re.search(r"format_addr_details: \d+ hits, \d+ misses", err.getvalue())
+
+
+@patch("sys.argv", [main.__file__, "10.0.0.0/24", "--format", "csv", "--profile"])
+def test_main_profile():
+    """Should report the calls to and time spent in every stage."""
+    err = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(err):
+            main.main()
+    finally:
+        main.instrument.disable()
+        main.instrument.reset()
+    assert re.search(r"^profile: parse: [1-9]\d* calls, ", err.getvalue(), re.M)
+    assert re.search(r"^profile: format: 1 calls, ", err.getvalue(), re.M)
+    assert re.search(r"^profile: total: ", err.getvalue(), re.M)